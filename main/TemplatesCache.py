@@ -0,0 +1,132 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+from functools import lru_cache
+
+'''
+    This class stores the templates generated from a program, and their verbalizations, in .json files
+    named after the hash of their inputs: the contents of the files they are generated from
+    (dependency_graph.json, predicates.json) and the source code that generates them.
+
+    The templates are generated again only when one of the inputs changes,
+    and the processes sharing the same cache directory reuse them.
+    The cache directory is dedicated to the templates, by default the one given by get_default_cache_dir,
+    and only the last templates generated from the same files are kept in it
+'''
+class TemplatesCache:
+
+    logging.getLogger().setLevel(logging.INFO)
+
+    VERSION = 1
+
+
+    '''
+        :param cache_dir: the directory of the cache files, created if it does not exist,
+                          the one given by get_default_cache_dir if not given
+    '''
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir if cache_dir else get_default_cache_dir()
+
+
+    '''
+        This method returns the key of the templates generated from the given inputs,
+        made of their kind, the hash of the paths of the files and the hash of the contents of all the inputs
+
+        :param kind: the kind of templates, e.g., 'program_paths'
+        :param paths: the files the templates are generated from
+        :param contents: other inputs of the generation, that can be written to a .json file
+    '''
+    def get_key(self, kind, paths=(), contents=()):
+        source = hashlib.sha256('\0'.join(os.path.abspath(path) for path in paths).encode('utf-8')).hexdigest()[:16]
+        sha = hashlib.sha256()
+        for part in [str(self.VERSION), get_code_stamp(), kind]:
+            sha.update(part.encode('utf-8') + b'\0')
+        for path in paths:
+            with open(path, 'rb') as f:
+                content = f.read()
+            sha.update(str(len(content)).encode('utf-8') + b'\0' + content)
+        for content in contents:
+            content = json.dumps(content).encode('utf-8')
+            sha.update(str(len(content)).encode('utf-8') + b'\0' + content)
+        return kind + '.' + source + '.' + sha.hexdigest()
+
+
+    '''
+        This method returns the templates with the given key, generating and storing them if they are not in the cache.
+        Storing them removes the templates of the same kind generated from the same files with other contents
+
+        :param key: the key of the templates
+        :param generate: a function generating the templates, as values that can be written to a .json file
+    '''
+    def get(self, key, generate):
+        cache_path = os.path.join(self.cache_dir, 'templates.' + key + '.json.cache')
+        try:
+            with open(cache_path) as c:
+                return json.load(c)
+        except (OSError, ValueError):
+            pass
+
+        # the templates are returned as they are read from the cache
+        templates = json.loads(json.dumps(generate()))
+
+        temp_path = cache_path + '.' + str(os.getpid()) + '.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, 'w') as f:
+                json.dump(templates, f)
+            # replace atomically, so that concurrent readers never see a partial file
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logging.info(f"Templates cache not written: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return templates
+
+        self.__remove_stale(key, cache_path)
+        return templates
+
+
+    '''
+        This method removes the templates of the same kind generated from the same files as the given key,
+        but with other contents, which can no longer be read
+
+        :param key: the key of the templates just stored
+        :param cache_path: path to the file of the templates just stored
+    '''
+    def __remove_stale(self, key, cache_path):
+        prefix = key.rsplit('.', 1)[0]
+        for stale_path in glob.glob(os.path.join(glob.escape(self.cache_dir), 'templates.' + prefix + '.*.json.cache')):
+            if stale_path != cache_path:
+                try:
+                    os.remove(stale_path)
+                except OSError as e:
+                    logging.info(f"Stale templates cache not removed: {e}")
+
+
+'''
+    This function returns the default directory of the templates cache:
+    the TEMPLATES_CACHE_DIR environment variable if set, or else the templates folder in the user cache directory
+    ($XDG_CACHE_HOME, ~/.cache if not set)
+'''
+def get_default_cache_dir():
+    cache_dir = os.environ.get('TEMPLATES_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    user_cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(user_cache_dir, 'template-based-inference', 'templates')
+
+
+'''
+    This function returns the hash of the source code generating the templates
+'''
+@lru_cache(maxsize=None)
+def get_code_stamp():
+    main_path = os.path.dirname(os.path.abspath(__file__))
+    sources = sorted(glob.glob(os.path.join(main_path, '*.py')) + glob.glob(os.path.join(main_path, 'verbalizer', '*.py')))
+    sha = hashlib.sha256()
+    for source in sources:
+        with open(source, 'rb') as f:
+            sha.update(os.path.basename(source).encode('utf-8') + b'\0' + f.read())
+    return sha.hexdigest()
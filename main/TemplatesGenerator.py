@@ -1,4 +1,6 @@
 from collections import defaultdict
+from functools import lru_cache
+import itertools
 import json
 import logging
 import os
@@ -6,6 +8,8 @@ import sys
 import pandas as pd
 import importlib
 from main.verbalizer.utilsFunctions import *
+from main.verbalizer.PredicateGlossary import PredicateGlossary
+from main.TemplatesCache import TemplatesCache
 import re
 
 verbalizer_path = os.path.abspath('main/verbalizer')
@@ -13,9 +17,17 @@ sys.path.append(verbalizer_path)
 import ProgramVerbalizer
 importlib.reload(ProgramVerbalizer)
 
+from parsedChase import parse_fact
+
 import AggregateVerbalizer
 importlib.reload(AggregateVerbalizer)
 
+# number of shapes of rules kept in memory
+RULE_SHAPE_CACHE_SIZE = 1 << 16
+
+# columns of the explanation of each fact
+EXPLANATION_COLUMNS = ['Derived Fact', 'DeterministicVerbalization', 'TemplateApproach']
+
 class TemplatesGenerator:
     
     logging.getLogger().setLevel(logging.INFO)
@@ -64,8 +76,10 @@ class TemplatesGenerator:
             plan[i]['plan'] = plan[i]['plan'].replace('[','').replace(']','').replace('not ','not_').replace(' ','')
             
         new_list = []
+        seen = set()
         for dictionary in plan:
-            if dictionary not in new_list:
+            if frozenset(dictionary.items()) not in seen:
+                seen.add(frozenset(dictionary.items()))
                 new_list.append(dictionary)
         plan = new_list.copy()
 
@@ -108,33 +122,43 @@ class TemplatesGenerator:
             else:
                 templates.append([outputs[k]])
 
-        # Starting from the outputs we go down iteratively the plan and generate the entire path.
-        # In case a path gets splitted, a new template will be appended to the templates list
-        # and will be later explored
+        # The plan is a dependency graph: each plan is a node, and its sources are the edges
+        # towards the plans it depends on, in the order they appear in the plan
+        graph = defaultdict(list)
+        for i in range(len(plan)):
+            if plan[i]['sources'] != ',':
+                graph[plan[i]['plan']].append(plan[i]['sources'])
 
-        template_active = True # boolean to indicate that there are still templates to be generated
-        N_template = 0 # number of templates
+        # Starting from the outputs we go down the graph and generate the entire path.
+        # In case a path gets splitted, a new template will be appended to the templates list
+        # and pushed on the stack of the paths to explore
         aggregation_templates = []
-        
-        while template_active:
-            # print(templates[N_template])
-            path_active = True # boolean to indicate a path of the plan is not at the end yet
-            if N_template == 0:
-                I = 0
-            else: 
-                I = len(templates[N_template])-1
-
-            while path_active:
-                # print(templates[N_template])
-                for j in range(len(plan)):
-                    if I+1 <= len(templates[N_template]):
-                        if templates[N_template][I] == plan[j]['plan']:
-                            if plan[j]['sources'] != ',':
-                                templates[N_template].append(plan[j]['sources'])
+        to_explore = list(range(len(templates)))
+        to_explore.reverse()
 
-                templates[N_template] = list(dict.fromkeys(templates[N_template]))
+        while to_explore:
+            N_template = to_explore.pop()
+            I = len(templates[N_template])-1
+            visited = set()
+            # the last step of a template to explore may come from a split
+            is_split = True
 
-                if I == len(templates[N_template]):
+            path_active = True # boolean to indicate a path of the plan is not at the end yet
+            while path_active:
+                if I < len(templates[N_template]):
+                    for sources in graph.get(templates[N_template][I], ()):
+                        if is_split or sources not in visited:
+                            visited.add(sources)
+                            templates[N_template].append(sources)
+
+                # a split may have brought a step already in the path, and only the first one is kept
+                if is_split:
+                    templates[N_template] = list(dict.fromkeys(templates[N_template]))
+                    visited = set(templates[N_template])
+                    is_split = False
+
+                # if length of the path has not increased, it means that the path is at the end
+                if I >= len(templates[N_template]):
                     path_active = False
 
                 # in case of OR conditions (two sources for the same atom) 
@@ -143,7 +167,6 @@ class TemplatesGenerator:
                     split_step = templates[N_template][-1].split('.,')
                     # apply a function to generate the different possible paths
                     split_step = self.__split_branches_plan_step(split_step)
-                    # split_step = split_branches_plan_step(split_step)
 
                     # Add templates
                     n = len(split_step)
@@ -152,6 +175,7 @@ class TemplatesGenerator:
                     for k in range(n-1):
                         templates.append(templates[N_template].copy())
                         index_of_templates.append(len(templates)-1)
+                        to_explore.append(len(templates)-1)
                     if len(templates[N_template])>1:
                         if 'msum' in templates[N_template][-2]:
                             aggregation_templates.append(index_of_templates)
@@ -163,19 +187,10 @@ class TemplatesGenerator:
                                 templates[k].append(split_step[i][1])
                         else:
                             templates[k][-1] = ','.join(split_step[i])
-                        i += 1  
-                        # if length of the path has not increased, it means that the path is at the end
-                    
-                I += 1
-                if I == 25:
-                    print('break issue!')
-                    break
+                        i += 1
+                    is_split = True
 
-            # if no new template has been added we can stop the iterations
-            if len(templates)-1 == N_template:
-                    template_active = False
-            else:
-                N_template +=1
+                I += 1
             
 
         for i in range(len(templates)):
@@ -234,35 +249,12 @@ class TemplatesGenerator:
 
     def get_path_verbalizations(self, templates_cleaned, path_output, path_predicates, is_recursive = False):
 
-        verb_temp = list()
-        
-        for temp in range(len(templates_cleaned)):
-            with open(path_output + "verb_path_plan.json", "w") as out:
-                out.write('[')
-                first_step = True
-                for step in templates_cleaned[temp]:
-                    if first_step:
-                        first_step = False
-                    else:
-                        out.write('\n,')
-                    vstep = {"rule": step} 
-                    json.dump(vstep, out, separators=(",", ":"))
-                out.write(']')
-            
-            path_verb_chase = os.path.join(path_output, 'verb_path_plan.json')
-            
-            program_verb = ProgramVerbalizer.ProgramVerbalizer()
-            program_verb.verbalize_program(path_verb_chase, path_predicates, path_output, is_recursive)
-            
-            path_verb_chase = os.path.join(path_output, 'verb_program.txt')
-
-            with open(path_verb_chase) as f:
-                lines = f.readlines()
-
-            for i in range(len(lines)):
-                lines[i] = lines[i].replace('\n','')
+        # verbalize all the templates in memory, with the glossary compiled once
+        with open(path_predicates) as p:
+            glossary = PredicateGlossary(json.load(p))
 
-            verb_temp.append(lines)
+        program_verb = ProgramVerbalizer.ProgramVerbalizer()
+        verb_temp = program_verb.verbalize_programs(templates_cleaned, glossary, is_recursive)
 
         return verb_temp
     
@@ -285,7 +277,25 @@ class TemplatesGenerator:
                 templates[-1] = [item for item in templates[-1] if init_rule not in item]
                 templates_unfolded[-1] = [item for item in templates_unfolded[-1] if init_rule not in item]
 
-    def get_program_paths(self, plan_path, generic_path_output, path_predicates):
+    '''
+        This method returns the templates of a program, the templates to verbalize and their verbalizations.
+        They are kept in the templates cache, and generated again only when
+        the dependency graph, the glossary or the code generating them change
+
+        :param plan_path: path to the dependency graph of the program
+        :param generic_path_output: path to the output directory
+        :param path_predicates: path to the glossary of the predicates
+        :param use_cache: whether to read and write the templates cache
+        :param cache_dir: the directory of the templates cache, the default one of TemplatesCache if not given
+    '''
+    def get_program_paths(self, plan_path, generic_path_output, path_predicates, use_cache = True, cache_dir = None):
+        if not use_cache:
+            return self.__get_program_paths(plan_path, generic_path_output, path_predicates)
+        cache = TemplatesCache(cache_dir)
+        key = cache.get_key('program_paths', paths = [plan_path, path_predicates])
+        return tuple(cache.get(key, lambda: self.__get_program_paths(plan_path, generic_path_output, path_predicates)))
+
+    def __get_program_paths(self, plan_path, generic_path_output, path_predicates):
         templates = self.__get_templates(plan_path)
         templates = [list(tupl) for tupl in {tuple(item) for item in templates }]
         templates_to_verb = list()
@@ -296,12 +306,6 @@ class TemplatesGenerator:
 
         templates_verb = self.get_path_verbalizations(templates_to_verb, generic_path_output, path_predicates)
         
-        if os.path.exists(os.path.join(generic_path_output, 'verb_path_plan.json')):
-            os.remove(os.path.join(generic_path_output, 'verb_path_plan.json'))
-    
-        if os.path.exists(os.path.join(generic_path_output, 'verb_program.txt')):
-            os.remove(os.path.join(generic_path_output, 'verb_program.txt'))
-        
         for i in range(len(templates)):
             templates[i].reverse()
             templates_to_verb[i].reverse()
@@ -309,7 +313,24 @@ class TemplatesGenerator:
 
         return templates, templates_to_verb, templates_verb
     
-    def get_recursive_template(self, templates,path_output,path_predicates):
+    '''
+        This method returns the recursive templates of a program and their verbalizations,
+        kept in the templates cache as the ones of get_program_paths
+
+        :param templates: the templates of the program, as returned by get_program_paths
+        :param path_output: path to the output directory
+        :param path_predicates: path to the glossary of the predicates
+        :param use_cache: whether to read and write the templates cache
+        :param cache_dir: the directory of the templates cache, the default one of TemplatesCache if not given
+    '''
+    def get_recursive_template(self, templates,path_output,path_predicates, use_cache = True, cache_dir = None):
+        if not use_cache:
+            return self.__get_recursive_template(templates, path_output, path_predicates)
+        cache = TemplatesCache(cache_dir)
+        key = cache.get_key('recursive_template', paths = [path_predicates], contents = [templates[1]])
+        return tuple(cache.get(key, lambda: self.__get_recursive_template(templates, path_output, path_predicates)))
+
+    def __get_recursive_template(self, templates,path_output,path_predicates):
 
         recursive_templates = []
         verb = []
@@ -366,38 +387,7 @@ class TemplatesGenerator:
             return fact_rules
     
     def empty_rule(self, rule):
-        ############# To do
-        rule = rule.replace('not ','')
-        ###################
-        if '),' in rule and 'msum' not in rule:
-            no_var_rule = re.sub("\(.*?\)","()",rule).split('),')
-        else:
-            if 'msum' in rule:
-                no_var_rule = re.sub("\(.*?\)","()",rule).split(',')[:-1]
-                no_var_rule = ','.join(no_var_rule)
-            else:
-                no_var_rule = [re.sub("\(.*?\)","()",rule).replace('.','')]
-        if ':-' not in no_var_rule[-1] and len(no_var_rule)>1:
-            conditions = no_var_rule[-1].split(',')
-            for p in range(len(conditions)):
-                if '<>' in conditions[p]:
-                    conditions[p] = '<>'
-                else:
-                    if '>' in conditions[p]:
-                        conditions[p] = '>'
-                    if '<' in conditions[p]:
-                        conditions[p] = '<'
-                if '=' in conditions[p]:
-                    conditions[p] = '='
-            conditions = ','.join(conditions)
-            no_var_rule = '),'.join(no_var_rule[:-1])+'),'+conditions
-        else:
-            if len(no_var_rule)>1:
-                no_var_rule = '),'.join(no_var_rule[:-1])
-            else:
-                no_var_rule = no_var_rule[0]
-        
-        return no_var_rule
+        return get_rule_shape(rule)
     
     def identify_indirect_recursion(self, chase, plan_search = False):
         
@@ -506,17 +496,31 @@ class TemplatesGenerator:
         return msum_order_verb, msum_order_chase
 
 
-    def mapping_to_template(self, chase, atom_chase, templates, templates_rec, path_output, fact_to_explain, path_verb_chase):
+    def mapping_to_template(self, chase, atom_chase, templates, templates_rec, path_output, fact_to_explain, path_verb_chase, template_index = None):
+        record = self.get_explanation_record(chase, atom_chase, templates, templates_rec, fact_to_explain, path_verb_chase, template_index)
+        return pd.DataFrame([record], columns = EXPLANATION_COLUMNS)
+
+
+    '''
+        This method returns the deterministic and the template-based explanations of a fact,
+        as a record with the EXPLANATION_COLUMNS
+
+        :param chase: the rules of the derivation of the fact in the chase
+        :param atom_chase: the atoms of the derivation of the fact in the chase
+        :param templates: the templates of the program
+        :param templates_rec: the recursive templates of the program
+        :param fact_to_explain: a fact in the chase to be explained
+        :param path_verb_chase: path to verbalized chase graph file
+        :param template_index: the TemplateIndex of the templates, built from them if not given
+    '''
+    def get_explanation_record(self, chase, atom_chase, templates, templates_rec, fact_to_explain, path_verb_chase, template_index = None):
         # print('\n')
         # print(fact_to_explain)
         # print('Mapping:')
  
         # First, retrieve from the chase all facts
         explain_derivation = True
-        AggregateVerbalizer.VerbalizationFinder().verbalize_fact(path_verb_chase, path_output, fact_to_explain, explain_derivation)
-
-        with open(os.path.join(path_output, 'verb_fact.json')) as c:
-            original = json.load(c)
+        original = AggregateVerbalizer.VerbalizationFinder().verbalize_fact(path_verb_chase, None, fact_to_explain, explain_derivation)
         realization = original.copy()
         chase_fact = chase.copy()
         
@@ -593,31 +597,34 @@ class TemplatesGenerator:
 
         # print(templates)
 
+        # templates are matched by the signature of their rules, the first template with the same rules
+        # or else the last recursive one
+        if template_index is None:
+            template_index = TemplateIndex(templates, templates_rec)
+        signatures = template_index.signatures
+        signatures_rec = template_index.signatures_rec
+
         for r in range(len(chase_splits)):
             found = False
-            for i in range(len(templates[0])):
-                # print(templates[1][i])
-                if sorted(templates[1][i])==sorted(list(dict.fromkeys(chase_splits[r]))) and recursive_case == False:
-                    found = True
-                    chase_cleaned = templates[1][i]
-                    extracted_template = templates[3][i]
-                    break
+            signature = tuple(sorted(dict.fromkeys(chase_splits[r])))
+            if signature in signatures and recursive_case == False:
+                found = True
+                i = signatures[signature][0]
+                chase_cleaned = template_index.shapes[i]
+                extracted_template = templates[3][i]
 
             if found == False:
-                for i in range(len(templates_rec[0])):
+                if len(templates_rec[0]) > 0:
                     chase_splits[r] = list(dict.fromkeys(chase_splits[r]))
-                    if sorted(templates_rec[0][i])==sorted(chase_splits[r]):
-                        chase_cleaned = templates_rec[0][i]
-                        extracted_template = templates_rec[-1][i]
+                if signature in signatures_rec:
+                    i = signatures_rec[signature][-1]
+                    chase_cleaned = template_index.shapes_rec[i]
+                    extracted_template = templates_rec[-1][i]
 
             # Map to abstract form of rule
             rules = []
             for map_to_rule in realized_rule[r]:
-                empty_realized_rule = self.empty_rule(map_to_rule)
-                for potential_rule in chase_cleaned:
-                    potential_rule_empty = self.empty_rule(potential_rule)
-                    if potential_rule_empty[:-1] in empty_realized_rule:
-                        rules.append(potential_rule[:-1])
+                rules.extend(get_matching_rules(chase_cleaned, map_to_rule))
 
             # print(rules)
             # print(realized_rule[r])
@@ -639,8 +646,8 @@ class TemplatesGenerator:
 
                 # Get constants of the head inside the dictionary
                 # print('Map Head')
-                vars = head.split('(')[1].split(')')[0].split(',')
-                vars_r = head_r.split('(')[1].split(')')[0].split(',')
+                vars = parse_fact(head).args
+                vars_r = parse_fact(head_r).args
                 # print(vars)
                 # print(vars_r)
                 for j in range(len(vars)):
@@ -666,8 +673,8 @@ class TemplatesGenerator:
                         for s in body:
                             if predicate in s:
                                 body_abstract = s
-                        vars = body_abstract.split('(')[1].split(')')[0].split(',')
-                        vars_r = body_r[j].split('(')[1].split(')')[0].split(',')
+                        vars = parse_fact(body_abstract).args
+                        vars_r = parse_fact(body_r[j]).args
                         # print(vars)
                         # print(vars_r)
                         for k in range(len(vars)):
@@ -682,8 +689,8 @@ class TemplatesGenerator:
                     body_r = body_r.split('),')
                     body_nor = [body_r[0],body_r[-1]]
                     for j in range(len(body)):
-                        vars = body[j].split('(')[1].split(')')[0].split(',')
-                        vars_r = body_nor[j].split('(')[1].split(')')[0].split(',')
+                        vars = parse_fact(body[j]).args
+                        vars_r = parse_fact(body_nor[j]).args
                         index = list()
                         for k in range(len(vars)):
                             if vars[k] not in dict_map.keys():
@@ -716,8 +723,8 @@ class TemplatesGenerator:
                         for s in body:
                             if predicate in s:
                                 body_abstract = s
-                        vars = body_abstract.split('(')[1].split(')')[0].split(',')
-                        vars_r = body_r[j].split('(')[1].split(')')[0].split(',')
+                        vars = parse_fact(body_abstract).args
+                        vars_r = parse_fact(body_r[j]).args
                         # print(vars)
                         # print(vars_r)
                         for k in range(len(vars)):
@@ -728,18 +735,7 @@ class TemplatesGenerator:
                                         dict_map.update({vars[k]:dict_map[vars[k]]+' and ' + vars_r[k]})
                         # print(dict_map) 
             # print(dict_map)
-            extracted_template = extracted_template.replace(',',' ,').replace('\'',' \'').replace('.',' .')\
-                            .replace('%',' %').replace('*',' * ').replace('+',' + ').replace('-',' - ').replace('/',' / ')\
-                            .replace('(','( ').replace(')',' )')
-            extracted_template = extracted_template.split()
-
-            for i in range(len(extracted_template)):
-                if extracted_template[i] in dict_map.keys():
-                    extracted_template[i] = dict_map[extracted_template[i]]
-
-            para_v = ' '.join(extracted_template).replace(' ,',',').replace(' \'','\'').replace(' .','.')\
-                            .replace(' %','%').replace(' * ',' x ').replace(' + ','+').replace(' - ','-').replace(' / ','/').replace('--','+')\
-                            .replace('( ','(').replace(' )',')').replace('and ENTITY','').replace('_', ' ')
+            para_v = instantiate_template(extracted_template, dict_map)
 
             final_verb.append(para_v)
 
@@ -747,9 +743,242 @@ class TemplatesGenerator:
         for i in range(len(realization)):
             record_verb.append(realization[i]['Verb_rule'])
 
-        df = pd.DataFrame([[fact_to_explain,' '.join(record_verb), ' '.join(final_verb)]], columns = ['Derived Fact','DeterministicVerbalization', 'TemplateApproach'])
-
-        if os.path.exists(os.path.join(path_output, 'verb_fact.json')):
-            os.remove(os.path.join(path_output,'verb_fact.json'))
-        
-        return df
\ No newline at end of file
+        return {'Derived Fact': fact_to_explain,
+                'DeterministicVerbalization': ' '.join(record_verb),
+                'TemplateApproach': ' '.join(final_verb)}
+
+
+    '''
+        This method explains a batch of facts. The explanations are collected as records and returned
+        in a single DataFrame or, if an output file is given, written to it in chunks of records:
+        the file is a .csv, .jsonl or .parquet file according to its extension, and parquet requires pyarrow.
+        The facts that cannot be mapped to a template are skipped
+
+        :param facts_to_explain: an iterable over the facts in the chase to be explained
+        :param chase_facts: an iterable over the (rules, atoms) of the derivation of each fact, e.g., get_chase_facts
+        :param templates: the templates of the program
+        :param templates_rec: the recursive templates of the program
+        :param path_verb_chase: path to verbalized chase graph file
+        :param output_file: path to the output file, or None to return a DataFrame
+        :param chunk_size: number of records written at once
+    '''
+    def explain_facts(self, facts_to_explain, chase_facts, templates, templates_rec, path_verb_chase, output_file = None, chunk_size = 10000):
+        template_index = TemplateIndex(templates, templates_rec)
+        records = self.__get_explanation_records(facts_to_explain, chase_facts, templates, templates_rec, path_verb_chase, template_index)
+        if output_file is None:
+            return pd.DataFrame.from_records(list(records), columns = EXPLANATION_COLUMNS)
+
+        extension = os.path.splitext(output_file)[1].lower()
+        if extension not in ('.csv', '.jsonl', '.parquet'):
+            raise ValueError(f"Unsupported format for the explanations: {output_file}")
+        writer = None
+        try:
+            if extension == '.parquet':
+                import pyarrow
+                import pyarrow.parquet
+                schema = pyarrow.schema([(column, pyarrow.string()) for column in EXPLANATION_COLUMNS])
+                writer = pyarrow.parquet.ParquetWriter(output_file, schema)
+            else:
+                writer = open(output_file, 'w', newline = '')
+
+            n_records = 0
+            for chunk in iter(lambda: list(itertools.islice(records, chunk_size)), []):
+                if extension == '.csv':
+                    pd.DataFrame.from_records(chunk, columns = EXPLANATION_COLUMNS).to_csv(writer, header = n_records == 0, index = False)
+                elif extension == '.jsonl':
+                    writer.writelines(json.dumps(record) + '\n' for record in chunk)
+                else:
+                    writer.write_table(pyarrow.Table.from_pylist(chunk, schema = schema))
+                n_records += len(chunk)
+            if n_records == 0 and extension == '.csv':
+                pd.DataFrame(columns = EXPLANATION_COLUMNS).to_csv(writer, index = False)
+            return n_records
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+    '''
+        :param facts_to_explain: an iterable over the facts in the chase to be explained
+        :param chase_facts: an iterable over the (rules, atoms) of the derivation of each fact
+        :param templates: the templates of the program
+        :param templates_rec: the recursive templates of the program
+        :param path_verb_chase: path to verbalized chase graph file
+        :param template_index: the TemplateIndex of the templates
+    '''
+    def __get_explanation_records(self, facts_to_explain, chase_facts, templates, templates_rec, path_verb_chase, template_index):
+        for fact_to_explain, (chase, atom_chase) in zip(facts_to_explain, chase_facts):
+            try:
+                yield self.get_explanation_record(chase, atom_chase, templates, templates_rec, fact_to_explain, path_verb_chase, template_index)
+            except Exception:
+                print('Failed at mapping fact: ' + fact_to_explain)
+
+
+'''
+    This class indexes the templates of a program once, when they are loaded, to match the derivation of each fact:
+    the positions of the templates with each signature, i.e., the sorted tuple of their rules,
+    and the shape of each rule of each template
+'''
+class TemplateIndex:
+
+    '''
+        :param templates: the templates of the program, as returned by get_program_paths
+        :param templates_rec: the recursive templates of the program
+    '''
+    def __init__(self, templates, templates_rec):
+        self.signatures = get_template_signatures(templates[1])
+        self.signatures_rec = get_template_signatures(templates_rec[0])
+        self.shapes = [get_template_shapes(template) for template in templates[1]]
+        self.shapes_rec = [get_template_shapes(template) for template in templates_rec[0]]
+
+
+'''
+    This function returns the positions of the templates with each signature, i.e., the sorted tuple of their rules
+
+    :param paths: the rules of each template
+'''
+def get_template_signatures(paths):
+    signatures = defaultdict(list)
+    for i in range(len(paths)):
+        signatures[tuple(sorted(paths[i]))].append(i)
+    return dict(signatures)
+
+
+'''
+    This function returns the abstract shape of a rule, without its variables and constants,
+    with the operator of each condition only
+
+    :param rule: a rule
+'''
+@lru_cache(maxsize=RULE_SHAPE_CACHE_SIZE)
+def get_rule_shape(rule):
+    ############# To do
+    rule = rule.replace('not ','')
+    ###################
+    if '),' in rule and 'msum' not in rule:
+        no_var_rule = re.sub("\(.*?\)","()",rule).split('),')
+    else:
+        if 'msum' in rule:
+            no_var_rule = re.sub("\(.*?\)","()",rule).split(',')[:-1]
+            no_var_rule = ','.join(no_var_rule)
+        else:
+            no_var_rule = [re.sub("\(.*?\)","()",rule).replace('.','')]
+    if ':-' not in no_var_rule[-1] and len(no_var_rule)>1:
+        conditions = no_var_rule[-1].split(',')
+        for p in range(len(conditions)):
+            if '<>' in conditions[p]:
+                conditions[p] = '<>'
+            else:
+                if '>' in conditions[p]:
+                    conditions[p] = '>'
+                if '<' in conditions[p]:
+                    conditions[p] = '<'
+            if '=' in conditions[p]:
+                conditions[p] = '='
+        conditions = ','.join(conditions)
+        no_var_rule = '),'.join(no_var_rule[:-1])+'),'+conditions
+    else:
+        if len(no_var_rule)>1:
+            no_var_rule = '),'.join(no_var_rule[:-1])
+        else:
+            no_var_rule = no_var_rule[0]
+
+    return no_var_rule
+
+
+'''
+    This function returns the shape of each rule of a template, together with the rule without its final dot
+
+    :param template: the rules of a template
+'''
+def get_template_shapes(template):
+    return [(get_rule_shape(rule)[:-1], rule[:-1]) for rule in template]
+
+
+'''
+    This function returns the rules of a template whose shape is in the shape of a realized rule
+
+    :param template_shapes: the shapes of the rules of a template, as returned by get_template_shapes
+    :param map_to_rule: a realized rule
+'''
+def get_matching_rules(template_shapes, map_to_rule):
+    shape = get_rule_shape(map_to_rule)
+    return [rule for potential_shape, rule in template_shapes if potential_shape in shape]
+
+
+# constants that can be placed between the compiled segments of a template: words separated by spaces,
+# without the punctuation and the operators restored around the tokens
+PLAIN_CONSTANT = re.compile(r'[^\W_]+( [^\W_]+)*')
+
+'''
+    This function splits a template into its tokens, separating the punctuation and the operators from the words
+
+    :param template: the text of a template
+'''
+@lru_cache(maxsize=RULE_SHAPE_CACHE_SIZE)
+def get_template_tokens(template):
+    template = template.replace(',',' ,').replace('\'',' \'').replace('.',' .')\
+                       .replace('%',' %').replace('*',' * ').replace('+',' + ').replace('-',' - ').replace('/',' / ')\
+                       .replace('(','( ').replace(')',' )')
+    return tuple(template.split())
+
+
+'''
+    This function restores the punctuation and the operators of a template from the text of its tokens
+
+    :param text: the tokens of a template, joined by spaces
+'''
+def join_template_tokens(text):
+    return text.replace(' ,',',').replace(' \'','\'').replace(' .','.')\
+               .replace(' %','%').replace(' * ',' x ').replace(' + ','+').replace(' - ','-').replace(' / ','/').replace('--','+')\
+               .replace('( ','(').replace(' )',')').replace('and ENTITY','').replace('_', ' ')
+
+
+'''
+    This function compiles a template into the positions of the tokens mapped to constants,
+    and the literal segments around them, already restored.
+    The segments are None if they cannot be restored apart from the constants
+
+    :param template: the text of a template
+    :param variables: the variables mapped to constants
+'''
+@lru_cache(maxsize=RULE_SHAPE_CACHE_SIZE)
+def get_template_slots(template, variables):
+    tokens = get_template_tokens(template)
+    slots = tuple(i for i in range(len(tokens)) if tokens[i] in variables)
+
+    segments = list()
+    last = 0
+    for i in slots + (len(tokens),):
+        # the words between two constants, with an empty word in place of each constant
+        words = list(tokens[last:i])
+        if last > 0:
+            words.insert(0, '')
+        if i < len(tokens):
+            words.append('')
+        segments.append(' '.join(words))
+        last = i + 1
+    if any('ENTITY' in segment for segment in segments):
+        return slots, None
+    return slots, [join_template_tokens(segment) for segment in segments]
+
+
+'''
+    This function replaces the variables of a template with their constants
+
+    :param template: the text of a template
+    :param dict_map: the constant of each variable
+'''
+def instantiate_template(template, dict_map):
+    slots, segments = get_template_slots(template, frozenset(dict_map))
+    tokens = get_template_tokens(template)
+    constants = [dict_map[tokens[i]] for i in slots]
+    if segments is None or not all(PLAIN_CONSTANT.fullmatch(c) and 'ENTITY' not in c for c in constants):
+        # the constants may change the restored text around them
+        return join_template_tokens(' '.join(dict_map.get(token, token) for token in tokens))
+
+    parts = [segments[0]]
+    for constant, segment in zip(constants, segments[1:]):
+        parts.append(constant)
+        parts.append(segment)
+    return ''.join(parts)
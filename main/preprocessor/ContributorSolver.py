@@ -0,0 +1,257 @@
+import logging
+import numpy as np
+
+'''
+    This class finds the contributors to the value of an aggregation, i.e., the smallest
+    subset of the contributions in a provenance whose sum is equal (up to a float tolerance)
+    to the aggregated value.
+
+    The search is performed by increasing size of the subset:
+    single contributors and pairs are found with vectorized searches over the sorted contributions,
+    medium-sized provenances are searched for triples and then solved exactly with a meet-in-the-middle
+    enumeration, and larger ones with a dynamic programming over discretized values,
+    as long as the table fits in the configured number of cells (otherwise only triples are looked for).
+    The contributions are discretized with the largest step that represents all of them exactly,
+    e.g., 0.05 for 0.25 and 0.1, so that no contribution is lost by rounding
+'''
+class ContributorSolver:
+
+    logging.getLogger().setLevel(logging.INFO)
+
+
+    '''
+        :param tolerance: relative tolerance for two sums to be considered equal
+        :param max_mitm_size: maximum number of contributions solved with the meet-in-the-middle
+        :param resolution: granularity used to discretize the contributions in the dynamic programming,
+                           derived from the contributions if not given
+        :param max_dp_cells: maximum size of the dynamic programming table, beyond which the search gives up
+        :param max_decimals: maximum number of decimals of the contributions when deriving the resolution
+    '''
+    def __init__(self, tolerance=1e-9, max_mitm_size=40, resolution=None, max_dp_cells=5*10**7, max_decimals=9):
+        self.tolerance = tolerance
+        self.max_mitm_size = max_mitm_size
+        self.resolution = resolution
+        self.max_dp_cells = max_dp_cells
+        self.max_decimals = max_decimals
+
+
+    '''
+        :param sorted_values: the contributions sorted in ascending order
+        :param target: the value the pair must sum to
+        :param tol: the absolute tolerance
+        :param start: the first position of sorted_values to consider
+    '''
+    def __find_pair(self, sorted_values, target, tol, start=0):
+        values = sorted_values[start:]
+        if len(values) < 2:
+            return None
+        # for each contribution, the range of the complements within the tolerance
+        low = np.searchsorted(values, target - values - tol, side='left')
+        high = np.searchsorted(values, target - values + tol, side='right')
+        positions = np.arange(len(values))
+        # only look at complements after the contribution itself, so that each pair is seen once
+        low = np.maximum(low, positions + 1)
+        candidates = np.flatnonzero(low < high)
+        if len(candidates) == 0:
+            return None
+        i = candidates[0]
+        return start + i, start + low[i]
+
+
+    '''
+        :param values: the contributions
+        :param target: the value the subset must sum to
+        :param tol: the absolute tolerance
+    '''
+    def __find_single_or_pair(self, values, target, tol):
+        singles = np.flatnonzero(np.abs(values - target) <= tol)
+        if len(singles) > 0:
+            return [singles[0]]
+
+        order = np.argsort(values, kind='stable')
+        pair = self.__find_pair(values[order], target, tol)
+        if pair:
+            return [order[pair[0]], order[pair[1]]]
+
+        return None
+
+
+    '''
+        :param values: the contributions
+        :param target: the value the subset must sum to
+        :param tol: the absolute tolerance
+    '''
+    def __find_triple(self, values, target, tol):
+        order = np.argsort(values, kind='stable')
+        sorted_values = values[order]
+        for i in range(len(sorted_values) - 2):
+            pair = self.__find_pair(sorted_values, target - sorted_values[i], tol, i + 1)
+            if pair:
+                return [order[i], order[pair[0]], order[pair[1]]]
+
+        return None
+
+
+    '''
+        :param values: the contributions of one half of the provenance
+    '''
+    def __enumerate_sums(self, values):
+        sums = np.zeros(1)
+        sizes = np.zeros(1, dtype=np.int64)
+        # the subset with index m contains the contribution i iff the bit i of m is set
+        for value in values:
+            sums = np.concatenate((sums, sums + value))
+            sizes = np.concatenate((sizes, sizes + 1))
+        return sums, sizes
+
+
+    '''
+        :param values: the contributions
+        :param target: the value the subset must sum to
+        :param tol: the absolute tolerance
+    '''
+    def __meet_in_the_middle(self, values, target, tol):
+        half = len(values) // 2
+        sums_left, sizes_left = self.__enumerate_sums(values[:half])
+        sums_right, sizes_right = self.__enumerate_sums(values[half:])
+
+        # group the subsets of the right half by size, sorted by sum
+        right_by_size = {}
+        for size in range(len(values) - half + 1):
+            masks = np.flatnonzero(sizes_right == size)
+            masks = masks[np.argsort(sums_right[masks], kind='stable')]
+            right_by_size[size] = (masks, sums_right[masks])
+
+        # look for the subsets by increasing total size
+        for size in range(1, len(values) + 1):
+            for size_left in range(max(0, size - (len(values) - half)), min(size, half) + 1):
+                masks_left = np.flatnonzero(sizes_left == size_left)
+                masks_right, sorted_right = right_by_size[size - size_left]
+                if len(masks_left) == 0 or len(masks_right) == 0:
+                    continue
+                complements = target - sums_left[masks_left]
+                low = np.searchsorted(sorted_right, complements - tol, side='left')
+                high = np.searchsorted(sorted_right, complements + tol, side='right')
+                found = np.flatnonzero(low < high)
+                if len(found) > 0:
+                    mask_left = masks_left[found[0]]
+                    mask_right = masks_right[low[found[0]]]
+                    return [i for i in range(half) if mask_left >> i & 1] + \
+                           [half + i for i in range(len(values) - half) if mask_right >> i & 1]
+
+        return None
+
+
+    '''
+        This method returns the largest step of which all the contributions are multiples,
+        or None if they have more than max_decimals decimals
+
+        :param values: the contributions
+    '''
+    def __get_resolution(self, values):
+        for decimals in range(self.max_decimals + 1):
+            scaled = np.abs(values) * 10 ** decimals
+            if np.any(scaled >= 2 ** 62):
+                return None
+            rounded = np.rint(scaled)
+            if np.all(np.abs(scaled - rounded) <= self.tolerance * np.maximum(1.0, scaled)):
+                step = int(np.gcd.reduce(rounded.astype(np.int64)))
+                return max(step, 1) / 10 ** decimals
+        return None
+
+
+    '''
+        :param values: the contributions
+        :param target: the value the subset must sum to
+        :param tol: the absolute tolerance
+    '''
+    def __exact_search(self, values, target, tol):
+        # the meet-in-the-middle enumerates the subsets of each half of the contributions
+        if 2 ** ((len(values) + 1) // 2) > self.max_dp_cells:
+            logging.info(f"Contributors search limited to triples: {len(values)} contributions cannot be "
+                         f"discretized and exceed the size of an exact search")
+            return self.__find_triple(values, target, tol)
+        return self.__meet_in_the_middle(values, target, tol)
+
+
+    '''
+        :param values: the contributions
+        :param target: the value the subset must sum to
+        :param tol: the absolute tolerance
+    '''
+    def __dynamic_programming(self, values, target, tol):
+        # negative contributions would make the table unbounded
+        if np.any(values < 0) or target < 0:
+            return self.__find_triple(values, target, tol)
+
+        resolution = self.resolution if self.resolution else self.__get_resolution(values)
+        if resolution is None:
+            return self.__exact_search(values, target, tol)
+        weights = np.rint(values / resolution).astype(np.int64)
+        # a contribution rounded to nothing could never be part of the subset
+        if np.any((weights <= 0) & (values > 0)):
+            return self.__exact_search(values, target, tol)
+        total = int(round(target / resolution))
+        # rounding each contribution may shift the sum, the real sum is checked at the end
+        slack = max(1, int(np.ceil(tol / resolution)))
+        width = total + slack + 1
+        if len(values) * width > self.max_dp_cells:
+            logging.info(f"Contributors search limited to triples: {len(values)} contributions exceed the table size")
+            return self.__find_triple(values, target, tol)
+
+        unreachable = len(values) + 1
+        # minimum number of contributions reaching each discretized sum
+        fewest = np.full(width, unreachable, dtype=np.int64)
+        fewest[0] = 0
+        taken = np.zeros((len(values), width), dtype=bool)
+        for i, weight in enumerate(weights):
+            if weight <= 0 or weight >= width:
+                continue
+            candidate = fewest[:-weight] + 1
+            better = candidate < fewest[weight:]
+            taken[i, weight:] = better
+            fewest[weight:] = np.where(better, candidate, fewest[weight:])
+
+        window = np.arange(max(0, total - slack), width)
+        window = window[np.argsort(fewest[window], kind='stable')]
+        for reached in window:
+            if fewest[reached] >= unreachable:
+                break
+            subset = []
+            remaining = reached
+            for i in range(len(values) - 1, -1, -1):
+                if remaining > 0 and taken[i, remaining]:
+                    subset.append(i)
+                    remaining -= weights[i]
+            if abs(values[subset].sum() - target) <= tol:
+                return subset
+
+        return None
+
+
+    '''
+        This method returns the positions of the smallest subset of contributions summing to the target,
+        in ascending order, or an empty list if no such subset is found
+
+        :param contributions: the values of the contributors to the aggregation
+        :param target: the aggregated value
+    '''
+    def solve(self, contributions, target):
+        values = np.asarray(contributions, dtype=float)
+        if len(values) == 0:
+            return []
+        tol = self.tolerance * max(1.0, abs(target))
+
+        subset = self.__find_single_or_pair(values, target, tol)
+        if subset is None and len(values) <= self.max_mitm_size:
+            subset = self.__find_triple(values, target, tol)
+            if subset is None and len(values) > 3:
+                subset = self.__meet_in_the_middle(values, target, tol)
+        elif subset is None:
+            # the dynamic programming already finds the smallest subset, triples are only
+            # looked for on their own when the table cannot be built
+            subset = self.__dynamic_programming(values, target, tol)
+
+        if subset is None:
+            return []
+        return sorted(int(i) for i in subset)
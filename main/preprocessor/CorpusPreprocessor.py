@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 import sys
 
@@ -8,6 +9,11 @@ import FilePreprocessor
 import importlib
 importlib.reload(FilePreprocessor)
 
+verbalizer_path = os.path.abspath('main/verbalizer')
+sys.path.append(verbalizer_path)
+import ChaseGraphVerbalizer
+importlib.reload(ChaseGraphVerbalizer)
+
 '''
     This class collects preprocessing and rewriting operations
     over input files to adapt them for the fine-tuning pipeline
@@ -21,26 +27,73 @@ class CorpusPreprocessor:
 
 
     '''
-        :param csv_file_names:
-        :param output_path:
-        :param csv_output_path:
+        This method yields the facts to explain one at a time, reading them
+        directly from the .csv files generated by Vadalog
+
+        :param csv_file_names: the names of the .csv files, i.e., the output predicates
+        :param csv_output_path: path to the folder with the .csv files
+    '''
+    def iter_output_facts(self, csv_file_names, csv_output_path):
+        file_preprocessor = FilePreprocessor.FilePreprocessor()
+        for name in csv_file_names:
+            yield from file_preprocessor.iter_csv_facts(os.path.join(csv_output_path, name + '.csv'), True)
+
+
+    '''
+        This method yields the facts to explain in lists of at most chunk_size facts,
+        so that they can be consumed before the whole output has been read
+
+        :param csv_file_names: the names of the .csv files, i.e., the output predicates
+        :param csv_output_path: path to the folder with the .csv files
+        :param chunk_size: the maximum number of facts in each list
+    '''
+    def iter_output_fact_chunks(self, csv_file_names, csv_output_path, chunk_size = 10000):
+        chunk = list()
+        for fact in self.iter_output_facts(csv_file_names, csv_output_path):
+            chunk.append(fact)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = list()
+        if chunk:
+            yield chunk
+
+
+    '''
+        :param csv_file_names: the names of the .csv files, i.e., the output predicates
+        :param output_path: not used anymore, as the facts are read without temporary files
+        :param csv_output_path: path to the folder with the .csv files
     '''
     def get_list_output_facts(self, csv_file_names, output_path, csv_output_path):
+        return list(self.iter_output_facts(csv_file_names, csv_output_path))
 
-        lines = list()
 
-        for name in csv_file_names:
-            FilePreprocessor.FilePreprocessor().parse_csv_to_txt(os.path.join(csv_output_path, name + '.csv'), os.path.join(output_path, name + '.txt'), True)
-            with open(os.path.join(output_path, name + '.txt')) as f:
-                lines.append(f.readlines())
-                for i in range(len(lines[-1])):
-                    lines[-1][i] = lines[-1][i].replace('\n','')
-
-            if os.path.exists(os.path.join(output_path, name + '.txt')):
-                os.remove(os.path.join(output_path, name + '.txt'))
-    
-        for i in range(1,len(lines)):
-            lines[0] += lines[i]
-        facts_to_explain = lines[0]
 
-        return(facts_to_explain)
\ No newline at end of file
+    '''
+        This method runs the whole preprocessing of a chase graph in memory: the integration of the
+        contributors to aggregations, the hierarchical numbering and the verbalization.
+        Only the final num_chase_graph.json and verb_chase_graph.json files are written
+
+        :param chase_path: the path to the chase_graph.json file with the chase graph
+        :param predicates_path: path to the predicates.json file with the predicates' description
+        :param output_path: path to output files
+        :param write_aggr: whether to also write the intermediate aggr_chase_graph.json file
+    '''
+    def preprocess_chase_graph(self, chase_path, predicates_path, output_path, write_aggr = False):
+        file_preprocessor = FilePreprocessor.FilePreprocessor()
+
+        with open(chase_path) as c:
+            chase = json.load(c)
+        with open(predicates_path) as p:
+            preds_descr = json.load(p)
+
+        aggr_chase = file_preprocessor.get_aggr_chase_graph(chase)
+        if write_aggr:
+            file_preprocessor.write_chase_graph(aggr_chase, output_path + "aggr_chase_graph.json")
+
+        num_chase = file_preprocessor.get_num_chase_graph(aggr_chase)
+        file_preprocessor.write_chase_graph(num_chase, output_path + "num_chase_graph.json")
+
+        verb_chase = ChaseGraphVerbalizer.ChaseGraphVerbalizer().get_verb_chase_graph(num_chase, preds_descr)
+        file_preprocessor.write_chase_graph(verb_chase, output_path + "verb_chase_graph.json")
+
+        return num_chase, verb_chase
@@ -1,11 +1,22 @@
 import json
 import os
 import logging
-import re
 import csv
+from collections import defaultdict
+import sys
 from tqdm import tqdm
 import pandas as pd
 
+rpath = os.path.abspath('main/preprocessor')
+sys.path.append(rpath)
+import ContributorSolver
+
+verbalizer_path = os.path.abspath('main/verbalizer')
+sys.path.append(verbalizer_path)
+from parsedChase import parse_fact, parse_provenance
+from utilsFunctions import read_json_array_tail, append_json_array
+from IncrementalManifest import IncrementalManifest
+
 '''
     This class collects preprocessing and rewriting operations
     over input files to adapt them for the fine-tuning pipeline
@@ -18,82 +29,253 @@ class FilePreprocessor:
     logging.getLogger().setLevel(logging.INFO)
 
 
+    '''
+        :param contributor_solver: the solver used to find the contributors to an aggregation,
+                                   a default ContributorSolver if not given
+    '''
+    def __init__(self, contributor_solver=None):
+        self.contributor_solver = contributor_solver if contributor_solver else ContributorSolver.ContributorSolver()
+
 
     '''
-        :param node: the current node in the chase graph
+        This method builds an inverted index from the name of each fact to the
+        chase steps whose provenance consumes it, preserving the chase order
+        
         :param chase: the deserialized chase_file 
     '''
-    def __get_children(self, node, chase):
-        children = []
-        
+    def __get_provenance_index(self, chase):
+        consumers = defaultdict(list)
+
         for step in chase:
-            if node['name'] in step['provenance']:
-                children.append(step)
+            provenance = parse_provenance(step['provenance'])
+            if provenance != ('',):
+                # a fact consumed more than once by the same step is a single child
+                for parent in dict.fromkeys(provenance):
+                    consumers[parent].append(step)
+
+        return consumers
+
 
-        return children
+
+    '''
+        :param node: the current node in the chase graph
+        :param consumers: the provenance index of the chase
+    '''
+    def __get_children(self, node, consumers):
+        return consumers.get(node['name'], [])
     
 
 
     '''
+        This method numbers the chain of steps descending from a step, visiting
+        the children depth-first with an explicit stack
+        
         :param step: a step of the chase
-        :param chase: the deserialized chase_file 
+        :param consumers: the provenance index of the chase
         :param number: the current number in the hierarchical numbering
+        :param on_leave: a function called with each frame of the visit when all its children are numbered, if given
     '''
-    def __number_chain(self, step, chase, number):
+    def __number_chain(self, step, consumers, number, on_leave=None):
 
         if number not in step['number']:
             step['number'].append(number)
 
-        num = 0
-        num_t = 0
+        # each frame holds [step, number, num, num_t, remaining children, number of the step]
+        root = [step, number, 0, 0, iter(self.__get_children(step, consumers)), number]
+        self.__visit(root, consumers, on_leave)
+        
+        return root[1]
+
+
+    '''
+        This method numbers the children of a frame and their descendants, depth-first
+
+        :param root: the frame to start from
+        :param consumers: the provenance index of the chase
+        :param on_leave: a function called with each frame when all its children are numbered, if given
+    '''
+    def __visit(self, root, consumers, on_leave=None):
+        stack = [root]
+
+        while stack:
+            frame = stack[-1]
+            child = next(frame[4], None)
+            if child is None:
+                if on_leave is not None:
+                    on_leave(frame)
+                stack.pop()
+                continue
 
-        for child in self.__get_children(step, chase):
-            # print(child)
             if child['rule'] and not child['name'].startswith('vatom'):
-                num += 1
-                child_number = f"{number}.{num}"
+                frame[2] += 1
+                child_number = f"{frame[1]}.{frame[2]}"
             elif child['rule'] and child['name'].startswith('vatom'):
-                num_t += 1
-                child_number = f"{number}"+".T"+ str(num_t)
+                frame[3] += 1
+                child_number = f"{frame[1]}"+".T"+ str(frame[3])
             else:
-                child_number = number
+                child_number = frame[1]
+
+            if child_number not in child['number']:
+                child['number'].append(child_number)
+
+            # the descendants of the child only depend on child_number,
+            # so the number of the parent can move on before visiting them
+            if '.' not in frame[1]:
+                frame[1] = str(int(frame[1])+1)
 
-            self.__number_chain(child, chase, child_number)
+            stack.append([child, child_number, 0, 0, iter(self.__get_children(child, consumers)), child_number])
 
-            if '.' not in number:
-                number = str(int(number)+1)
+
+    '''
+        This method creates a .json file with the given steps of a chase graph
         
-        return number
+        :param chase: the chase steps to write
+        :param output_file: path to the .json file
+    '''
+    def write_chase_graph(self, chase, output_file):
+        with open(output_file, "w") as nc:
+            first_step = True
+            nc.write('[')
+            for step in chase:
+                if first_step:
+                    first_step = False
+                else:
+                    nc.write('\n,')
+                json.dump(step, nc, separators=(",", ":"))
+            nc.write('\n]')
+
 
 
     '''
-        This method initializes the 'number' field in the chase_graph.json file
+        This method returns the chase graph with hierarchical numbering,
+        such that each chase step includes a number that links it to its ancestor steps
         
-        :param chase_path: the path to the chase_graph.json file with the chase graph
+        :param chase: the deserialized chase_file 
+        :param manifest: an IncrementalManifest where to record the state of the numbering,
+                         to continue it later with get_num_chase_delta, if given
     '''
-    def __set_number_field_chase_graph(self, chase_path):
-        try:
-            with open(chase_path, "r") as c:
-                # deserialize chase file
-                chase = json.load(c)
-                with open('temp_chase_graph.json', 'w') as nc:
-                    first_step = True
-                    nc.write('[')
-                    # initialize the number field in the json
-                    for step in chase:
-                        nstep = {'name': step['name'],
-                                 'pattern': step['pattern'],
-                                 'provenance': step['provenance'],
-                                 'rule': step['rule'],
-                                 'number': []}
-                        if first_step:
-                            first_step = False
-                        else:
-                            nc.write('\n,')
-                        json.dump(nstep, nc, separators=(",", ":"))
-                    nc.write('\n]')
-        except Exception as e:
-            print(f"An error occurred: {e}")
+    def get_num_chase_graph(self, chase, manifest=None):
+        # initialize the number field of each step
+        num_chase = [{'name': step['name'],
+                      'pattern': step['pattern'],
+                      'provenance': step['provenance'],
+                      'rule': step['rule'],
+                      'number': []} for step in chase]
+        consumers = self.__get_provenance_index(num_chase)
+
+        on_leave = None
+        if manifest is not None:
+            # every fact of the chase has an entry, even if it is never visited
+            frames = {name: [] for name in consumers}
+            frames.update((step['name'], []) for step in num_chase)
+            visited = set()
+            keys = [0]
+            def on_leave(frame):
+                self.__record_frame(frames, visited, frame, [keys[0]])
+                keys[0] += 1
+
+        num = 0
+        last_root = None
+        for step in tqdm(num_chase):
+            if step['provenance'] == "[]":  # ground fact
+                num += 1
+                num = int(self.__number_chain(step, consumers, str(num), on_leave))
+                if manifest is not None:
+                    # the frame of the ground fact is the last one left
+                    last_root = [keys[0] - 1]
+
+        if manifest is not None:
+            manifest.set_entries(frames)
+            manifest.set({'num': num, 'keys': keys[0], 'last_root': last_root})
+
+        return num_chase
+
+
+    '''
+        This method records a frame left by the visit of the chase, the first time a step is left with its number.
+        Each record holds [number of the step, current number, num, num_t, key, number of extensions, ground],
+        where the key gives the order in which the frames are left and ground tells whether the step is a ground fact
+
+        :param frames: the records of the frames of each fact
+        :param visited: the facts and numbers of the frames already recorded
+        :param frame: the frame left
+        :param key: the key of the frame
+    '''
+    def __record_frame(self, frames, visited, frame, key):
+        if (frame[0]['name'], frame[5]) not in visited:
+            visited.add((frame[0]['name'], frame[5]))
+            frames.setdefault(frame[0]['name'], []).append(
+                [frame[5], frame[1], frame[2], frame[3], key, 0, frame[0]['provenance'] == "[]"])
+
+
+
+    '''
+        This method returns the steps appended to a chase with hierarchical numbering, with the numbers that
+        get_num_chase_graph would give them numbering the whole chase, continuing the numbering recorded
+        in the manifest by get_num_chase_graph (or by a previous call), which is updated.
+
+        The full numbering visits the chase depth-first: a frame of the visit leaves a step with a number
+        after numbering its children. The new steps are children added at the end of the frames of the facts
+        they consume, so each of these frames is resumed where it was left, in the order the frames were left,
+        and then the new ground facts are visited. Only the frames of the facts in the provenance of the
+        new steps are read from the manifest, so the time is proportional to the new steps and their numbers.
+
+        The steps already numbered cannot change, so None is returned if the full numbering would change them,
+        i.e., if a new step consumes a ground fact that is not the last one (the numbers of the following
+        ground facts would shift), or if it derives a fact that is already in the chase
+
+        :param chase: the steps appended to the chase
+        :param manifest: the IncrementalManifest with the state of the numbering
+    '''
+    def get_num_chase_delta(self, chase, manifest):
+        num_chase = [{'name': step['name'],
+                      'pattern': step['pattern'],
+                      'provenance': step['provenance'],
+                      'rule': step['rule'],
+                      'number': []} for step in chase]
+        consumers = self.__get_provenance_index(num_chase)
+        frames = manifest.get_entries(set(consumers).union(step['name'] for step in num_chase))
+        if any(step['name'] in frames for step in num_chase):
+            return None
+
+        num = manifest.get('num')
+        last_root = manifest.get('last_root')
+        resumed = sorted(((name, record) for name in consumers if name in frames for record in frames[name]),
+                         key=lambda resume: resume[1][4] + [float('inf')])
+        if any(record[6] and record[4] != last_root for _, record in resumed):
+            return None
+
+        visited = set()
+        for name, record in resumed:
+            frame = [{'name': name}, record[1], record[2], record[3], iter(consumers[name]), record[0]]
+            # the frames of the new steps are left before the resumed one, after the ones left in previous extensions
+            def on_leave(left, frame=frame, record=record):
+                if left is frame:
+                    record[1:4] = frame[1:4]
+                else:
+                    self.__record_frame(frames, visited, left, record[4] + [record[5]])
+                    record[5] += 1
+            self.__visit(frame, consumers, on_leave)
+            if record[6]:
+                num = int(record[1])
+
+        keys = [manifest.get('keys')]
+        def on_leave(frame):
+            self.__record_frame(frames, visited, frame, [keys[0]])
+            keys[0] += 1
+        for step in num_chase:
+            if step['provenance'] == "[]":  # ground fact
+                num += 1
+                num = int(self.__number_chain(step, consumers, str(num), on_leave))
+                last_root = [keys[0] - 1]
+
+        for name in consumers:
+            frames.setdefault(name, [])
+        for step in num_chase:
+            frames.setdefault(step['name'], [])
+        manifest.set_entries(frames)
+        manifest.set({'num': num, 'keys': keys[0], 'last_root': last_root})
+        return num_chase
 
 
 
@@ -101,101 +283,145 @@ class FilePreprocessor:
         This method creates a .json file with the chase graph with hierarchical numbering,
         such that each chase step includes a number that links it to its ancestor steps
         
+        In incremental mode a num_manifest.db file keeps the state of the numbering and the position
+        of the last step numbered in the chase file: the following calls only number the steps appended
+        to the chase since then, and append them to num_chase_graph.json, with the same numbers as
+        numbering the whole chase. When the new steps would change the numbers of the steps already
+        numbered (see get_num_chase_delta), the whole chase is numbered again and the manifest
+        records a new generation of the numbering
+        
         :param chase_path: path to the chase_graph.json file with the chase graph
         :param output_path: path to output file
+        :param incremental: whether to number only the steps appended since the previous call
     '''
-    def number_chase_graph(self, chase_path, output_path):
+    def number_chase_graph(self, chase_path, output_path, incremental=False):
         try:
-            self.__set_number_field_chase_graph(chase_path)
-            with open("temp_chase_graph.json") as c:
-                # deserialize chase file
-                chase = json.load(c)
-                with open(output_path + "num_chase_graph.json", "w") as nc:
-                    first_step = True
-                    
-                    num = 0
-                    for step in tqdm(chase):
-                        if step['provenance'] == "[]":  # ground fact
-                            # print(step)
-                            num += 1
-                            num = int(self.__number_chain(step, chase, str(num)))
-                            
-
-                    nc.write('[')
-                    for step in chase:
-                        nstep = {'name': step['name'],
-                                 'pattern': step['pattern'],
-                                 'provenance': step['provenance'],
-                                 'rule': step['rule'],
-                                 'number': step['number']}
-                        if first_step:
-                            first_step = False
-                        else:
-                            nc.write('\n,')
-                        json.dump(nstep, nc, separators=(",", ":"))
-                    nc.write('\n]')
-            os.remove('temp_chase_graph.json')
+            if not incremental:
+                with open(chase_path) as c:
+                    # deserialize chase file
+                    chase = json.load(c)
+                self.write_chase_graph(self.get_num_chase_graph(chase), output_path + "num_chase_graph.json")
+                return
+
+            manifest = IncrementalManifest(output_path + "num_manifest.db")
+            try:
+                num_chase = None
+                if manifest.get('offset') is not None:
+                    chase, offset = read_json_array_tail(chase_path, manifest.get('offset'))
+                    num_chase = self.get_num_chase_delta(chase, manifest)
+                    if num_chase is None:
+                        logging.info("The new steps change the numbers of the steps already numbered: "
+                                     "the whole chase is numbered again")
+                    else:
+                        append_json_array(output_path + "num_chase_graph.json", num_chase)
+                        manifest.set({'offset': offset, 'steps': manifest.get('steps') + len(chase)})
+
+                if num_chase is None:
+                    generation = manifest.get('generation', -1) + 1
+                    manifest.clear()
+                    chase, offset = read_json_array_tail(chase_path)
+                    self.write_chase_graph(self.get_num_chase_graph(chase, manifest), output_path + "num_chase_graph.json")
+                    manifest.set({'offset': offset, 'steps': len(chase), 'generation': generation})
+                manifest.commit()
+            finally:
+                manifest.close()
         except Exception as e:
             print(f"An error occurred: {e}")
 
-    def find_indexes(self, numbers, target):
-        """
-        Finds the indexes of the numbers in the list that sum to the target value.
-
-        Args:
-            numbers: A list of numbers.
-            target: The target value.
-
-        Returns:
-            A list of the indexes of the numbers in the list that sum to the target value.
-        """
-
-        indexes = []
-        for i in range(len(numbers)):
-            for j in range(i + 1, len(numbers)):
-                if numbers[i] + numbers[j] == target:
-                    indexes.append(i)
-                    indexes.append(j)
-        return indexes
-
     def combination_contributors(self, provenance, rule, name):
         # print(name)
         # print(provenance)
         final_value_var = rule.split('=msum')[0].split(', ')[-1]
-        head_var = rule.split(' :-')[0].split('(')[1].split(')')[0].split(',')
-        name = name.split(' :-')[0].split('(')[1].split(')')[0].split(',')
+        head_var = parse_fact(rule.split(' :-')[0]).args
+        name = parse_fact(name.split(' :-')[0]).args
         for i in range(len(head_var)):
             if head_var[i] == final_value_var:
                 final_value = float(name[i])
 
         sum_variable = rule.split('msum(')[1].split(',')[0]
-        predicate_var = rule.split(':- ')[1].split('),')[0].split('(')[1].split(',')
+        predicate_var = parse_fact(rule.split(':- ')[1].split('),')[0]).args
         if ')' in sum_variable:
             sum_variable = sum_variable.split(')')[0]
         for i in range(len(predicate_var)):
             if predicate_var[i] == sum_variable:
                 index = i
         
-        found = False
-        sum_contributor = []
-        for j in provenance:
-            contr = float(j.split('(')[1].split(')')[0].split(',')[index])
-            if contr == final_value:
-                real_provenance = [j]
-                found = True
-                break
-            sum_contributor.append(contr)
-
-        if found == False:
-            ind = self.find_indexes(sum_contributor, final_value)
-            real_provenance = list()
-            for k in ind:
-                real_provenance.append(provenance[k])
-        
+        # find the smallest subset of the provenance summing to the aggregated value
+        sum_contributor = [float(parse_fact(j).args[index]) for j in provenance]
+        real_provenance = [provenance[k] for k in self.contributor_solver.solve(sum_contributor, final_value)]
+
         if real_provenance == []:
             return provenance
         return real_provenance
 
+    '''
+        :param rule: a rule of the chase featuring an aggregation
+        :param groupby_cache: the group-by arguments already extracted for each rule
+    '''
+    def __get_groupby_args(self, rule, groupby_cache):
+        if rule not in groupby_cache:
+            aggregation = rule.split(', ')[-1]
+            # get the variable storing the aggregate value from the aggregation
+            aggrarg = aggregation.split('=')[0]
+            # get the head atom in the rule
+            headatom = rule[:-1].split(' :- ')[0]
+            # get the position of the group by arguments in the head atom
+            groupbyargs = parse_fact(headatom).args
+            groupbyargs_pos = tuple(i for i, arg in enumerate(groupbyargs) if arg != aggrarg)
+            groupby_cache[rule] = (aggregation, groupbyargs_pos)
+
+        return groupby_cache[rule]
+
+
+
+    '''
+        This method returns the chase graph updating the provenance of steps featuring aggregations
+        to include all the contributors to the previous steps for that execution of the aggregation.
+        The contributors are accumulated in a single forward pass, keyed by the aggregation formula,
+        the head predicate and the values of the group-by arguments
+        
+        :param chase: the deserialized chase_file 
+    '''
+    def get_aggr_chase_graph(self, chase):
+        aggr_chase = []
+        groupby_cache = {}
+        # running contributors for each execution of an aggregation
+        contributors = {}
+
+        for step in tqdm(chase):
+            step_provenance = step['provenance']
+            if step['rule']:
+                # if a step features an aggregation in the rule (for now only msum is of interest to us)
+                if 'msum' in step['rule']:
+                    aggregation, groupbyargs_pos = self.__get_groupby_args(step['rule'], groupby_cache)
+                    # get the values in the generated fact corresponding to the group-by arguments
+                    fact = step['name']
+                    groupbyvalues = parse_fact(fact).args
+                    key = (aggregation, fact[:fact.find("(")],
+                           tuple((i, groupbyvalues[i]) for i in groupbyargs_pos if i < len(groupbyvalues)))
+
+                    provenance = list(parse_provenance(step_provenance))
+                    # if there are previous contributors to that execution of the aggregation
+                    # update the provenance of the current step with them
+                    if key in contributors:
+                        provenance.extend(contributors[key])
+                        provenance = list(dict.fromkeys(provenance))
+                        provenance = self.combination_contributors(provenance, step['rule'], step['name'])
+                        step_provenance = "[" + ", ".join(provenance) + "]"
+                    else:
+                        contributors[key] = {}
+                    contributors[key].update(dict.fromkeys(provenance))
+
+            # chase step with updated provenance
+            aggr_chase.append({'name': step['name'],
+                               'pattern': step['pattern'],
+                               'provenance': step_provenance,
+                               'rule': step['rule']})
+
+        return aggr_chase
+
+
+
     '''
         This method creates a .json file with the chase graph updating the provenance of steps featuring aggregations
         to include all the contributors to the previous steps for that execution of the aggregation
@@ -208,94 +434,30 @@ class FilePreprocessor:
             with open(chase_path, 'r') as c:
                 # deserialize chase file
                 chase = json.load(c)
-
-                # create new output file or rewrite existing one
-                with open(output_path + "aggr_chase_graph.json", "w") as nc:
-                    first_step = True
-                    nc.write('[')
-
-                    for step in tqdm(chase):
-                        provenance = step['provenance']
-                        if step['rule']:
-                            # if a step features an aggregation in the rule (for now only msum is of interest to us)
-                            # aggregationmatch = re.search(r" (\w)=msum\(.+?\)", step['rule'])
-                            if 'msum' in step['rule']:
-                                # print('\n')
-                                # print(step['rule'])
-                                # print(step['name'])
-                                
-                                aggregation = step['rule'].split(', ')[-1]
-                                # get the variable storing the aggregate value from the aggregation
-                                aggrarg = aggregation.split('=')[0]
-                                # get the head atom in the rule
-                                headatom = step['rule'][:-1].split(' :- ')[0]
-                                # get the group by arguments and their position in the head atom
-                                groupbyargs = re.findall(r'\((.*?)\)', headatom)[0]
-                                groupbyargs_pos = {}
-                                for i, arg in enumerate(groupbyargs.split(',')):
-                                    if arg != aggrarg:
-                                        groupbyargs_pos[i] = arg
-                                # get the values in the generated fact corresponding to the group-by arguments
-                                fact = step['name']
-                                groupbyvalues = re.findall(r'\((.*?)\)', fact)[0]
-                                groupbyvalues_pos = {}
-                                for i, arg in enumerate(groupbyvalues.split(',')):
-                                    if i in groupbyargs_pos:
-                                        groupbyvalues_pos[i] = arg
-                                # for each step in the chase up until the current one
-                                # get the previous contributors to that execution of the aggregation
-                                for prevstep in chase:
-                                    if prevstep == step:
-                                        break
-                                    if prevstep['rule']:
-                                        # if the step features the same aggregation formula
-                                        # prevaggregationmatch = re.search(r"(\w)=msum\(.+?\)", prevstep['rule'])
-                                        if 'msum' in prevstep['rule']:
-                                            prevaggregationmatch = prevstep['rule'].split(', ')[-1]
-                                        # if the aggregation formula is the same as the current chase step
-                                            if prevaggregationmatch == aggregation:
-                                                prevfact = prevstep['name']
-                                                # if the name of the fact is the same as the current chase step
-                                                if prevfact[:prevfact.find("(")] == fact[:fact.find("(")]:
-                                                    prevfactargs = re.findall(r'\((.*?)\)', prevfact)[0]
-                                                    prevfactargs_pos = {}
-                                                    # print(prevfactargs)
-                                                    # get the values in the previous fact for the positions
-                                                    # corresponding to the ones in the group-by arguments
-                                                    for i, arg in enumerate(prevfactargs.split(',')):
-                                                        if i in groupbyvalues_pos:
-                                                            prevfactargs_pos[i] = arg
-
-                                                    # check that each value in a position corresponding to the
-                                                    # group-by args is the same as the current chase step
-                                                    if prevfactargs_pos != groupbyvalues_pos:
-                                                        continue
-
-                                                    # update the provenance of the current step
-                                                    # with the one of the previous contributor
-                                                    provenance = step['provenance'].split('[')[1].split(']')[0].split(', ')
-                                                    prevprovenance = prevstep['provenance'].split('[')[1].split(']')[0].split(', ')
-                                                    provenance.extend(prevprovenance)
-                                                    provenance = list(dict.fromkeys(provenance))
-                                                    provenance = self.combination_contributors(provenance, step['rule'], step['name'])
-                                                    step['provenance'] = "[" + ", ".join(provenance) + "]"
-
-                        # write chase step with updated provenance in the new json file
-                        nstep = {'name': step['name'],
-                                 'pattern': step['pattern'],
-                                 'provenance': step['provenance'],
-                                 'rule': step['rule']}
-                        if first_step:
-                            first_step = False
-                        else:
-                            nc.write('\n,')
-                        json.dump(nstep, nc, separators=(",", ":"))
-                    nc.write('\n]')
+            # create new output file or rewrite existing one
+            self.write_chase_graph(self.get_aggr_chase_graph(chase), output_path + "aggr_chase_graph.json")
         except Exception as e:
             print(f"An error occurred: {e}")
 
 
 
+    '''
+       This method reads a .csv file and yields its records as fact strings
+       
+       :param csv_path: the path to the .csv file, named after the predicate of the facts
+       :param has_header: if the .csv file has a header as first line
+    '''
+    def iter_csv_facts(self, csv_path, has_header):
+        with open(csv_path, 'r', newline='') as csv_file:
+            pred_name = os.path.splitext(os.path.basename(csv_path))[0]
+            reader = csv.reader(csv_file, delimiter=',')
+            if has_header:
+                next(reader, None)
+            for record in reader:
+                yield pred_name + "(" + ','.join(record) + ")"
+
+
+
     '''
        This method parses a .csv file into a .txt file with the records as strings
        
@@ -305,16 +467,8 @@ class FilePreprocessor:
     '''
     def parse_csv_to_txt(self, csv_path, output_path, has_header):
         try:
-            with open(csv_path, 'r', newline='') as csv_file:
-                pred_name = os.path.splitext(os.path.basename(csv_path))[0]
-                reader = csv.reader(csv_file, delimiter=',')
-                with open(output_path, "w") as txt_file:
-                    for record in reader:
-                        if has_header:
-                            has_header = False
-                        else:
-                            record_string = ','.join(record)
-                            fact = pred_name + "(" + record_string + ")"
-                            txt_file.write(fact + '\n')
+            with open(output_path, "w") as txt_file:
+                for fact in self.iter_csv_facts(csv_path, has_header):
+                    txt_file.write(fact + '\n')
         except Exception as e:
             print(f"An error occurred: {e}")
\ No newline at end of file
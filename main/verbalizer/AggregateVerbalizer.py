@@ -1,6 +1,19 @@
 import json
 import logging
 import collections
+import os
+from functools import lru_cache
+from ChaseGraphCache import load_chase_graph, get_stamp
+from parsedChase import parse_rule
+
+# number of parent numbers of hierarchical numbers kept in memory
+PARENT_NUMBER_CACHE_SIZE = 1 << 16
+
+# number of ancestries of hierarchical numbers kept in memory by each index, the least recently used ones are dropped first
+ANCESTRY_CACHE_SIZE = 1 << 16
+
+# number of chase graphs whose indexes are kept in memory, the least recently used ones are dropped first
+INDEXES_CACHE_SIZE = 4
 
 
 '''
@@ -16,160 +29,331 @@ class VerbalizationFinder:
     logging.getLogger().setLevel(logging.INFO)
 
     '''
-    Function to find parent verbalization
-        :param number: number of step for which we are looking for the verbalization
-        :param chase_verb: verbalized chase graph
-        :param explanation: list to append new verbalization
-    '''
-
-    def __find_verb(self, number, chase_verb, explanation, derived_facts):
-            for i in range(len(chase_verb)):
-                for j in range(len(chase_verb[i]['number'])):
-                    if chase_verb[i]['number'][j] == number:
-                        explanation.append(chase_verb[i]['sentence'])
-                        derived_facts.append(chase_verb[i]['derived_fact'])
-
-
-    def __find_parent(self, number, chase_verb, explanation, driver_numbers, already_visited, atom):
-        for i in range(len(chase_verb)):
-            if len(chase_verb[i]['number']) > 0:
-                origin_numbers = list()
-                components = list()
-                for j in range(len(chase_verb[i]['number'])):
-                    origin_numbers.append(chase_verb[i]['number'][j].split('.')[0])
-                    components.append(chase_verb[i]['number'])
-                origin_numbers = [x for x in origin_numbers if x != '']
-
-            for j in range(len(chase_verb[i]['number'])):
-                if len(already_visited) > 0:
-                    if chase_verb[i]['number'][j] == number and all(item in driver_numbers for item in origin_numbers) and all(item not in components[0] for item in already_visited):
-                        # print(components[0])
-                        # print(already_visited)
-                        explanation.append(chase_verb[i]['rule'])
-                        atom.append(chase_verb[i]['name'])
-                else:
-                    if chase_verb[i]['number'][j] == number and all(item in driver_numbers for item in origin_numbers):
-                        explanation.append(chase_verb[i]['rule'])
-                        atom.append(chase_verb[i]['name'])
-
-    '''
-        This method creates a .txt file with the verbalized explanation for the input fact
+        This method returns the verbalized explanation for the input fact: the list of its verbalized steps,
+        with the Verb_rule, atom and body of each one, or only the verbalization of the fact.
+        If an output path is given, the explanation is also written to verb_fact.json in it
 
         :param chase_path: path to verbalized chase graph file
         :param fact_to_explain: a fact in the chase to be explained
         :param explain_derivation: boolean to have explanation of the derivation or of individual edge
-        :param output_path: path to output file
+        :param output_path: path to output file, or None not to write it
     '''
 
     def verbalize_fact(self, chase_path, output_path, fact_to_explain, explain_derivation):
-        # Open chase graph verbalized
-        with open(chase_path) as c:
-            verbalized = json.load(c)
+        # Open chase graph verbalized, with its indexes kept between calls
+        session = get_explanation_session(chase_path)
+
+        # Retrieve the verbalization of the required fact and of all its previous steps,
+        # with the body atoms of each of them
+        explanation = session.explain(fact_to_explain, explain_derivation)
 
         # Text file to write explanation
-        with open(output_path + "verb_fact.json", "w") as out:
-            out.write('[')
-            first_step = True
-            # Delete vatom steps to allow retrival of real steps
-            # for i in range(len(verbalized)):
-            #     for j in range(len(verbalized[i]['number'])):
-            #         verbalized[i]['number'][j] = verbalized[i]['number'][j].replace('T','')
-
-            # List to store verbalizations
-            verbs = list()
-            atoms = list()
-            bodies = list()
-
-            # Loop through the verbalization to get the verbalization
-            # of the required fact, plus the corresponding number, by which
-            # we can then retrieve the previous steps
-            for j in range(len(verbalized)):
-                if verbalized[j]['derived_fact'] == fact_to_explain:
-                    K = verbalized[j]['number']
-                    verbs.append(verbalized[j]['sentence'])
-                    atoms.append(verbalized[j]['derived_fact'])
-                    break
-           
-            # Retrieve all previous verbalization steps
-            for k in range(len(K)): 
-                nested_verb = K[k].split('.')
-                for j in range(len(nested_verb)):
-                    parent_verb = ".".join([str(item) for item in K[k].split('.')[:-1]])
-                    self.__find_verb(parent_verb, verbalized, verbs, atoms)
-                    K[k] = parent_verb
-            
-            # Write in a file depending on the request
-            verbs = list(dict.fromkeys(verbs))
-            verbs.reverse()
-            atoms = list(dict.fromkeys(atoms))
-            atoms.reverse()
-            # Retrieve body atoms
-            for i in atoms:
-                for j in range(len(verbalized)):
-                    if verbalized[j]['derived_fact'] == i:
-                        bodies.append(verbalized[j]['body_atoms'])
-
-            if explain_derivation:
-                for step in range(len(verbs)):
-                        if first_step:
-                            first_step = False
-                        else:
-                            out.write('\n,')
-                        vstep = {"Verb_rule": verbs[step],
-                                 "atom": atoms[step],
-                                 "body": bodies[step]}
-                        json.dump(vstep, out, separators=(",", ":"))
-                out.write(']')
-            else:
-                out.write(verbs[0])
+        if output_path is not None:
+            with open(output_path + "verb_fact.json", "w") as out:
+                if explain_derivation:
+                    out.write('[' + '\n,'.join(json.dumps(vstep, separators=(",", ":")) for vstep in explanation) + ']')
+                else:
+                    out.write('[' + explanation)
+
+        return explanation
 
 
+    '''
+        This method returns the rules and the atoms of the derivation of a fact in the numbered chase graph
+
+        :param file1_path: path to numbered chase graph file
+        :param fact_to_explain: a fact in the chase to be explained
+    '''
     def get_chase_fact(self, file1_path, fact_to_explain):
-        with open(file1_path) as c:
-            num_chase_graph = json.load(c)
-        # print('\n')
-        # print(fact_to_explain)
-        rules = list()
-        atom = list()
-        new_chase = list()
-        for i in range(len(num_chase_graph)):
-            if num_chase_graph[i]['name'] == fact_to_explain:
-                rules.append(num_chase_graph[i]['rule'])
-                atom.append(num_chase_graph[i]['name'])
-                number = num_chase_graph[i]['number']
+        return next(self.get_chase_facts(file1_path, [fact_to_explain]))
+
+
+    '''
+        This method yields the rules and the atoms of the derivation of each fact in the numbered chase graph,
+        indexing the chase only once for all of them
+
+        :param file1_path: path to numbered chase graph file
+        :param facts_to_explain: an iterable over the facts in the chase to be explained
+    '''
+    def get_chase_facts(self, file1_path, facts_to_explain):
+        index = get_derivation_index(file1_path)
+        for fact_to_explain in facts_to_explain:
+            yield index.get_derivation(fact_to_explain)
+
+
+
+'''
+    This class explains the facts of a verbalized chase graph, looking up its steps by hierarchical number
+    and by derived fact in the arrays of its ChaseGraphCache, without scanning the chase for each one.
+
+    The steps above a number are the steps of its parent number, followed by the steps above the parent:
+    the ancestry of each number is memoized as a node linking the steps of the parent to the ancestry of the parent,
+    so that the derivations sharing a prefix reuse it, and each memoized number takes constant memory
+    however deep its derivation is
+'''
+class ExplanationSession:
+
+    logging.getLogger().setLevel(logging.INFO)
+
+
+    '''
+        :param chase_graph: the ChaseGraphCache of the verbalized chase graph
+    '''
+    def __init__(self, chase_graph):
+        self.chase_graph = chase_graph
+        # number -> positions of the steps with that number, in chase order
+        self.positions_by_number = chase_graph.index('number')
+        # derived fact -> positions of its steps, in chase order
+        self.positions_by_fact = chase_graph.index('derived_fact')
+        # number -> its ancestry node, as built by get_ancestry_node
+        self.ancestries = collections.OrderedDict()
+
+
+    '''
+        This method yields the verbalizations and the derived facts of the steps above a number,
+        from the closest one
+
+        :param number: number of step for which we are looking for the previous steps
+    '''
+    def get_ancestry(self, number):
+        node = get_ancestry_node(self.ancestries, number, self.__get_steps)
+        while node is not None:
+            _, parents, node = node
+            yield from parents
+
+
+    '''
+        This method returns the verbalizations and the derived facts of the steps with a number, in chase order
+
+        :param number: a hierarchical number
+    '''
+    def __get_steps(self, number):
+        return tuple((self.chase_graph.get_string('sentence', i), self.chase_graph.get_string('derived_fact', i))
+                     for i in self.positions_by_number.get(number, ()))
+
+
+    '''
+        This method returns the verbalizations of the steps deriving a fact, from the first one,
+        with the derived facts and their body atoms
+
+        :param fact_to_explain: a fact in the chase to be explained
+    '''
+    def get_derivation(self, fact_to_explain):
+        if fact_to_explain not in self.positions_by_fact:
+            raise KeyError(f"{fact_to_explain} is not derived in the chase")
+        position = self.positions_by_fact[fact_to_explain][0]
+        verbs = [self.chase_graph.get_string('sentence', position)]
+        atoms = [fact_to_explain]
+
+        # Retrieve all previous verbalization steps, through the prefixes of each number of the fact
+        for number in self.chase_graph.get_strings('number', position):
+            for sentence, derived_fact in self.get_ancestry(number):
+                verbs.append(sentence)
+                atoms.append(derived_fact)
+
+        verbs = list(dict.fromkeys(verbs))
+        verbs.reverse()
+        atoms = list(dict.fromkeys(atoms))
+        atoms.reverse()
+        # Retrieve body atoms
+        bodies = [self.chase_graph.get_string('body_atoms', step)
+                  for atom in atoms for step in self.positions_by_fact.get(atom, ())]
+        return tuple(verbs), tuple(atoms), tuple(bodies)
+
+
+    '''
+        This method returns the explanation of a fact: the list of its verbalized steps,
+        or the verbalization of the first one only
+
+        :param fact_to_explain: a fact in the chase to be explained
+        :param explain_derivation: boolean to have explanation of the derivation or of individual edge
+    '''
+    def explain(self, fact_to_explain, explain_derivation = True):
+        verbs, atoms, bodies = self.get_derivation(fact_to_explain)
+        if not explain_derivation:
+            return verbs[0]
+        return [{"Verb_rule": verbs[step],
+                 "atom": atoms[step],
+                 "body": bodies[step]} for step in range(len(verbs))]
+
+
+'''
+    This function returns the number of the parent step of a hierarchical number, e.g., 1.2 for 1.2.3
+
+    :param number: a hierarchical number
+'''
+@lru_cache(maxsize=PARENT_NUMBER_CACHE_SIZE)
+def get_parent_number(number):
+    return ".".join(number.split('.')[:-1])
+
+
+'''
+    This function returns the ancestry node of a hierarchical number: a tuple with its parent number,
+    the entries of the parent number and the ancestry node of the parent number, or None above the top-level numbers.
+    Following the nodes gives the numbers above the number, from its parent to the empty one,
+    e.g., 1.2, 1 and the empty number for 1.2.3.
+
+    The nodes are memoized in a bounded cache, and a new node only links to the one of its parent,
+    so that the numbers sharing a prefix share its nodes instead of copying them
+
+    :param ancestries: the cache of the ancestry nodes, by number
+    :param number: a hierarchical number
+    :param get_entries: a function returning the entries of a number, e.g., its steps in the chase
+'''
+def get_ancestry_node(ancestries, number, get_entries):
+    # go up to the closest number whose node is already known
+    pending = list()
+    node = None
+    while number is not None:
+        if number in ancestries:
+            ancestries.move_to_end(number)
+            node = ancestries[number]
+            break
+        pending.append(number)
+        number = get_parent_number(number) if '.' in number else None
+
+    # and link the nodes of the numbers below it
+    for number in reversed(pending):
+        parent_number = get_parent_number(number)
+        node = (parent_number, get_entries(parent_number), node)
+        ancestries[number] = node
+    while len(ancestries) > ANCESTRY_CACHE_SIZE:
+        ancestries.popitem(last=False)
+    return node
+
+
+# explanation sessions of the verbalized chase graphs already loaded, by path, from the least recently used
+explanation_sessions = collections.OrderedDict()
+
+'''
+    This function returns the explanation session of a verbalized chase graph,
+    reusing the one already built as long as the file has not changed
+
+    :param chase_path: path to verbalized chase graph file
+'''
+def get_explanation_session(chase_path):
+    return get_chase_index(explanation_sessions, chase_path, ExplanationSession)
+
+
+'''
+    This function returns the index of a chase graph kept in a cache of indexes, building it again
+    when the file has changed since it was built, and dropping the least recently used ones
+
+    :param indexes: the cache of the indexes, by path
+    :param chase_path: path to the chase graph file
+    :param build_index: a function building the index from the ChaseGraphCache of the chase graph
+'''
+def get_chase_index(indexes, chase_path, build_index):
+    key = os.path.abspath(chase_path)
+    if key not in indexes or indexes[key][0] != get_stamp(chase_path):
+        cache = load_chase_graph(chase_path)
+        indexes[key] = (cache.stamp, build_index(cache))
+    indexes.move_to_end(key)
+    while len(indexes) > INDEXES_CACHE_SIZE:
+        indexes.popitem(last=False)
+    return indexes[key][1]
+
+
+
+'''
+    This class finds the derivation of the facts of a numbered chase graph, looking up its steps by name
+    and by hierarchical number in the arrays of its ChaseGraphCache, without scanning the chase for each of their ancestors.
+    The derivation of a fact is collected through the ancestry nodes of its numbers,
+    memoized and shared as the ones of ExplanationSession
+'''
+class DerivationIndex:
+
+    logging.getLogger().setLevel(logging.INFO)
+
+
+    '''
+        :param chase_graph: the ChaseGraphCache of the numbered chase graph
+    '''
+    def __init__(self, chase_graph):
+        self.chase_graph = chase_graph
+        # name -> positions of its steps, in chase order
+        self.positions_by_fact = chase_graph.index('name')
+        # number -> positions of the steps with that number, once for each time it occurs in the step
+        self.positions_by_number = chase_graph.index('number')
+        # number -> its ancestry node, as built by get_ancestry_node
+        self.ancestries = collections.OrderedDict()
+
+
+    '''
+        This method returns the position, the rule, the name, the numbers and the top-level numbers of the steps
+        with a number, in chase order, once for each time the number occurs in the step
+
+        :param number: a hierarchical number
+    '''
+    def __get_steps(self, number):
+        steps = list()
+        for i in self.positions_by_number.get(number, ()):
+            numbers = frozenset(self.chase_graph.get_strings('number', i))
+            steps.append((int(i), self.chase_graph.get_string('rule', i), self.chase_graph.get_string('name', i),
+                          numbers, frozenset(n.split('.')[0] for n in numbers) - {''}))
+        return tuple(steps)
+
+
+    '''
+        This method returns the steps before a position in the chase with the given number,
+        whose top-level numbers are all among the driver ones and whose numbers have not been visited
+
+        :param steps: the steps with the number for which we are looking for the parents, as returned by __get_steps
+        :param position: position of the first step of the fact to explain
+        :param driver_numbers: top-level numbers of the fact to explain
+        :param already_visited: numbers already visited
+    '''
+    def __find_parent(self, steps, position, driver_numbers, already_visited):
+        parents = list()
+        for step in steps:
+            if step[0] >= position:
                 break
-            else:
-                new_chase.append(num_chase_graph[i])
+            if step[4] <= driver_numbers and step[3].isdisjoint(already_visited):
+                parents.append(step)
+        return parents
 
-        num_chase_graph = new_chase.copy()
 
-        driver_numbers = list()
-        for i in range(len(number)):
-            driver_numbers.append(number[i].split('.')[0])
-        # print(rules)
-        # print(driver_numbers)
+    '''
+        This method returns the rules and the atoms of the derivation of a fact
 
-        visit = list()
+        :param fact_to_explain: a fact in the chase to be explained
+    '''
+    def get_derivation(self, fact_to_explain):
+        if fact_to_explain not in self.positions_by_fact:
+            raise KeyError(f"{fact_to_explain} is not derived in the chase")
+        position = self.positions_by_fact[fact_to_explain][0]
+        rules = [self.chase_graph.get_string('rule', position)]
+        atom = [fact_to_explain]
+        number = self.chase_graph.get_strings('number', position)
+        driver_numbers = frozenset(n.split('.')[0] for n in number)
+
+        visit = set()
         number.reverse()
 
-            # Retrieve all previous verbalization steps
+        # Retrieve all previous steps
         for i in range(len(number)):
-            nested_verb = number[i].split('.')
-            for j in range(len(nested_verb)):
-                parent_verb = ".".join([str(item) for item in number[i].split('.')[:-1]])
-                # print(visit)
-                # print(parent_verb)
-                self.__find_parent(parent_verb, num_chase_graph, rules, driver_numbers, visit, atom)
-                visit.append(parent_verb)
-                # print(atom[-1])
-                number[i] = parent_verb
-
-        # rules = list(dict.fromkeys(rules))
+            node = get_ancestry_node(self.ancestries, number[i], self.__get_steps)
+            while node is not None:
+                parent_verb, steps, node = node
+                for parent in self.__find_parent(steps, position, driver_numbers, visit):
+                    rules.append(parent[1])
+                    atom.append(parent[2])
+                visit.add(parent_verb)
 
         atom = [atom[ele] for ele in range(len(rules)) if rules[ele] != None]
-        rules = [ele for ele in rules if ele != None]
-        rules = [ele.replace('not ','not_').replace(' ','').replace('not_','not ') for ele in rules]
-        # rules.sort(reverse=True)
+        rules = [parse_rule(ele).compact for ele in rules if ele != None]
 
         return(rules, atom)
 
+
+# derivation indexes of the numbered chase graphs already loaded, by path, from the least recently used
+derivation_indexes = collections.OrderedDict()
+
+'''
+    This function returns the derivation index of a numbered chase graph,
+    reusing the one already built as long as the file has not changed
+
+    :param chase_path: path to numbered chase graph file
+'''
+def get_derivation_index(chase_path):
+    return get_chase_index(derivation_indexes, chase_path, DerivationIndex)
@@ -0,0 +1,473 @@
+import collections
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+from collections.abc import Mapping
+import numpy as np
+from parsedChase import parse_provenance
+
+# number of chase graphs kept mapped in memory, the least recently used one is dropped first
+LOADED_CHASE_GRAPHS = 4
+
+'''
+    This class stores a chase graph (chase_graph.json, aggr_chase_graph.json, num_chase_graph.json
+    or verb_chase_graph.json) in a compact binary file in the cache directory, and loads it with mmap.
+
+    The binary file holds a table with each distinct string once, sorted, and for each field of the steps
+    an integer array: the id of the string for plain fields, or offsets and ids for the list fields,
+    such as the provenance edges and the hierarchical numbers. For the fields of strings and lists of strings,
+    it also holds the positions of the steps with each string, in chase order, so that the steps are looked up
+    by name, by derived fact or by number without building any dictionary of the chase.
+    It is rebuilt automatically when the modification time and the hash of the .json file change
+'''
+class ChaseGraphCache:
+
+    logging.getLogger().setLevel(logging.INFO)
+
+    MAGIC = b'CHASEGC2'
+    HEADER_SIZE = 4096
+    # ids of the plain fields for None values and for steps without the field
+    NONE = -1
+    ABSENT = -2
+
+
+    '''
+        :param json_path: path to the .json file with the chase graph
+        :param cache_dir: directory of the binary files, get_default_cache_dir() if not given
+    '''
+    def __init__(self, json_path, cache_dir=None):
+        self.json_path = json_path
+        self.cache_dir = cache_dir if cache_dir else get_default_cache_dir()
+        self.cache_path = os.path.join(self.cache_dir, get_cache_name(json_path))
+        self.stamp = get_stamp(json_path)
+        self.__buffer = None
+
+        header = self.__read_header()
+        if header is None or (header['mtime'], header['size']) != self.stamp:
+            digest = self.__get_digest()
+            if header is not None and header['size'] == self.stamp[1] and header['sha256'] == digest:
+                # same content with a new modification time: only the header is updated
+                header['mtime'] = self.stamp[0]
+                self.__write_header(header)
+            elif not self.__build(digest):
+                return
+        self.__map()
+
+
+    # the binary file is mapped again from its path when the cache is sent to another process
+    def __reduce__(self):
+        return ChaseGraphCache, (self.json_path, self.cache_dir)
+
+
+    def __get_digest(self):
+        sha = hashlib.sha256()
+        with open(self.json_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+
+    '''
+        :param cache_path: path to a binary file, the one of this chase graph if not given
+    '''
+    def __read_header(self, cache_path=None):
+        try:
+            with open(cache_path if cache_path else self.cache_path, 'rb') as f:
+                raw = f.read(self.HEADER_SIZE)
+            if not raw.startswith(self.MAGIC):
+                return None
+            header = json.loads(raw[len(self.MAGIC):].decode('utf-8'))
+            if cache_path is None and header['json_path'] != os.path.abspath(self.json_path):
+                return None
+            return header
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+    '''
+        :param header: the metadata of the binary file
+    '''
+    def __encode_header(self, header):
+        raw = self.MAGIC + json.dumps(header).encode('utf-8')
+        if len(raw) > self.HEADER_SIZE:
+            raise ValueError("Too many fields for the header of the chase graph cache")
+        return raw.ljust(self.HEADER_SIZE, b' ')
+
+
+    '''
+        :param header: the metadata of the binary file
+    '''
+    def __write_header(self, header):
+        try:
+            with open(self.cache_path, 'r+b') as f:
+                f.write(self.__encode_header(header))
+        except OSError as e:
+            logging.info(f"Chase graph cache not updated: {e}")
+
+
+    '''
+        :param chase: the deserialized chase graph
+    '''
+    def __get_fields(self, chase):
+        fields = list()
+        for step in chase:
+            for field in step:
+                if field not in fields:
+                    fields.append(field)
+
+        kinds = dict()
+        for field in fields:
+            values = [step.get(field, self) for step in chase]
+            if all(isinstance(v, list) and all(isinstance(x, str) for x in v) for v in values):
+                kinds[field] = 'list'
+            elif all(isinstance(v, str) and v.startswith('[') and v.endswith(']')
+                     and "[" + ", ".join(parse_provenance(v)) + "]" == v for v in values):
+                # provenances are stored as the edges towards the facts they list
+                kinds[field] = 'provenance'
+            elif all(v is None or v is self or isinstance(v, str) for v in values):
+                kinds[field] = 'str'
+            else:
+                kinds[field] = 'json'
+        return fields, kinds
+
+
+    '''
+        This method returns the positions of the steps with each string in a field, in chase order:
+        the start of the positions of each string id, and the positions
+
+        :param ids: the ids of the strings in the field, or -1 and -2 for None and for missing values
+        :param owners: the position of the step of each id
+        :param count: the number of strings in the table
+    '''
+    def __get_inverse(self, ids, owners, count):
+        present = ids >= 0
+        ids, owners = ids[present], owners[present]
+        starts = np.zeros(count + 1, dtype=np.int64)
+        starts[1:] = np.cumsum(np.bincount(ids, minlength=count), dtype=np.int64)
+        # the sort is stable, so the steps of each string stay in chase order
+        positions = owners[np.argsort(ids, kind='stable')].astype(np.int32)
+        return starts, positions
+
+
+    '''
+        This method writes the binary file from the .json file, and returns False
+        if it could not be written, in which case the arrays are kept in memory
+
+        :param digest: the hash of the .json file
+    '''
+    def __build(self, digest):
+        with open(self.json_path) as c:
+            chase = json.load(c)
+        fields, kinds = self.__get_fields(chase)
+
+        string_ids = dict()
+        def intern(string):
+            if string not in string_ids:
+                string_ids[string] = len(string_ids)
+            return string_ids[string]
+
+        columns = list()
+        for field in fields:
+            if kinds[field] in ('list', 'provenance'):
+                offsets = [0]
+                ids = list()
+                for step in chase:
+                    values = step[field] if kinds[field] == 'list' else parse_provenance(step[field])
+                    ids.extend(intern(v) for v in values)
+                    offsets.append(len(ids))
+                columns.append((field, np.asarray(offsets, dtype=np.int64), np.asarray(ids, dtype=np.int32)))
+            else:
+                ids = list()
+                for step in chase:
+                    if field not in step:
+                        ids.append(self.ABSENT)
+                    elif step[field] is None and kinds[field] == 'str':
+                        ids.append(self.NONE)
+                    elif kinds[field] == 'str':
+                        ids.append(intern(step[field]))
+                    else:
+                        ids.append(intern(json.dumps(step[field])))
+                columns.append((field, None, np.asarray(ids, dtype=np.int32)))
+
+        # sort the strings, so that their ids are found by binary search, and renumber the ids
+        strings = sorted(string_ids)
+        rank = np.empty(len(strings), dtype=np.int32)
+        rank[[string_ids[s] for s in strings]] = np.arange(len(strings), dtype=np.int32)
+        encoded = [s.encode('utf-8') for s in strings]
+        blob = b''.join(encoded)
+        string_offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+        string_offsets[1:] = np.cumsum([len(s) for s in encoded], dtype=np.int64)
+
+        arrays = [('strings.offsets', string_offsets)]
+        for field, offsets, ids in columns:
+            ids = np.where(ids >= 0, rank[np.maximum(ids, 0)], ids).astype(np.int32) if len(rank) else ids
+            if offsets is None:
+                arrays.append((field + '.ids', ids))
+                owners = np.arange(len(chase), dtype=np.int64)
+            else:
+                arrays.append((field + '.offsets', offsets))
+                arrays.append((field + '.ids', ids))
+                owners = np.repeat(np.arange(len(chase), dtype=np.int64), np.diff(offsets))
+            if kinds[field] in ('str', 'list'):
+                starts, positions = self.__get_inverse(ids, owners, len(strings))
+                arrays.append((field + '.starts', starts))
+                arrays.append((field + '.positions', positions))
+
+        # lay out the arrays after the header, aligned to 8 bytes, followed by the text of the strings
+        sections = dict()
+        position = self.HEADER_SIZE
+        for name, array in arrays:
+            sections[name] = [position, str(array.dtype), len(array)]
+            position += (array.nbytes + 7) // 8 * 8
+        sections['strings.text'] = [position, 'utf-8', len(blob)]
+
+        header = {'version': 2, 'json_path': os.path.abspath(self.json_path), 'mtime': self.stamp[0],
+                  'size': self.stamp[1], 'sha256': digest, 'steps': len(chase), 'strings': len(strings),
+                  'fields': fields, 'kinds': kinds, 'sections': sections}
+
+        temp_path = self.cache_path + '.' + str(os.getpid()) + '.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(self.__encode_header(header))
+                for name, array in arrays:
+                    f.write(array.tobytes())
+                    f.write(b'\0' * ((-array.nbytes) % 8))
+                f.write(blob)
+            # replace atomically, so that concurrent readers never see a partial file
+            os.replace(temp_path, self.cache_path)
+            self.__remove_stale()
+            return True
+        except OSError as e:
+            logging.info(f"Chase graph cache not written: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self.__header = header
+            self.__arrays = dict(arrays)
+            self.__blob = blob
+            return False
+
+
+    '''
+        This method removes the binary files of the chase graphs whose .json file does not exist anymore
+    '''
+    def __remove_stale(self):
+        for cache_path in glob.glob(os.path.join(glob.escape(self.cache_dir), '*.chase.cache')):
+            header = self.__read_header(cache_path)
+            if header is not None and not os.path.exists(header['json_path']):
+                try:
+                    os.remove(cache_path)
+                except OSError as e:
+                    logging.info(f"Stale chase graph cache not removed: {e}")
+
+
+    def __map(self):
+        with open(self.cache_path, 'rb') as f:
+            self.__buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__header = json.loads(self.__buffer[len(self.MAGIC):self.HEADER_SIZE].decode('utf-8'))
+        self.__arrays = dict()
+        for name, (offset, dtype, count) in self.__header['sections'].items():
+            if name != 'strings.text':
+                self.__arrays[name] = np.frombuffer(self.__buffer, dtype=dtype, count=count, offset=offset)
+        offset, _, count = self.__header['sections']['strings.text']
+        # the strings are decoded one at a time from the mapped file
+        self.__blob = memoryview(self.__buffer)[offset:offset + count]
+
+
+    '''
+        This method returns the string with the given id in the table
+
+        :param string_id: the id of the string
+    '''
+    def get_text(self, string_id):
+        offsets = self.__arrays['strings.offsets']
+        return str(self.__blob[offsets[string_id]:offsets[string_id + 1]], 'utf-8')
+
+
+    '''
+        This method returns the id of a string in the table, by binary search, or -1 if it is not in the chase graph
+
+        :param text: the string
+    '''
+    def find_string(self, text):
+        low, high = 0, self.__header['strings']
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_text(middle) < text:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.__header['strings'] and self.get_text(low) == text:
+            return low
+        return -1
+
+
+    '''
+        This method returns the value of a field in a step, as json.load would, or None if the step has not the field
+
+        :param field: the name of the field, e.g., 'name'
+        :param position: the position of the step in the chase
+    '''
+    def get_string(self, field, position):
+        kind = self.__header['kinds'][field]
+        if kind == 'list':
+            return self.get_strings(field, position)
+        if kind == 'provenance':
+            return "[" + ", ".join(self.get_strings(field, position)) + "]"
+        string_id = self.__arrays[field + '.ids'][position]
+        if string_id < 0:
+            return None
+        if kind == 'json':
+            return json.loads(self.get_text(string_id))
+        return self.get_text(string_id)
+
+
+    '''
+        This method returns the strings of a list field in a step, e.g., its numbers or the facts of its provenance
+
+        :param field: the name of the field, e.g., 'number'
+        :param position: the position of the step in the chase
+    '''
+    def get_strings(self, field, position):
+        offsets = self.__arrays[field + '.offsets']
+        return [self.get_text(string_id) for string_id in self.__arrays[field + '.ids'][offsets[position]:offsets[position + 1]]]
+
+
+    '''
+        This method returns the positions of the steps with a string in a field, in chase order,
+        once for each time the string occurs in a list field
+
+        :param field: the name of the field, e.g., 'name' or 'number'
+        :param text: the string
+    '''
+    def get_positions(self, field, text):
+        string_id = self.find_string(text)
+        positions = self.__arrays[field + '.positions']
+        if string_id < 0:
+            return positions[:0]
+        starts = self.__arrays[field + '.starts']
+        return positions[starts[string_id]:starts[string_id + 1]]
+
+
+    '''
+        This method returns the positions of the steps by string of a field, as a read-only mapping
+
+        :param field: the name of the field, e.g., 'name' or 'number'
+    '''
+    def index(self, field):
+        return FieldIndex(self, field)
+
+
+    '''
+        This method returns the strings occurring in a field, with the position of their first step,
+        in the order of the table
+
+        :param field: the name of the field, e.g., 'pattern'
+    '''
+    def first_positions(self, field):
+        starts = self.__arrays[field + '.starts']
+        positions = self.__arrays[field + '.positions']
+        for string_id in np.flatnonzero(starts[1:] > starts[:-1]).tolist():
+            yield self.get_text(string_id), int(positions[starts[string_id]])
+
+
+    '''
+        This method tells whether the .json file has changed since the graph was loaded
+    '''
+    def is_stale(self):
+        return get_stamp(self.json_path) != self.stamp
+
+
+    def __len__(self):
+        return self.__header['steps']
+
+
+
+'''
+    This class gives the positions of the steps of a chase graph by string of a field,
+    reading them from the arrays of its ChaseGraphCache
+'''
+class FieldIndex(Mapping):
+
+    '''
+        :param chase_graph: the ChaseGraphCache of the chase graph
+        :param field: the name of the field, e.g., 'name' or 'number'
+    '''
+    def __init__(self, chase_graph, field):
+        self.chase_graph = chase_graph
+        self.field = field
+
+
+    '''
+        :param text: a string of the field
+    '''
+    def __getitem__(self, text):
+        positions = self.chase_graph.get_positions(self.field, text)
+        if len(positions) == 0:
+            raise KeyError(text)
+        return positions
+
+
+    def __iter__(self):
+        return (text for text, _ in self.chase_graph.first_positions(self.field))
+
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+'''
+    This function returns the modification time and the size of a file
+
+    :param path: path to the file
+'''
+def get_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+'''
+    This function returns the name of the binary file of a chase graph, one for each path of .json file
+
+    :param json_path: path to the .json file with the chase graph
+'''
+def get_cache_name(json_path):
+    return hashlib.sha256(os.path.abspath(json_path).encode('utf-8')).hexdigest()[:32] + '.chase.cache'
+
+
+'''
+    This function returns the default directory of the chase graph cache:
+    the CHASE_GRAPH_CACHE_DIR environment variable if set, or else the chase_graphs folder in the user cache directory
+    ($XDG_CACHE_HOME, ~/.cache if not set)
+'''
+def get_default_cache_dir():
+    cache_dir = os.environ.get('CHASE_GRAPH_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    user_cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(user_cache_dir, 'template-based-inference', 'chase_graphs')
+
+
+# chase graphs already loaded in this process, by path of the .json file, from the least recently used
+loaded_chase_graphs = collections.OrderedDict()
+
+'''
+    This function returns the cache of a chase graph, reusing the one already loaded
+    in this process as long as the .json file has not changed
+
+    :param json_path: path to the .json file with the chase graph
+    :param cache_dir: directory of the binary files, get_default_cache_dir() if not given
+'''
+def load_chase_graph(json_path, cache_dir=None):
+    key = os.path.abspath(json_path)
+    cache = loaded_chase_graphs.get(key)
+    if cache is None or cache.is_stale() or (cache_dir and cache.cache_dir != cache_dir):
+        cache = ChaseGraphCache(json_path, cache_dir)
+        loaded_chase_graphs[key] = cache
+    loaded_chase_graphs.move_to_end(key)
+    while len(loaded_chase_graphs) > LOADED_CHASE_GRAPHS:
+        loaded_chase_graphs.popitem(last=False)
+    return cache
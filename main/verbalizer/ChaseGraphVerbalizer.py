@@ -1,6 +1,15 @@
 import json
 import logging
-from utilsFunctions import split_condition_from_rule
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from utilsFunctions import iter_json_array, read_json_array_tail, append_json_array
+from parsedChase import parse_fact, parse_provenance
+from RuleSkeleton import get_rule_skeleton
+from ChaseIndex import ChaseIndex
+from ChaseGraphCache import load_chase_graph
+from IncrementalManifest import IncrementalManifest
+from PredicateGlossary import PredicateGlossary
 
 '''
     This class performs the verbalization of the chase graph.
@@ -29,79 +38,54 @@ class ChaseGraphVerbalizer:
 
 
     '''
-        :param preds_descr: the deserialized pred_file
+        :param glossary: the compiled pred_file
         :param fact: a fact in the chase of that predicate
         :param fact_pattern: the pattern of the args in the fact
         :param nulls_in_step: a list of nulls already verbalized for the current chase step    
     '''
-    def __get_fact_description(self, preds_descr, fact, fact_pattern, nulls_in_step):
+    def __get_fact_description(self, glossary, fact, fact_pattern, nulls_in_step):
         # extract name, args and pattern of the current fact
-        fact_name = fact.partition('(')[0]
-        fact_args = fact.split('(')[1].split(')')[0].split(',')
-        fact_pattern_args = fact_pattern.split('(')[1].split(')')[0].split(',')
-
-        # for each predicate in the file (until the right description is found)
-        for pred_descr in preds_descr:
-            # extract name and args of the predicate
-            pred = pred_descr['predicate']
-            pred_name = pred.partition('(')[0]
-            pred_parts = pred.split('(')[1].split(')')[0].split(',')
-            # if the fact belongs to the current predicate
-            if pred_name == fact_name and len(pred_parts) == len(fact_args):
-                # extract the description of the predicate
-                fact_descr = pred_descr['description']
-                # extract the specifics of the predicate terms
-                pred_terms_specifics = pred_descr['specifics']['terms']
-
-                # verbalize the fact according to the description of the predicate
-                # by substituting the generic args of the predicate with the real ones of the fact
-                for i in range(len(pred_parts)):
-                    fact_arg = fact_args[i]
-                    # if this arg is a null and it has not already been encountered in the current chase step
-                    if int(fact_pattern_args[i]) < 0 and fact_arg not in nulls_in_step:
-                        # verbalize the new null
-                        fact_descr = fact_descr.replace(pred_parts[i],
-                                                        "there exists some unknown entity labelled as " + fact_arg + " that")
-                        # update the list
-                        nulls_in_step.append(fact_arg)
-                    # if this arg is a constant or an already encountered null in the current chase step
-                    else:
-                        # verbalize the constant or the already encountered null
-                        # distinguish between constants corresponding to an entity or to a value
-                        constant_type = pred_terms_specifics[i]['type']
-                        if constant_type == 'entity':
-                            fact_arg = "\"" + fact_arg + "\""
-                        fact_descr = fact_descr.replace(pred_parts[i], ' ' + fact_arg)
-                # the chase step has been verbalized, so return it
-                return fact_descr
-        return None
+        parsed_fact = parse_fact(fact)
+        fact_args = parsed_fact.args
+        # the description of the predicate the fact belongs to
+        entry = glossary.get(parsed_fact.predicate, len(fact_args))
+        if entry is None:
+            return None
+        fact_pattern_args = parse_fact(fact_pattern).args
+
+        # verbalize the fact according to the description of the predicate
+        # by substituting the generic args of the predicate with the real ones of the fact
+        values = list()
+        for i in range(len(fact_args)):
+            fact_arg = fact_args[i]
+            # if this arg is a null and it has not already been encountered in the current chase step
+            if int(fact_pattern_args[i]) < 0 and fact_arg not in nulls_in_step:
+                # verbalize the new null
+                values.append("there exists some unknown entity labelled as " + fact_arg + " that")
+                # update the list
+                nulls_in_step.append(fact_arg)
+            # if this arg is a constant or an already encountered null in the current chase step
+            else:
+                # verbalize the constant or the already encountered null
+                # distinguish between constants corresponding to an entity or to a value
+                constant_type = entry['types'][i]
+                if constant_type == 'entity':
+                    fact_arg = "\"" + fact_arg + "\""
+                values.append(' ' + fact_arg)
+        # the chase step has been verbalized, so return it
+        return glossary.render(entry, values)
 
 
     '''
-        :param chase: the deserialized chase_file 
-        :param fact: a fact in the chase
-    '''
-    # def __get_fact_pattern(self, chase, fact):
-    #     for step in chase:
-    #         if step['name'] == fact:
-    #             return step['pattern']
-    #     return None
-    def __get_fact_pattern(self, chase, fact):
-        for step in chase:
-            if step['name'].split('(')[0] == str(fact).split('(')[0]:
-                return step['pattern']
-        return None
+        This method builds the index of the chase, with the provenance of each fact
+        and the pattern of each predicate, as given by their first step in the chase.
+        The index can be passed to get_verb_chase_graph and verbalize_chase_graph
+        to verbalize the same chase several times
 
-
-    '''
-        :param chase: the deserialized chase_file 
-        :param fact: a fact in the chase
+        :param steps: an iterable over the steps of the chase
     '''
-    def __get_fact_provenance(self, chase, fact):
-        for step in chase:
-            if step['name'] == fact:
-                return step['provenance']
-        return None
+    def build_index(self, steps):
+        return ChaseIndex(steps)
 
 
     '''
@@ -114,7 +98,8 @@ class ChaseGraphVerbalizer:
         negated_pred = step['rule'].split('not ')[1].split(')')[0] + ')'
         # each variable of the negated atom must have a ward in another predicate of the same rule
         need_ward = negated_pred.split('(')[1].split(')')[0].split(',')
-        predicate_rule = step['rule'].split(':-')[1].split('),')
+        predicate_rule = step['parsed_rule'].body
+        provenance = parse_provenance(step['provenance'])
 
         # as the provenance is null when there is a derived fact which depend on a negation
         # we have to "build" the negated fact by ourselves, exploting the feature of wardness
@@ -122,13 +107,13 @@ class ChaseGraphVerbalizer:
             # for each variable of the negated atom we must find the ward
             for i in range(len(predicate_rule)):
                 # check which atom is warding, excluding negated ones
-                if predicate_rule[i][:3] != 'not ':
+                if not predicate_rule[i].text.startswith('not '):
                     # for each predicate look at its contents
-                    var_pred = str(str(predicate_rule[i]).split('(')[1]).replace(')','').split(',')
+                    var_pred = predicate_rule[i].args
                     # loop to check which one is used in negation
                     for j in range(len(var_pred)):
                         if need_ward[k] == var_pred[j]:
-                            null_descr = str(str(str(step['provenance'].split('[')[1].split(']')[0].split(', ')[i]).split('(')[1]).split(')')[0]).split(',')[j]
+                            null_descr = parse_fact(provenance[i]).args[j]
                             need_ward[k] = null_descr
 
 
@@ -138,450 +123,568 @@ class ChaseGraphVerbalizer:
 
 
     '''
-        :param condition: a condition of a rule
-        :param step: a step of the chase
+        This method verbalizes a single step of the chase and returns the verbalized step,
+        or None if the step has no verbalization (e.g., a temporary atom)
+
+        :param step: a step of the chase, with rule already split from conditions and algebric operations
+        :param index: the index of the chase built by build_index
+        :param glossary: the compiled pred_file
+        :param state: the conditions and temporary provenance carried over from the previous steps
     '''
-    def __get_conditioned_fact(self, condition, step):
-        # identify the variable subject to condition
-        condition = condition.split('>=')[0]
-        condition = condition.split('<=')[0]
-        condition = condition.split('<>')[0]
-        condition = condition.split('!=')[0]
-        condition = condition.split('>')[0]
-        condition = condition.split('<')[0]
-        condition = condition.split('=')[0]
-        # extract from body the predicates and split them
-        predicate_rule = step['rule'].split(':-')[1].split('.')[0].split('),')
-        # identify through the provenance the corresponing realization subject to condition
-        for i in range(len(predicate_rule)):
-            if predicate_rule[i][:3] != 'not ':
-                var_pred = str(str(predicate_rule[i]).split('(')[1].replace(')','')).split(',')
-                for j in range(len(var_pred)):
-                    if condition == var_pred[j]:
-                        null_descr = str(str(str(step['provenance'].split('[')[1].split(']')[0].split(', ')[i]).split('(')[1]).split(')')[0]).split(',')[j]
-                        condition = null_descr
-
-        return condition
+    def __verbalize_step(self, step, index, glossary, state):
+        realized_atom = list()
+        nulls_in_step = []  # list to keep track of nulls in that step
+        # extract from provenance the facts activating the body of the rule
+        body = list(parse_provenance(step['provenance']))
+
+        # Retrieve contributors to msum
+        if step['algebric'] and len(body)>1:
+            if 'msum' in step['algebric'][0]:
+                multiple = list()
+                for join_fact_temp in body:
+                        if 'vatom' in join_fact_temp:
+                            multiple += index.get_provenance(join_fact_temp)
+                        else:
+                            multiple += [join_fact_temp]
+                # expand the nested vatoms with their memoized real facts
+                body = index.expand_provenance(multiple)
+                state['replace_temp'] = "["
+                state['is_temp'] = True
+
+        # if it is a chase step, i.e., it involves the derivation of an intensional fact
+        if body[0] and body[0] != 'null':
+            # verbalize the body
+            body_descr = ""
+            # this is the case of linear rules
+            if len(body) == 1:
+                state['is_temp'] = False
+                # extract the pattern of the body fact:
+                # if it is not a temporal atom (vatom) it can be verbalized, otherwise
+                # it must be further expanded with its provenance
+                if body[0][:5] != 'vatom':
+                    body_pattern = index.get_pattern(body[0])
+                    # verbalize the linear body
+                    body_descr = "Since " + self.__get_fact_description(glossary, body[0],
+                                                                        body_pattern, nulls_in_step)
+                    realized_atom.append(body[0])
+
+                else:
+                    body = index.get_provenance(body[0])
+                    # change boolean to indicate that temporal provenance atoms must be replaced iteratively
+                    state['is_temp'] = True
+                    # new provenance for temporal atom
+                    state['replace_temp'] = "["
+
+            # this is the case of join rules
+            if len(body) > 1:
+                # for each temp fact involved in the join
+                for join_fact_temp in body:
+                    # check if there is a negated atom
+                    if join_fact_temp != 'null' and parse_fact(join_fact_temp).predicate not in glossary.names:
+                        # determine the real fact involved in the join by extracting
+                        # the provenance of the temp one
+                        # temp facts (used for joins) will always have a single fact as provenance
+                        join_fact_real = index.get_provenance(join_fact_temp)
+
+                        for multiple_real_facts in join_fact_real:
+                            if state['is_temp']:
+                                if multiple_real_facts:
+                                    state['replace_temp'] += multiple_real_facts + ', '
+                                else:
+                                    state['replace_temp'] += join_fact_temp + ', '
+
+                            else:
+                                # extract the pattern of the real body fact
+                                body_pattern = index.get_pattern(multiple_real_facts)
+                                # verbalize the join body
+                                # distinct verbalization if it is the first fact in the join
+                                if body_descr == "":
+                                    body_descr = "Since " \
+                                                + self.__get_fact_description(glossary, multiple_real_facts,
+                                                                                body_pattern, nulls_in_step)
+                                    realized_atom.append(multiple_real_facts)
+
+                                else:
+                                    body_descr += ", and " \
+                                                + self.__get_fact_description(glossary, multiple_real_facts,
+                                                                                body_pattern, nulls_in_step)
+                                    realized_atom.append(multiple_real_facts)
+
+                    # same things but for negated atoms
+                    elif join_fact_temp == 'null' and join_fact_temp.split('(')[0] not in glossary.names:
+                        if body_descr == "":
+                            negated_atom = self.__get_negated_fact(step)
+                            body_descr += 'Since it is not true that ' + \
+                                          self.__get_fact_description(glossary, negated_atom,
+                                                                        index.get_pattern(negated_atom),
+                                                                        nulls_in_step)
+                            realized_atom.append(negated_atom)
+                        else:
+                            negated_atom = self.__get_negated_fact(step)
+                            body_descr += ', and it is not true that ' + \
+                                          self.__get_fact_description(glossary, negated_atom,
+                                                                      index.get_pattern(negated_atom),
+                                                                      nulls_in_step)
+                            realized_atom.append(negated_atom)
+                    else:
+                        # if there is an algebric rule just need to replace the provenance with
+                        # the facts that were retrieved before
+                        state['replace_temp'] += join_fact_temp + ', '
+
+                if state['is_temp']:
+                    # replace provenance
+                    state['replace_temp'] = state['replace_temp'][:-2] + ']'
+                    step['provenance'] = state['replace_temp']
+                    state['is_temp'] = False
+
+
+            body = list(parse_provenance(step['provenance']))
+            if len(body) == 1:
+                body_pattern = index.get_pattern(body[0])
+                # verbalize the linear body
+                body_descr = "Since " + self.__get_fact_description(glossary, body[0],
+                                                                    body_pattern, nulls_in_step)
+                # realized_atom.append(body[0])
+
+
+            # in case of an algebric in the step
+            if len(body) > 1 and parse_fact(step['name']).predicate in glossary.names and not body_descr:
+
+                for predicates_operation in body:
+                    body_pattern = index.get_pattern(predicates_operation)
+                    if body_descr == "":
+                        body_descr = "Since " \
+                             + self.__get_fact_description(glossary, predicates_operation,
+                                                            body_pattern, nulls_in_step)
+                        realized_atom.append(predicates_operation)
+                    else:
+                        body_descr += ", and " \
+                            + self.__get_fact_description(glossary, predicates_operation,
+                                                            body_pattern, nulls_in_step)
+                        realized_atom.append(predicates_operation)
+
+            len_r = len(realized_atom)
+            if state['propagate_condition']:
+                realized_atom.append(state['propagate_condition'])
+                state['propagate_condition'] = None
+
+            algebric_descr = ""
+            # verbalize algebric operation
+            if len(step['algebric']) > 0:
+                for k, oper in enumerate(step['algebric']):
+                    if '=' in oper:
+                        algebric_descr += step['skeleton'].realize_algebric(k, step['name'], step['original_provenance'])
+                        realized_atom.append(oper)
+
+            # add verbalizations of (eventual) conditions
+            if len(step['conditions']) > 0:
+                if len(realized_atom) > len_r and len(step['algebric']) == 0:
+                    realized_atom = realized_atom[:-1]
+                # if there is a condition and no body descr yet, it means that
+                # it was a temporal atom and a description can be created
+                if len(body_descr) == 0:
+                    for predicates_operation in body:
+                        body_pattern = index.get_pattern(predicates_operation)
+                        if body_descr == "":
+                            body_descr = "Since " \
+                                + self.__get_fact_description(glossary, predicates_operation,
+                                                                body_pattern, nulls_in_step)
+                            realized_atom.append(predicates_operation)
+                        else:
+                            body_descr += ", and " \
+                                + self.__get_fact_description(glossary, predicates_operation,
+                                                                body_pattern, nulls_in_step)
+                            realized_atom.append(predicates_operation)
+                conditions_descr = ''
+                provenance = parse_provenance(step['provenance'])
+                for condition in step['skeleton'].conditions:
+                    cond = condition[0]
+                    # identify through the provenance the realizations on both sides of the condition
+                    conditioning_fact = step['skeleton'].resolve_conditioning(condition, provenance)
+                    conditioned_fact = None
+                    # different verbalization according to condition
+                    for verbalization, operator in condition[3]:
+                        if verbalization is None:
+                            conditions_descr += ', and there is ' + conditioning_fact.replace("\"",'')
+                            realized_atom.append(conditioning_fact.replace("\"",''))
+                            continue
+                        if conditioned_fact is None:
+                            conditioned_fact = step['skeleton'].resolve(condition[1], provenance)
+                        conditions_descr += ', and ' + conditioned_fact + verbalization + conditioning_fact
+                        realized_atom.append(conditioned_fact + operator + conditioning_fact)
+                state['conditions_descr'] = conditions_descr
+                state['cond'] = cond
+
+
+            # verbalize the head
+            head_name = step['name']
+            head_descr = self.__get_fact_description(glossary, head_name,
+                                                     step['pattern'], nulls_in_step)
+
+            # update the output file with the new verbalized step
+            if head_descr:
+                head_descr = ", then " + head_descr
+                # the conditions (and algebric operations) are verbalized only while a condition is pending,
+                # either of this step or propagated from a previous temporary atom
+                if state['cond'] is not None:
+                    chase_step_descr = body_descr + state['conditions_descr'] + head_descr + algebric_descr
+                    state['cond'] = None
+                else:
+                    chase_step_descr = body_descr + head_descr
+
+                if 'vatom' not in head_name:
+                    state['conditions_descr'] = ''
+
+                # delete double whitespaces
+                chase_step_descr = chase_step_descr.replace('  ',' ')
+                # remove the first character if it is a space
+                if chase_step_descr[0] == " ":
+                    chase_step_descr = chase_step_descr[1:]
+                # capitalize the first letter
+                chase_step_descr = chase_step_descr[0].upper() + chase_step_descr[1:]
+
+                return {"sentence": chase_step_descr + ".",
+                        "number": step['number'],
+                        "derived_fact": step['name'],
+                        "type": "intensional",
+                        "body_atoms": ','.join(realized_atom)}
+
+            else:
+                if state['cond'] is not None:
+                    state['propagate_condition'] = state['cond'] ## ADD MULTIPLE CONDITIONS
+                return None
+
+
+        # if instead it is an extensional ground fact
+        else:
+            fact_name = step['name']
+            chase_step_descr = self.__get_fact_description(glossary, fact_name,
+                                                           step['pattern'], nulls_in_step)
+            realized_atom.append(fact_name)
+
+            # delete double whitespaces
+            chase_step_descr = chase_step_descr.replace('  ',' ')
+            # remove the first character if it is a space
+            if chase_step_descr[0] == " ":
+                chase_step_descr = chase_step_descr[1:]
+            # capitalize the first letter
+            chase_step_descr = chase_step_descr[0].upper() + chase_step_descr[1:]
+
+            return {"sentence": chase_step_descr + ".",
+                    "number": step['number'],
+                    "derived_fact": step['name'],
+                    "type": "extensional",
+                    "body_atoms": ''}
+
 
     '''
-        :param condition: a condition of a rule
-        :param step: a step of the chase
+        This method returns the conditions and temporary provenance carried over
+        from one chase step to the next ones, as they are before the first step
     '''
-    # same thing but on the other side of the condition operator
-    # different things depending on whether the 'conditioning' is a number/string or another variable
-    def __get_conditioning_fact(self, condition, step):
-        try:
-            # identify the variable subject to condition
-            if '>=' in condition:
-                condition = condition.split('>=')[1]
-            if '<=' in condition:
-                condition = condition.split('<=')[1]
-            if '<>' in condition:
-                condition = condition.split('<>')[1]
-            if '!=' in condition:
-                condition = condition.split('!=')[1]
-            if '>' in condition:
-                condition = condition.split('>')[1]
-            if '<' in condition:
-                condition = condition.split('<')[1]
-            if '=' in condition:
-                condition = condition.split('=')[1]
-            # extract from body the predicates and split them
-            predicate_rule = step['rule'].split(':-')[1].split('.')[0].split('),')
-            # identify through the provenance the corresponing realization subject to condition
-            for i in range(len(predicate_rule)):
-                if predicate_rule[i][:3] != 'not ':
-                    var_pred = str(str(predicate_rule[i]).split('(')[1].replace(')','')).split(',')
-                    for j in range(len(var_pred)):
-                        if condition == var_pred[j]:
-                            null_descr = str(str(str(step['provenance'].split('[')[1].split(']')[0].split(', ')[i]).split('(')[1]).split(')')[0]).split(',')[j]
-                            condition = null_descr
-
-        except:
-            if '>=' in condition:
-                condition = condition.split('>=')[1]
-                return(condition)
-            if '<=' in condition:
-                condition = condition.split('<=')[1]
-                return(condition)
-            if '<>' in condition:
-                condition = condition.split('<>')[1]
-                return(condition)
-            if '!=' in condition:
-                condition = condition.split('!=')[1]
-                return(condition)
-            if '>' in condition:
-                condition = condition.split('>')[1]
-                return(condition)
-            if '<' in condition:
-                condition = condition.split('<')[1]
-                return(condition)
-            if '=' in condition:
-                condition = condition.split('=')[1]
-                return(condition)
-
-        return condition
-    
+    def __get_initial_state(self):
+        return {'is_temp': False, 'replace_temp': "[", 'cond': None,
+                'conditions_descr': '', 'propagate_condition': None}
+
+
     '''
-        :param step: a step of the chase
-        :param oper: an algebric operation of a rule
+        This method verbalizes a run of consecutive steps of the chase, yielding the verbalized ones
+
+        :param chase: an iterable over the steps of the run
+        :param index: the overlay of the index of the chase where the provenances are replaced
+        :param glossary: the compiled pred_file
+        :param state: the state carried over from the steps before the run, updated in place
+        :param start: the position in the chase of the first step of the run
+        :param rewrites: a list where to record the provenances replaced in the run, if given
     '''
-    def __get_realized_head(self, step, oper):
-        formula = oper.split('=')[1]
-        oper = oper.split('=')[0]
-        head_rule = step['rule'].split(':-')[0].split(')')[0].split('(')[1].split(',')
-        name_head = step['name'].split(')')[0].split('(')[1].split(',')
-        formula_sep = formula.replace('+', ' + ').replace('-',' - ').replace('*',' * ').replace('/',' / ').replace('(',' ( ').replace(')',' ) ').replace('msum','msum ').split(' ')
-        variables = step['rule'].split(':-')[1].split(')')[0].split('(')[1].split(',')
-        constants = step['original_provenance'].replace('[','').replace(']','').split('(')[1].split(')')[0].split(',')
-
-        for j in range(len(formula_sep)):
-            for i in range(len(variables)):
-                if formula_sep[j] == variables[i]:
-                     formula_sep[j] = constants[i]
-                     break
-
-        for i in range(len(head_rule)):
-            if head_rule[i] == oper:
-                if 'msum' not in formula:
-                    result_operation = name_head[i]
-                    return ', with ' + result_operation + ' given by ' + ''.join(formula_sep)
-                else:
-                    result_operation = name_head[i]
-                    verb_msum = ', with ' + result_operation + ' given by the sum over all the contributors' # + \
-                       # formula.split('msum')[1].split(',')[1].replace('(','').replace(')','')
-                    verb_msum = verb_msum.replace('<','').replace('>','')
-                    return verb_msum
-        return ''
-    
+    def __verbalize_run(self, chase, index, glossary, state, start = 0, rewrites = None):
+        for position, step in enumerate(chase, start):
+            # work on a copy, so that the input chase is left untouched
+            step = dict(step)
+            # we split the body between predicates and eventual conditions on variables
+            # -> useful for verbalizing conditions
+            step['skeleton'] = get_rule_skeleton(step['rule'])
+            step['parsed_rule'] = step['skeleton'].rule
+            step['rule'] = step['parsed_rule'].text
+            step['conditions'] = step['parsed_rule'].conditions
+            step['algebric'] = step['parsed_rule'].algebric
+            step['original_provenance'] = step['provenance']
+
+            if step['number'] != -1:
+                vstep = self.__verbalize_step(step, index, glossary, state)
+
+                # a temporary provenance replaced in this step is seen by the next lookups
+                if step['provenance'] != step['original_provenance']:
+                    if index.set_provenance(step['name'], step['provenance'], position) and rewrites is not None:
+                        rewrites.append((step['name'], step['provenance'], position))
+
+                if vstep:
+                    yield vstep
+
+
+    '''
+        This method verbalizes the steps of the chase one at a time, yielding the verbalized ones
+
+        :param chase: an iterable over the steps of the chase
+        :param index: the index of the chase built by build_index
+        :param glossary: the compiled pred_file
+    '''
+    def __verbalize_steps(self, chase, index, glossary):
+        # the changes to the provenances of this run are kept out of the given index
+        yield from self.__verbalize_run(chase, index.overlay(), glossary, self.__get_initial_state())
+
+
+    '''
+        This method verbalizes a chunk of steps of the chase as if it were the beginning of the chase,
+        i.e., with no state carried over from previous steps and no provenance replaced by them.
+        It returns the verbalized steps, the state after the chunk, the facts whose provenance has been read
+        and the provenances replaced in the chunk, so that the caller can check the chunk against the real
+        state and provenances
+
+        :param chase: the steps of the chunk
+        :param start: the position in the chase of the first step of the chunk
+        :param index: the index of the chase built by build_index
+        :param glossary: the compiled pred_file
+    '''
+    def verbalize_chunk(self, chase, start, index, glossary):
+        index = index.overlay(track_reads = True)
+        state = self.__get_initial_state()
+        rewrites = list()
+        vsteps = list(self.__verbalize_run(chase, index, glossary, state, start, rewrites))
+        return vsteps, state, index.reads, rewrites
+
+
+    '''
+        This method verbalizes the steps of the chase with a pool of processes, yielding the verbalized ones
+        in the order of the chase.
+
+        Each chunk is verbalized in parallel as if no state were carried over from the previous chunks.
+        The chunks are then checked in order: a chunk is kept if the state left by the previous chunks is
+        the initial one and it read no provenance replaced by them, otherwise it is verbalized again
+        with the real state, so that the result is the same as the sequential verbalization
+
+        :param chase: an iterable over the steps of the chase
+        :param index: the index of the chase built by build_index
+        :param glossary: the compiled pred_file
+        :param workers: the number of processes
+        :param chunk_size: the number of steps in each chunk
+    '''
+    def __verbalize_steps_parallel(self, chase, index, glossary, workers, chunk_size):
+        chunks = self.__get_chunks(chase, chunk_size)
+        overlay = index.overlay()
+        state = self.__get_initial_state()
+        rewritten = set()
+
+        with ProcessPoolExecutor(max_workers = workers, initializer = _init_worker,
+                                 initargs = (index, glossary)) as pool:
+            # keep a bounded number of chunks in flight, so that a streamed chase is not read all at once
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(_verbalize_chunk, chunk)))
+                if len(pending) < 2 * workers:
+                    continue
+                yield from self.__merge_chunk(pending.popleft(), overlay, glossary, state, rewritten)
+            while pending:
+                yield from self.__merge_chunk(pending.popleft(), overlay, glossary, state, rewritten)
+
+
+    '''
+        :param chase: an iterable over the steps of the chase
+        :param chunk_size: the number of steps in each chunk
+    '''
+    def __get_chunks(self, chase, chunk_size):
+        chunk = list()
+        start = 0
+        for step in chase:
+            chunk.append(step)
+            if len(chunk) == chunk_size:
+                yield start, chunk
+                start += len(chunk)
+                chunk = list()
+        if chunk:
+            yield start, chunk
+
+
+    '''
+        This method yields the verbalized steps of a chunk, verbalizing it again if the result
+        computed in parallel does not hold with the state left by the previous chunks
+
+        :param pending: the chunk, as its start and steps, with the future of its parallel verbalization
+        :param overlay: the overlay of the index with the provenances replaced by the previous chunks
+        :param glossary: the compiled pred_file
+        :param state: the state left by the previous chunks, updated in place
+        :param rewritten: the facts whose provenance has been replaced by the previous chunks
+    '''
+    def __merge_chunk(self, pending, overlay, glossary, state, rewritten):
+        (start, chunk), future = pending
+        vsteps, chunk_state, reads, rewrites = future.result()
+
+        # the temporary provenance is only used once reset, unless a temporary atom is pending
+        if state['is_temp'] or state['cond'] is not None or state['conditions_descr'] or \
+                state['propagate_condition'] or not rewritten.isdisjoint(reads):
+            rewrites = list()
+            vsteps = list(self.__verbalize_run(chunk, overlay, glossary, state, start, rewrites))
+        else:
+            state.update(chunk_state)
+            for name, provenance, position in rewrites:
+                overlay.set_provenance(name, provenance, position)
+
+        rewritten.update(name for name, _, _ in rewrites)
+        yield from vsteps
+
+
+    '''
+        This method returns the verbalized steps of the chase, sequentially or with a pool of processes
+
+        :param chase: an iterable over the steps of the chase
+        :param index: the index of the chase built by build_index
+        :param glossary: the compiled pred_file
+        :param workers: the number of processes, the steps are verbalized sequentially if not greater than 1
+        :param chunk_size: the number of steps verbalized by a process at a time
+    '''
+    def __get_verb_steps(self, chase, index, glossary, workers, chunk_size):
+        if workers and workers > 1:
+            return self.__verbalize_steps_parallel(chase, index, glossary, workers, chunk_size)
+        return self.__verbalize_steps(chase, index, glossary)
+
+
+    '''
+        This method returns the verbalized chase graph, without reading or writing any file
+
+        :param chase: the numbered chase graph, as returned by FilePreprocessor.get_num_chase_graph
+        :param preds_descr: the deserialized pred_file, or a PredicateGlossary compiled from it
+        :param index: the index of the chase built by build_index, built here if not given
+        :param workers: the number of processes, the steps are verbalized sequentially if not greater than 1
+        :param chunk_size: the number of steps verbalized by a process at a time
+    '''
+    def get_verb_chase_graph(self, chase, preds_descr, index = None, workers = None, chunk_size = 10000):
+        glossary = PredicateGlossary(preds_descr) if isinstance(preds_descr, list) else preds_descr
+        if index is None:
+            index = self.build_index(chase)
+        return list(self.__get_verb_steps(chase, index, glossary, workers, chunk_size))
+
+
     '''
         This method creates a .json file with the verbalized chase graph
         
+        In streaming mode the index reads the provenances and the patterns from the binary file of the chase graph
+        cache (see ChaseGraphCache), mapped from disk, and the steps are read, verbalized and written one at a time,
+        so that the memory used is bounded by the provenances looked up and not by the whole chase graph
+
         :param chase_path: path to the num_chase_graph.json file with the chase graph numbered
         :param predicates_path: path to the predicates.json file with the predicates' description
         :param output_path: path to output file        
+        :param streaming: whether to read the chase graph incrementally from disk
+        :param index: the index of the chase built by build_index, built here if not given
+        :param workers: the number of processes, the steps are verbalized sequentially if not greater than 1
+        :param chunk_size: the number of steps verbalized by a process at a time
+        :param incremental: whether to verbalize only the steps appended since the previous call,
+                            see verbalize_chase_delta
     '''
-    def verbalize_chase_graph(self, num_chase_path, predicates_path, output_path):
+    def verbalize_chase_graph(self, num_chase_path, predicates_path, output_path, streaming = False, index = None,
+                              workers = None, chunk_size = 10000, incremental = False):
         try:
-            with open(num_chase_path) as c:
-                # deserialize chase file
-                chase = json.load(c)
-                with open(predicates_path) as p:
-                    # deserialize pred file
-                    preds_descr = json.load(p)
-                    # get a list of predicates name: useful for identifying temp atoms
-                    preds_name = list()
-                    for k in preds_descr:
-                        preds_name.append(k['predicate'].split('(')[0] +'(')
-
-                    # create new output file or rewrite existing one
-                    with open(output_path + "verb_chase_graph.json", "w") as out:
-                        out.write('[')
-                        first_step = True
-                        # for each line in the chase file, i.e., for each step of the chase,
-                        # we split the body between predicates and eventual conditions on variables
-                        # -> useful for verbalizing conditions
-                        for step in chase:
-                            # if step['rule']:
-                            #     # replace "not " occurrences with "not_"
-                            #     step['rule'] = step['rule'].replace("not ", "not_")
-                            #     # remove all whitespaces
-                            #     step['rule'] = step['rule'].replace(" ", "")
-                            # # split conditions from the rule
-                            step['rule'], step['conditions'], step['algebric'] = split_condition_from_rule(step)
-                            step['original_provenance'] = step['provenance']
-
-                        # for each chase step
-                        for step in chase:
-                            if step['number'] != -1:
-                                realized_atom = list()
-                                nulls_in_step = []  # list to keep track of nulls in that step
-                                # extract from provenance the facts activating the body of the rule
-                                body = step['provenance'].split('[')[1].split(']')[0].split(', ')
-
-                                # Retrieve contributors to msum
-                                if step['algebric'] and len(body)>1:
-                                    if 'msum' in step['algebric'][0]:
-                                        multiple = list()
-                                        for join_fact_temp in body:
-                                                if 'vatom' in join_fact_temp:
-                                                    multiple += self.__get_fact_provenance(chase, join_fact_temp).split(
-                                                    '[')[1].split(']')[0].split(', ')
-                                                else:
-                                                    multiple += [join_fact_temp]
-                                        while 'vatom' in ','.join(multiple):
-                                            index_to_del = []
-                                            for deep in range(len(multiple)):
-                                                if 'vatom' in multiple[deep]:
-                                                    multiple += self.__get_fact_provenance(chase, multiple[deep]).split('[')[1].split(']')[0].split(', ')
-                                                    index_to_del.append(deep)
-                                            for ind in sorted(index_to_del, reverse=True):
-                                                del multiple[ind]
-
-                                        body = multiple
-                                        replace_temp = "["
-                                        is_temp = True
-
-                                # if it is a chase step, i.e., it involves the derivation of an intensional fact
-                                if body[0] and body[0] != 'null':
-                                    # verbalize the body
-                                    body_descr = ""
-                                    # this is the case of linear rules
-                                    if len(body) == 1:
-                                        is_temp = False
-                                        # extract the pattern of the body fact:
-                                        # if it is not a temporal atom (vatom) it can be verbalized, otherwise
-                                        # it must be further expanded with its provenance
-                                        if body[0][:5] != 'vatom':
-                                            body_pattern = self.__get_fact_pattern(chase, body[0])
-                                            # verbalize the linear body
-                                            body_descr = "Since " + self.__get_fact_description(preds_descr, body[0],
-                                                                                                body_pattern, nulls_in_step)
-                                            realized_atom.append(body[0])
-
-                                        else:
-                                            body = self.__get_fact_provenance(chase, body[0]).split('[')[1].split(']')[0].split(', ')
-                                            # change boolean to indicate that temporal provenance atoms must be replaced iteratively
-                                            is_temp = True
-                                            # new provenance for temporal atom
-                                            replace_temp = "["
-
-                                    # this is the case of join rules
-                                    if len(body) > 1:
-                                        # for each temp fact involved in the join
-                                        for join_fact_temp in body:
-                                            # check if there is a negated atom
-                                            if join_fact_temp != 'null' and join_fact_temp.split('(')[0]+('(') not in preds_name:
-                                                # determine the real fact involved in the join by extracting
-                                                # the provenance of the temp one
-                                                # temp facts (used for joins) will always have a single fact as provenance
-                                                join_fact_real = self.__get_fact_provenance(chase, join_fact_temp).split(
-                                                    '[')[1].split(']')[0].split(', ')
-
-                                                for multiple_real_facts in join_fact_real:
-                                                    if is_temp:
-                                                        if multiple_real_facts:
-                                                            replace_temp += multiple_real_facts + ', '
-                                                        else:
-                                                            replace_temp += join_fact_temp + ', '
-
-                                                    else:
-                                                        # extract the pattern of the real body fact
-                                                        body_pattern = self.__get_fact_pattern(chase, multiple_real_facts)
-                                                        # verbalize the join body
-                                                        # distinct verbalization if it is the first fact in the join
-                                                        if body_descr == "":
-                                                            body_descr = "Since " \
-                                                                        + self.__get_fact_description(preds_descr, multiple_real_facts,
-                                                                                                        body_pattern, nulls_in_step)
-                                                            realized_atom.append(multiple_real_facts)
-
-                                                        else:
-                                                            body_descr += ", and " \
-                                                                        + self.__get_fact_description(preds_descr, multiple_real_facts,
-                                                                                                        body_pattern, nulls_in_step)
-                                                            realized_atom.append(multiple_real_facts)
-
-                                            # same things but for negated atoms
-                                            elif join_fact_temp == 'null' and join_fact_temp.split('(')[0]+('(') not in preds_name:
-                                                if body_descr == "":
-                                                    negated_atom = self.__get_negated_fact(step)
-                                                    body_descr += 'Since it is not true that ' + \
-                                                                  self.__get_fact_description(preds_descr, negated_atom,
-                                                                                                self.__get_fact_pattern(chase, negated_atom),
-                                                                                                nulls_in_step)
-                                                    realized_atom.append(negated_atom)
-                                                else:
-                                                    negated_atom = self.__get_negated_fact(step)
-                                                    body_descr += ', and it is not true that ' + \
-                                                                  self.__get_fact_description(preds_descr, negated_atom,
-                                                                                              self.__get_fact_pattern(chase, negated_atom),
-                                                                                              nulls_in_step)
-                                                    realized_atom.append(negated_atom)
-                                            else:
-                                                # if there is an algebric rule just need to replace the provenance with
-                                                # the facts that were retrieved before
-                                                replace_temp += join_fact_temp + ', '
-
-                                        if is_temp:
-                                            # replace provenance
-                                            replace_temp = replace_temp[:-2] + ']'
-                                            step['provenance'] = replace_temp
-                                            is_temp = False
-
-
-                                    body = step['provenance'].split('[')[1].split(']')[0].split(', ')
-                                    if len(body) == 1:
-                                        # if body[0].startswith('vatom'):
-                                        #    body = self.__get_fact_provenance(chase, body[0]).split('[')[1].split(']')[0].split(', ')
-                                        body_pattern = self.__get_fact_pattern(chase, body[0])
-                                        # verbalize the linear body
-                                        body_descr = "Since " + self.__get_fact_description(preds_descr, body[0],
-                                                                                            body_pattern, nulls_in_step)
-                                        # realized_atom.append(body[0])
-
-
-                                    # in case of an algebric in the step
-                                    if len(body) > 1 and step['name'].split('(')[0]+'(' in preds_name and not body_descr:
-
-                                        for predicates_operation in body:
-                                            body_pattern = self.__get_fact_pattern(chase, predicates_operation)
-                                            if body_descr == "":
-                                                body_descr = "Since " \
-                                                     + self.__get_fact_description(preds_descr, predicates_operation,
-                                                                                    body_pattern, nulls_in_step)
-                                                realized_atom.append(predicates_operation)
-                                            else:
-                                                body_descr += ", and " \
-                                                    + self.__get_fact_description(preds_descr, predicates_operation,
-                                                                                    body_pattern, nulls_in_step)
-                                                realized_atom.append(predicates_operation)
-
-                                    len_r = len(realized_atom)
-                                    try:
-                                        if propagate_condition:
-                                            realized_atom.append(propagate_condition)
-                                            del propagate_condition
-                                    except: None
-
-                                    algebric_descr = ""
-                                    # verbalize algebric operation
-                                    if len(step['algebric']) > 0:
-                                        for oper in step['algebric']:
-                                            if '=' in oper:
-                                                algebric_descr += self.__get_realized_head(step, oper)
-                                                realized_atom.append(oper)
-
-                                    # add verbalizations of (eventual) conditions
-                                    if len(step['conditions']) > 0:
-                                        if len(realized_atom) > len_r and len(step['algebric']) == 0:
-                                            realized_atom = realized_atom[:-1]
-                                        # if there is a condition and no body descr yet, it means that
-                                        # it was a temporal atom and a description can be created
-                                        if len(body_descr) == 0:
-                                            for predicates_operation in body:
-                                                body_pattern = self.__get_fact_pattern(chase, predicates_operation)
-                                                if body_descr == "":
-                                                    body_descr = "Since " \
-                                                        + self.__get_fact_description(preds_descr, predicates_operation,
-                                                                                        body_pattern, nulls_in_step)
-                                                    realized_atom.append(predicates_operation)
-                                                else:
-                                                    body_descr += ", and " \
-                                                        + self.__get_fact_description(preds_descr, predicates_operation,
-                                                                                        body_pattern, nulls_in_step)
-                                                    realized_atom.append(predicates_operation)
-                                        conditions = step['conditions']
-                                        conditions_descr = ''
-                                        for cond in conditions:
-                                            # different verbalization according to condition
-                                            if '>=' in cond:
-                                                conditions_descr += ', and ' + self.__get_conditioned_fact(cond, step) + \
-                                                                    ' is equal to or over ' + self.__get_conditioning_fact(cond, step)
-                                                realized_atom.append(self.__get_conditioned_fact(cond, step) + '>=' + self.__get_conditioning_fact(cond, step))
-                                            if '<=' in cond:
-                                                conditions_descr += ', and ' + self.__get_conditioned_fact(cond, step) + \
-                                                                    ' is equal to or under ' + self.__get_conditioning_fact(cond, step)
-                                                realized_atom.append(self.__get_conditioned_fact(cond, step) + '<=' + self.__get_conditioning_fact(cond, step))
-                                            if '>' in cond and '<>' not in cond:
-                                                conditions_descr += ', and ' + self.__get_conditioned_fact(cond, step) + \
-                                                                    ' is over ' + self.__get_conditioning_fact(cond, step)
-                                                realized_atom.append(self.__get_conditioned_fact(cond, step) + '>' + self.__get_conditioning_fact(cond, step))
-                                            if '<' in cond and '<>' not in cond:
-                                                conditions_descr += ', and ' + self.__get_conditioned_fact(cond, step) + \
-                                                                    ' is under ' + self.__get_conditioning_fact(cond, step)
-                                                realized_atom.append(self.__get_conditioned_fact(cond, step) + '<' + self.__get_conditioning_fact(cond, step))
-                                            if '!=' in cond:
-                                                conditions_descr += ', and ' + self.__get_conditioned_fact(cond, step) + \
-                                                                    ' is not ' + self.__get_conditioning_fact(cond, step)
-                                                realized_atom.append(self.__get_conditioned_fact(cond, step) + '!=' + self.__get_conditioning_fact(cond, step))
-                                            if '<>' in cond:
-                                                conditions_descr += ', and ' + self.__get_conditioned_fact(cond, step) + \
-                                                                    ' is not ' + self.__get_conditioning_fact(cond, step)
-                                                realized_atom.append(self.__get_conditioned_fact(cond, step) + '<>' + self.__get_conditioning_fact(cond, step))
-                                            if '=' in cond and '\"' not in cond and '>' not in cond and '<' not in cond:
-                                                conditions_descr += ', and ' + self.__get_conditioned_fact(cond, step) + \
-                                                                    ' is equal to ' + self.__get_conditioning_fact(cond, step)
-                                                realized_atom.append(self.__get_conditioned_fact(cond, step) + '=' + self.__get_conditioning_fact(cond, step))
-                                            if '=' in cond and '\"' in cond and '>' not in cond and '<' not in cond:
-                                                conditions_descr += ', and there is ' + self.__get_conditioning_fact(cond, step).replace("\"",'')
-                                                realized_atom.append(self.__get_conditioning_fact(cond, step).replace("\"",''))
-
-
-                                    # verbalize the head
-                                    head_name = step['name']
-                                    head_descr = self.__get_fact_description(preds_descr, head_name,
-                                                                             step['pattern'], nulls_in_step)
-
-                                    # update the output file with the new verbalized step
-                                    if head_descr:
-                                        head_descr = ", then " + head_descr
-                                        try:
-                                            chase_step_descr = body_descr + conditions_descr + head_descr + algebric_descr
-                                            del(cond)
-                                        except:
-                                            try:
-                                                chase_step_descr = body_descr + conditions_descr + head_descr
-                                                del(cond)
-                                            except:
-                                                chase_step_descr = body_descr + head_descr
-
-                                        if 'vatom' not in head_name:
-                                            conditions_descr = ''
-
-                                        # delete double whitespaces
-                                        chase_step_descr = chase_step_descr.replace('  ',' ')
-                                        # remove the first character if it is a space
-                                        if chase_step_descr[0] == " ":
-                                            chase_step_descr = chase_step_descr[1:]
-                                        # capitalize the first letter
-                                        chase_step_descr = chase_step_descr[0].upper() + chase_step_descr[1:]
-
-                                        if first_step:
-                                            first_step = False
-                                        else:
-                                            out.write('\n,')
-                                        vstep = {"sentence": chase_step_descr + ".",
-                                                 "number": step['number'],
-                                                 "derived_fact": step['name'],
-                                                 "type": "intensional",
-                                                 "body_atoms": ','.join(realized_atom)}
-                                        json.dump(vstep, out, separators=(",", ":"))
-
-                                    else:
-                                        try:
-                                            propagate_condition = cond ## ADD MULTIPLE CONDITIONS
-                                        except: None
-
-
-                                # if instead it is an extensional ground fact
-                                else:
-                                    fact_name = step['name']
-                                    chase_step_descr = self.__get_fact_description(preds_descr, fact_name,
-                                                                                   step['pattern'], nulls_in_step)
-                                    realized_atom.append(fact_name)
-
-                                    # delete double whitespaces
-                                    chase_step_descr = chase_step_descr.replace('  ',' ')
-                                    # remove the first character if it is a space
-                                    if chase_step_descr[0] == " ":
-                                        chase_step_descr = chase_step_descr[1:]
-                                    # capitalize the first letter
-                                    chase_step_descr = chase_step_descr[0].upper() + chase_step_descr[1:]
-
-                                    if first_step:
-                                        first_step = False
-                                    else:
-                                        out.write('\n,')
-
-                                    vstep = {"sentence": chase_step_descr + ".",
-                                             "number": step['number'],
-                                             "derived_fact": step['name'],
-                                             "type": "extensional",
-                                             "body_atoms": ''}
-                                    json.dump(vstep, out, separators=(",", ":"))
-
-                        out.write('\n]')
+            if incremental:
+                self.verbalize_chase_delta(num_chase_path, predicates_path, output_path)
+                return
+
+            if streaming:
+                if index is None:
+                    # the provenances are read from the arrays of the chase graph cache instead of a first pass on the file
+                    index = ChaseIndex()
+                    index.attach_chase_graph(load_chase_graph(num_chase_path))
+                chase = iter_json_array(num_chase_path)
+            else:
+                with open(num_chase_path) as c:
+                    # deserialize chase file
+                    chase = json.load(c)
+                if index is None:
+                    index = self.build_index(chase)
+
+            with open(predicates_path) as p:
+                # deserialize pred file and compile the descriptions
+                glossary = PredicateGlossary(json.load(p))
+
+            # create new output file or rewrite existing one
+            with open(output_path + "verb_chase_graph.json", "w") as out:
+                out.write('[')
+                first_step = True
+                for vstep in self.__get_verb_steps(chase, index, glossary, workers, chunk_size):
+                    if first_step:
+                        first_step = False
+                    else:
+                        out.write('\n,')
+                    json.dump(vstep, out, separators=(",", ":"))
+
+                out.write('\n]')
 
         except Exception as e:
             print(f"An error occurred: {e}")
+
+
+
+    '''
+        This method verbalizes the steps appended to the chase graph since the previous call and appends
+        them to verb_chase_graph.json, or verbalizes the whole chase graph at the first call.
+
+        A verb_manifest.db file keeps the position of the last step verbalized in the num_chase_graph.json file,
+        the state carried over to the next steps, the patterns and the provenance of each fact, with the ones
+        replaced so far: only the provenances looked up by the new steps are read, and only the ones they add
+        or replace are written.
+        The chase graph must only be appended to: if it has been numbered again by FilePreprocessor.number_chase_graph
+        in incremental mode, as recorded in the num_manifest.db file next to it, the whole chase graph is verbalized again
+
+        :param chase_path: path to the num_chase_graph.json file with the chase graph numbered
+        :param predicates_path: path to the predicates.json file with the predicates' description
+        :param output_path: path to output file
+    '''
+    def verbalize_chase_delta(self, num_chase_path, predicates_path, output_path):
+        with open(predicates_path) as p:
+            # deserialize pred file and compile the descriptions
+            glossary = PredicateGlossary(json.load(p))
+
+        numbering = None
+        num_manifest_path = os.path.join(os.path.dirname(num_chase_path), "num_manifest.db")
+        if os.path.exists(num_manifest_path):
+            num_manifest = IncrementalManifest(num_manifest_path)
+            numbering = num_manifest.get('generation')
+            num_manifest.close()
+
+        manifest = IncrementalManifest(output_path + "verb_manifest.db")
+        try:
+            appended = manifest.get('offset') is not None and manifest.get('numbering') == numbering
+            if not appended:
+                manifest.clear()
+            chase, offset = read_json_array_tail(num_chase_path, manifest.get('offset', 0))
+            # the index is private to this run, so the new steps and provenances are added to it directly
+            index = ChaseIndex()
+            index.attach(manifest)
+            for step in chase:
+                index.add(step)
+            state = manifest.get('state', self.__get_initial_state())
+            vsteps = list(self.__verbalize_run(chase, index, glossary, state, manifest.get('steps', 0)))
+
+            if appended:
+                append_json_array(output_path + "verb_chase_graph.json", vsteps)
+            else:
+                with open(output_path + "verb_chase_graph.json", "w") as out:
+                    out.write('[' + '\n,'.join(json.dumps(vstep, separators=(",", ":")) for vstep in vsteps) + '\n]')
+
+            index.store(manifest)
+            manifest.set({'offset': offset, 'steps': manifest.get('steps', 0) + len(chase),
+                          'state': state, 'numbering': numbering})
+            manifest.commit()
+        finally:
+            manifest.close()
+
+# index and glossary of the chase shared by the steps verbalized in a worker process
+worker_context = dict()
+
+def _init_worker(index, glossary):
+    worker_context['verbalizer'] = ChaseGraphVerbalizer()
+    worker_context['index'] = index
+    worker_context['glossary'] = glossary
+
+def _verbalize_chunk(chunk):
+    start, steps = chunk
+    return worker_context['verbalizer'].verbalize_chunk(steps, start, worker_context['index'],
+                                                        worker_context['glossary'])
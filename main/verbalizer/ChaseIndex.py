@@ -0,0 +1,288 @@
+import logging
+from collections import ChainMap, defaultdict
+from collections.abc import Mapping
+from parsedChase import parse_fact, FactTable
+
+'''
+    This class indexes the steps of a chase graph by the name of the derived fact and
+    by predicate, so that the provenance of a fact and the pattern of a predicate
+    are found in constant time instead of scanning the chase.
+
+    The index is built once and can be reused by several verbalizations of the same chase:
+    each verbalization works on an overlay, where its changes to the provenances are kept.
+
+    The expansion of temporary atoms (vatom) into the real facts they stand for is memoized:
+    for each vatom the real facts are kept grouped by depth, so that expanding a provenance
+    only merges the groups of its vatoms, in the same order as expanding them one level at a time
+'''
+class ChaseIndex:
+
+    logging.getLogger().setLevel(logging.INFO)
+
+
+    '''
+        :param steps: an iterable over the steps of the chase
+    '''
+    def __init__(self, steps=()):
+        # name of each fact -> (provenance as a tuple of fact ids, position of its first step)
+        self.provenance = dict()
+        # predicate -> pattern of its first step
+        self.pattern = dict()
+        self.facts = FactTable()
+        self.size = 0
+        # vatom -> real facts in its provenance, grouped by depth
+        self.levels = dict()
+        # fact -> vatoms whose expansion depends on its provenance
+        self.dependents = defaultdict(set)
+        # facts whose provenance has been read, if tracked
+        self.reads = None
+        for step in steps:
+            self.add(step)
+
+
+    '''
+        This method adds the next step of the chase to the index
+
+        :param step: a step of the chase
+    '''
+    def add(self, step):
+        if step['name'] not in self.provenance:
+            self.provenance[step['name']] = (self.facts.provenance(step['provenance']), self.size)
+        predicate = parse_fact(step['name']).predicate
+        if predicate not in self.pattern:
+            self.pattern[predicate] = step['pattern']
+        self.size += 1
+
+
+    '''
+        This method returns a view of the index whose changes to the provenances
+        are not seen by the index itself
+
+        :param track_reads: whether to keep the facts whose provenance is read through the view
+    '''
+    def overlay(self, track_reads=False):
+        view = ChaseIndex()
+        if track_reads:
+            view.reads = set()
+        view.provenance = ChainMap(dict(), self.provenance)
+        view.pattern = self.pattern
+        view.facts = self.facts
+        view.size = self.size
+        return view
+
+
+    '''
+        This method makes an empty index read the provenances and the patterns stored in an IncrementalManifest
+        by a previous run, reading the provenance of a fact only when it is looked up.
+        The provenances added or replaced afterwards are kept apart, so that store only writes them
+
+        :param manifest: the IncrementalManifest of the run
+    '''
+    def attach(self, manifest):
+        self.provenance = ChainMap(dict(), StoredProvenance(manifest, self.facts))
+        self.pattern.update(manifest.get('pattern', {}))
+        self.size = manifest.get('size', 0)
+
+
+    '''
+        This method makes an empty index read the provenances and the patterns of a chase graph from the arrays
+        of its ChaseGraphCache, reading the provenance of a fact only when it is looked up
+
+        :param chase_graph: the ChaseGraphCache of the chase graph
+    '''
+    def attach_chase_graph(self, chase_graph):
+        self.provenance = ChainMap(dict(), CachedProvenance(chase_graph, self.facts))
+        # the pattern of a fact has the predicate of the fact, so the first step of each predicate has its first pattern
+        first_patterns = dict()
+        for pattern, position in chase_graph.first_positions('pattern'):
+            predicate = parse_fact(pattern).predicate
+            if predicate not in first_patterns or position < first_patterns[predicate][0]:
+                first_patterns[predicate] = (position, pattern)
+        self.pattern.update((predicate, pattern) for predicate, (_, pattern) in first_patterns.items())
+        self.size = len(chase_graph)
+
+
+    '''
+        This method writes to an IncrementalManifest the provenances added or replaced since attach, and the patterns
+
+        :param manifest: the IncrementalManifest of the run
+    '''
+    def store(self, manifest):
+        manifest.set_entries({name: [self.facts.texts(ids), position]
+                              for name, (ids, position) in self.provenance.maps[0].items()})
+        manifest.set({'pattern': dict(self.pattern), 'size': self.size})
+
+
+    '''
+        :param fact: a fact in the chase
+    '''
+    def get_provenance(self, fact):
+        if self.reads is not None:
+            self.reads.add(fact)
+        if fact in self.provenance:
+            return self.facts.texts(self.provenance[fact][0])
+        return None
+
+
+    '''
+        This method replaces the provenance of a fact, if the step at the given position is its first one,
+        and returns whether it has been replaced
+
+        :param fact: a fact in the chase
+        :param provenance: the new provenance as a string
+        :param position: the position of the step in the chase
+    '''
+    def set_provenance(self, fact, provenance, position):
+        if fact in self.provenance and self.provenance[fact][1] == position:
+            self.provenance[fact] = (self.facts.provenance(provenance), position)
+            # forget the expansions that went through the old provenance
+            stale = [fact]
+            while stale:
+                fact = stale.pop()
+                self.levels.pop(fact, None)
+                stale.extend(self.dependents.pop(fact, ()))
+            return True
+        return False
+
+
+    '''
+        :param fact: a fact in the chase
+    '''
+    # the pattern is taken from the first step of the same predicate
+    def get_pattern(self, fact):
+        return self.pattern.get(parse_fact(str(fact)).predicate)
+
+
+    '''
+        This method returns the real facts in the provenance of a vatom, grouped by depth,
+        computing first the ones of the vatoms it depends on
+
+        :param fact: a temporary fact in the chase
+    '''
+    def __get_levels(self, fact):
+        pending = [fact]
+        expanding = set()
+        while pending:
+            current = pending[-1]
+            if current in self.levels:
+                pending.pop()
+                continue
+            provenance = self.get_provenance(current)
+            missing = [f for f in provenance if 'vatom' in f and f not in self.levels]
+            if missing:
+                if current in expanding or any(f in expanding for f in missing):
+                    raise ValueError(f"Cyclic provenance for the temporary fact {current}")
+                expanding.add(current)
+                pending.extend(missing)
+                continue
+
+            levels = [[f for f in provenance if 'vatom' not in f]]
+            for f in provenance:
+                if 'vatom' in f:
+                    self.dependents[f].add(current)
+                    for depth, level in enumerate(self.levels[f]):
+                        if depth + 1 == len(levels):
+                            levels.append([])
+                        levels[depth + 1].extend(level)
+            self.levels[current] = levels
+            expanding.discard(current)
+            pending.pop()
+        return self.levels[fact]
+
+
+    '''
+        This method replaces the vatoms in a list of facts with the real facts in their provenance:
+        the real facts of the list come first, followed by the ones found at each depth of the vatoms
+
+        :param facts: a list of facts in the chase
+    '''
+    def expand_provenance(self, facts):
+        expanded = [f for f in facts if 'vatom' not in f]
+        deeper = list()
+        for f in facts:
+            if 'vatom' in f:
+                for depth, level in enumerate(self.__get_levels(f)):
+                    if depth == len(deeper):
+                        deeper.append([])
+                    deeper[depth].extend(level)
+        for level in deeper:
+            expanded.extend(level)
+        return expanded
+
+
+
+'''
+    This class reads the provenances stored in an IncrementalManifest as the ones of a ChaseIndex,
+    i.e., with the ids of the facts in its table, keeping the ones already read
+'''
+class StoredProvenance(Mapping):
+
+    '''
+        :param manifest: the IncrementalManifest of the run
+        :param facts: the table of the facts of the index
+    '''
+    def __init__(self, manifest, facts):
+        self.manifest = manifest
+        self.facts = facts
+        self.read = dict()
+
+
+    '''
+        :param fact: a fact in the chase
+    '''
+    def __getitem__(self, fact):
+        if fact not in self.read:
+            entries = self.manifest.get_entries([fact])
+            if fact not in entries:
+                raise KeyError(fact)
+            facts, position = entries[fact]
+            self.read[fact] = (tuple(self.facts.intern(f) for f in facts), position)
+        return self.read[fact]
+
+
+    # the stored provenances are only looked up by fact
+    def __iter__(self):
+        return iter(self.read)
+
+
+    def __len__(self):
+        return len(self.read)
+
+
+
+'''
+    This class reads the provenances of a chase graph from the arrays of its ChaseGraphCache as the ones of a ChaseIndex,
+    i.e., with the ids of the facts in its table and the position of the first step of each fact, keeping the ones already read
+'''
+class CachedProvenance(Mapping):
+
+    '''
+        :param chase_graph: the ChaseGraphCache of the chase graph
+        :param facts: the table of the facts of the index
+    '''
+    def __init__(self, chase_graph, facts):
+        self.chase_graph = chase_graph
+        self.facts = facts
+        self.read = dict()
+
+
+    '''
+        :param fact: a fact in the chase
+    '''
+    def __getitem__(self, fact):
+        if fact not in self.read:
+            positions = self.chase_graph.get_positions('name', fact)
+            if len(positions) == 0:
+                raise KeyError(fact)
+            position = int(positions[0])
+            self.read[fact] = (self.facts.provenance(self.chase_graph.get_string('provenance', position)), position)
+        return self.read[fact]
+
+
+    # the provenances are only looked up by fact
+    def __iter__(self):
+        return iter(self.read)
+
+
+    def __len__(self):
+        return len(self.read)
@@ -0,0 +1,87 @@
+import json
+import logging
+import sqlite3
+
+'''
+    This class keeps the state of an incremental run over an append-only chase graph in a sqlite file:
+    a few values describing the whole run (e.g., the position of the last step read) and an entry
+    for each fact of the chase, so that a new batch of steps only reads and writes the entries
+    of the facts it involves, instead of the state of the whole chase
+'''
+class IncrementalManifest:
+
+    logging.getLogger().setLevel(logging.INFO)
+
+    # number of facts looked up with a single query
+    BATCH_SIZE = 500
+
+
+    '''
+        :param manifest_path: path to the sqlite file, created if it does not exist
+    '''
+    def __init__(self, manifest_path):
+        self.connection = sqlite3.connect(manifest_path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS run (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS facts (name TEXT PRIMARY KEY, value TEXT)")
+
+
+    '''
+        This method returns a value of the run, or the default one if it has not been set
+
+        :param key: the name of the value
+        :param default: the value returned if it has not been set
+    '''
+    def get(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM run WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+
+    '''
+        :param values: the values of the run to set, by name
+    '''
+    def set(self, values):
+        self.connection.executemany("INSERT OR REPLACE INTO run VALUES (?, ?)",
+                                    [(key, json.dumps(value)) for key, value in values.items()])
+
+
+    '''
+        This method returns the entries of the given facts that are in the manifest
+
+        :param names: the facts to look up
+    '''
+    def get_entries(self, names):
+        names = list(names)
+        entries = dict()
+        for i in range(0, len(names), self.BATCH_SIZE):
+            batch = names[i:i + self.BATCH_SIZE]
+            query = "SELECT name, value FROM facts WHERE name IN (" + ", ".join("?" * len(batch)) + ")"
+            for name, value in self.connection.execute(query, batch):
+                entries[name] = json.loads(value)
+        return entries
+
+
+    '''
+        :param entries: the entries of the facts to add or replace, by fact
+    '''
+    def set_entries(self, entries):
+        self.connection.executemany("INSERT OR REPLACE INTO facts VALUES (?, ?)",
+                                    ((name, json.dumps(value, separators=(",", ":"))) for name, value in entries.items()))
+
+
+    '''
+        This method removes the values and the entries, to start the run again
+    '''
+    def clear(self):
+        self.connection.execute("DELETE FROM run")
+        self.connection.execute("DELETE FROM facts")
+
+
+    '''
+        This method writes the changes since the last call, so that they are kept only if they are all written
+    '''
+    def commit(self):
+        self.connection.commit()
+
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,87 @@
+import logging
+import re
+
+'''
+    This class compiles the descriptions of the predicates of a Domain_Glossary (predicates.json)
+    into an index keyed by predicate name and arity.
+
+    Each description is split once into literal parts and slots for the args of the predicate,
+    so that verbalizing an atom is a single join of the parts with the values of its args.
+    Args are matched as whole placeholders, longest first, so that arg_1 does not match
+    the beginning of arg_10
+'''
+class PredicateGlossary:
+
+    logging.getLogger().setLevel(logging.INFO)
+
+
+    '''
+        :param preds_descr: the deserialized pred_file
+    '''
+    def __init__(self, preds_descr):
+        self.entries = dict()
+        self.names = set()
+        for pred_descr in preds_descr:
+            pred = pred_descr['predicate']
+            pred_name = pred.partition('(')[0]
+            pred_parts = pred.split('(')[1].split(')')[0].split(',') if '(' in pred else []
+            self.names.add(pred_name)
+            # as in a scan of the file, the first description of a predicate wins
+            if (pred_name, len(pred_parts)) not in self.entries:
+                self.entries[(pred_name, len(pred_parts))] = self.__compile(pred_descr, pred_parts)
+
+
+    '''
+        :param pred_descr: the description of a predicate in the pred_file
+        :param pred_parts: the generic args of the predicate
+    '''
+    def __compile(self, pred_descr, pred_parts):
+        description = pred_descr['description']
+        # position of each generic arg, the first one if an arg is repeated
+        positions = dict()
+        for i, part in enumerate(pred_parts):
+            if part and part not in positions:
+                positions[part] = i
+
+        parts = list()
+        slots = list()
+        if positions:
+            placeholders = sorted(positions, key=len, reverse=True)
+            pattern = re.compile('|'.join(re.escape(p) for p in placeholders))
+            last = 0
+            for match in pattern.finditer(description):
+                parts.append(description[last:match.start()])
+                slots.append((len(parts), positions[match.group()]))
+                parts.append(None)
+                last = match.end()
+            parts.append(description[last:])
+        else:
+            parts.append(description)
+
+        terms = pred_descr.get('specifics', {}).get('terms', [])
+        return {'parts': parts,
+                'slots': slots,
+                'types': [term.get('type') for term in terms]}
+
+
+    '''
+        This method returns the compiled description of a predicate, or None if it is not in the glossary
+
+        :param pred_name: the name of the predicate
+        :param arity: the number of args of the predicate
+    '''
+    def get(self, pred_name, arity):
+        return self.entries.get((pred_name, arity))
+
+
+    '''
+        This method fills the slots of a compiled description
+
+        :param entry: the compiled description of a predicate
+        :param values: the verbalized value of each arg of the predicate
+    '''
+    def render(self, entry, values):
+        parts = entry['parts'].copy()
+        for position, i in entry['slots']:
+            parts[position] = values[i]
+        return ''.join(parts)
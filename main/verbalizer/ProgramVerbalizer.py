@@ -1,6 +1,8 @@
+import io
 import json
 import logging
-from main.verbalizer.utilsFunctions import split_condition_from_rule
+from main.verbalizer.PredicateGlossary import PredicateGlossary
+from parsedChase import parse_fact, parse_rule
 
 '''
     This class performs the verbalization of the Vadalog program.
@@ -23,33 +25,161 @@ class ProgramVerbalizer:
 
 
     '''
-        :param preds_descr: the deserialized pred_file
-        :param atom: an atom in a rule of that predicate
+        :param glossary: the compiled pred_file
+        :param atom: a parsed atom in a rule of that predicate
     '''
-    def __get_pred_description(self, preds_descr, atom):
-        # extract name and args of the current atom
-        atom_name = atom.partition('(')[0]
-        atom_args = atom.split('(')[1].split(')')[0].split(',')
-
-        # for each predicate in the file (until the right description is found)
-        for pred_descr in preds_descr:
-            # extract name and args of the predicate
-            pred = pred_descr['predicate']
-            pred_name = pred.partition('(')[0]
-            pred_parts = pred.split('(')[1].split(')')[0].split(',')
-            # if the fact belongs to the current predicate
-            if pred_name == atom_name and len(pred_parts) == len(atom_args):
-                # extract the description of the predicate
-                atom_descr = pred_descr['description']
-                # verbalize the fact according to the description of the predicate
-                # by substituting the generic args of the predicate with the ones of the atom
-                for i in range(len(pred_parts)):
-                    fact_arg = atom_args[i]
-                    atom_descr = atom_descr.replace(pred_parts[i], ' ' + fact_arg)
-                # the atom has been verbalized, so return it
-                return atom_descr  
+    def __get_pred_description(self, glossary, atom):
+        # the description of the predicate the atom belongs to
+        entry = glossary.get(atom.predicate, len(atom.args))
+        if entry is None:
+            return None
+        # verbalize the fact according to the description of the predicate
+        # by substituting the generic args of the predicate with the ones of the atom
+        return glossary.render(entry, [' ' + fact_arg for fact_arg in atom.args])
+
+
+    '''
+        This method verbalizes the rules of a program one at a time, yielding the sentence of each rule
+
+        :param program: the deserialized progr file, as a list of {"rule": vadalog rule}
+        :param glossary: the compiled pred_file
+        :param is_recursive: whether the program is a recursive template
+    '''
+    def __verbalize_rules(self, program, glossary, is_recursive = False):
+        # for each rule in the program, we split the body between predicates and
+        # eventual conditions on variables -> useful for verbalizing conditions
+        for rule in program:
+            # print(rule)
+            parsed_rule = parse_rule(rule['rule'])
+            rule['rule'], rule['conditions'], rule['algebric'] = parsed_rule.text, parsed_rule.conditions, parsed_rule.algebric
+            head = parsed_rule.head.text
+            body = parsed_rule.body
+            # Detect recursion
+            if any(atom.text.startswith(parsed_rule.head.predicate) for atom in body):
+                # left recursion
+                if parsed_rule.head.predicate in body[0].text:
+                    left = ' indirectly via ENTITY'
+                    right = ''
+                # right recursion
+                if parsed_rule.head.predicate in body[1].text:
+                    left = ''
+                    right = ' indirectly via ENTITY'
             
-        return None
+            if body[0].text:
+                body_descr = ""
+                # this is the case of linear rules
+                if len(body) == 1:
+                    body_descr = "Since " + self.__get_pred_description(glossary, body[0])
+                # this is the case of join rules
+                if len(body) > 1:
+                    for atom in body:
+                        # if it is not a negated atom
+                        if not atom.text.startswith("not "):
+
+                            if not is_recursive:
+                                # distinct verbalization if it is the first fact in the join
+                                if body_descr == "":
+                                    body_descr = "Since " + self.__get_pred_description(glossary, atom)
+                                else:
+                                    body_descr += ", and " + self.__get_pred_description(glossary, atom)
+                            else:
+                                if body_descr == "":
+                                    body_descr = "Since " + self.__get_pred_description(glossary, atom) + right
+                                else:
+                                    body_descr += ", and " + self.__get_pred_description(glossary, atom) + left
+
+                        # if it is a negated atom
+                        else:
+                            atom_without_neg = parse_fact(atom.text[4:])
+                            # distinct verbalization if it is the first fact in the join
+                            if body_descr == "":
+                                body_descr += 'Since it is not true that ' + \
+                                              self.__get_pred_description(glossary, atom_without_neg)
+                            else:
+                                body_descr += ', and it is not true that ' + \
+                                              self.__get_pred_description(glossary, atom_without_neg)
+                                                
+                conditions_descr = ''
+                # add verbalizations of (eventual) conditions
+                if len(rule['conditions']) > 0 :
+                    conditions = rule['conditions']
+                    for cond in conditions:
+                     if cond.split('<')[0] in head.split('(')[1]:
+                        # different verbalization according to condition
+                        if '>=' in cond:
+                            conditions_descr += ', and ' + cond.split('>=')[0].strip() + \
+                                                ' is equal to or over ' + cond.split('>=')[1].strip()
+                        if '<=' in cond:
+                            conditions_descr += ', and ' + cond.split('<=')[0].strip() + \
+                                                ' is equal to or under ' + cond.split('<=')[1].strip()
+                        if '>' in cond and '<>' not in cond:
+                            conditions_descr += ', and ' + cond.split('>')[0].strip() + \
+                                                ' is over ' + cond.split('>')[1].strip()
+                        if '<' in cond and '<>' not in cond:
+                            conditions_descr += ', and ' + cond.split('<')[0].strip() + \
+                                                ' is under ' + cond.split('<')[1].strip()
+                        if '!=' in cond:
+                            conditions_descr += ', and ' + cond.split('!=')[0].strip() + \
+                                                ' is not ' + cond.split('!=')[1].strip()
+                        if '<>' in cond:
+                            conditions_descr += ', and ' + cond.split('<>')[0].strip() + \
+                                                ' is not ' + cond.split('<>')[1].strip()
+                        if '=' in cond and '\"' not in cond and '>' not in cond and '<' not in cond:
+                            conditions_descr += ', and ' + cond.split('=')[0].strip() + \
+                                                ' is equal to ' + cond.split('=')[1].strip()
+                        if '=' in cond and '\"' in cond and '>' not in cond and '<' not in cond:
+                            conditions_descr += ', and there is ' + cond.split('=')[1].strip()
+
+                # verbalize the head
+                head_descr = self.__get_pred_description(glossary, parsed_rule.head)
+                 
+                algebric_descr = ""
+                # verbalize algebric operation
+                if len(rule['algebric']) > 0:
+                    for oper in rule['algebric']:
+                      if oper.split('=')[0] in head.split('(')[1]:
+                        if '=' in oper and 'msum' not in oper:
+                            algebric_descr += ', with ' + oper.split('=')[0] + ' given by ' + oper.split('=')[1]
+                        # elif '=' in oper and 'msum' in oper:
+                        #     algebric_descr += ', with ' + oper.split('=')[0] + ' given by the sum over all the contributors' # + oper.split('msum(')[1].split(',')[1].split(')')[0].replace('<','').replace('>','')
+
+                # update the output file with the new verbalized step
+                if head_descr:
+                    head_descr = ", then " + head_descr
+                    try:
+                        rule_step_descr = body_descr + conditions_descr + head_descr + algebric_descr  + "." + '\n'
+                    except:
+                        try:
+                            rule_step_descr = body_descr + conditions_descr + head_descr  + "." + '\n'
+                        except:
+                            rule_step_descr = body_descr + head_descr + "." '\n'
+                    # delete double whitespaces
+                    rule_step_descr = rule_step_descr.replace('  ',' ')
+                    yield rule_step_descr
+
+
+    '''
+        This method returns the verbalization of a batch of programs, without reading or writing any file:
+        for each program, the list of the sentences of its rules
+
+        :param programs: a list of programs, each a list of vadalog rules
+        :param preds_descr: the deserialized pred_file, or a PredicateGlossary compiled from it
+        :param is_recursive: whether the programs are recursive templates
+    '''
+    def verbalize_programs(self, programs, preds_descr, is_recursive = False):
+        glossary = PredicateGlossary(preds_descr) if isinstance(preds_descr, list) else preds_descr
+        verbalizations = list()
+        for rules in programs:
+            sentences = list()
+            try:
+                for rule_step_descr in self.__verbalize_rules([{"rule": rule} for rule in rules], glossary, is_recursive):
+                    sentences.append(rule_step_descr)
+            except Exception as e:
+                print(f"An error occurred: {e}")
+            # split the sentences in lines as they would be read back from verb_program.txt
+            lines = io.StringIO(''.join(sentences), newline=None).readlines()
+            verbalizations.append([line.replace('\n','') for line in lines])
+        return verbalizations
 
 
     '''
@@ -65,122 +195,11 @@ class ProgramVerbalizer:
                 # deserialize progr file
                 program = json.load(v)
                 with open(predicates_path) as p:
-                    # deserialize pred file
-                    preds_descr = json.load(p)
+                    # deserialize pred file and compile the descriptions
+                    glossary = PredicateGlossary(json.load(p))
                     # create new output file or rewrite existing one
                     with open(output_path + "verb_program.txt", "w") as out:
-                        # for each rule in the program, we split the body between predicates and
-                        # eventual conditions on variables -> useful for verbalizing conditions
-                        for rule in program:
-                            # print(rule)
-                            rule['rule'], rule['conditions'], rule['algebric'] = split_condition_from_rule(rule)
-                            head, body = rule['rule'].split(":-")[0], rule['rule'].split(":-")[1]
-                            body = '-'+body
-                            # Detect recursion
-                            if ','+head.split("(")[0] in body or '-'+head.split("(")[0] in body:
-                                type_recursion = body.split('),')
-                                # left recursion
-                                if head.split("(")[0] in type_recursion[0]:
-                                    left = ' indirectly via ENTITY'
-                                    right = ''
-                                # right recursion
-                                if head.split("(")[0] in type_recursion[1]:
-                                    left = ''
-                                    right = ' indirectly via ENTITY'
-                            body = body[1:]
-                            # verbalize the body
-                            body = body.split('),')
-                            
-                            if body[0]:
-                                body_descr = ""
-                                # this is the case of linear rules
-                                if len(body) == 1:
-                                    body_descr = "Since " + self.__get_pred_description(preds_descr, body[0])
-                                # this is the case of join rules
-                                if len(body) > 1:
-                                    for atom in body:
-                                        # if it is not a negated atom
-                                        if not atom.startswith("not "):
-
-                                            if not is_recursive:
-                                                # distinct verbalization if it is the first fact in the join
-                                                if body_descr == "":
-                                                    body_descr = "Since " + self.__get_pred_description(preds_descr, atom)
-                                                else:
-                                                    body_descr += ", and " + self.__get_pred_description(preds_descr, atom)
-                                            else:
-                                                if body_descr == "":
-                                                    body_descr = "Since " + self.__get_pred_description(preds_descr, atom) + right
-                                                else:
-                                                    body_descr += ", and " + self.__get_pred_description(preds_descr, atom) + left
-
-                                        # if it is a negated atom
-                                        else:
-                                            atom_without_neg = atom[4:]
-                                            # distinct verbalization if it is the first fact in the join
-                                            if body_descr == "":
-                                                body_descr += 'Since it is not true that ' + \
-                                                              self.__get_pred_description(preds_descr, atom_without_neg)
-                                            else:
-                                                body_descr += ', and it is not true that ' + \
-                                                              self.__get_pred_description(preds_descr, atom_without_neg)
-                                                                
-                                conditions_descr = ''
-                                # add verbalizations of (eventual) conditions
-                                if len(rule['conditions']) > 0 :
-                                    conditions = rule['conditions']
-                                    for cond in conditions:
-                                     if cond.split('<')[0] in head.split('(')[1]:
-                                        # different verbalization according to condition
-                                        if '>=' in cond:
-                                            conditions_descr += ', and ' + cond.split('>=')[0].strip() + \
-                                                                ' is equal to or over ' + cond.split('>=')[1].strip()
-                                        if '<=' in cond:
-                                            conditions_descr += ', and ' + cond.split('<=')[0].strip() + \
-                                                                ' is equal to or under ' + cond.split('<=')[1].strip()
-                                        if '>' in cond and '<>' not in cond:
-                                            conditions_descr += ', and ' + cond.split('>')[0].strip() + \
-                                                                ' is over ' + cond.split('>')[1].strip()
-                                        if '<' in cond and '<>' not in cond:
-                                            conditions_descr += ', and ' + cond.split('<')[0].strip() + \
-                                                                ' is under ' + cond.split('<')[1].strip()
-                                        if '!=' in cond:
-                                            conditions_descr += ', and ' + cond.split('!=')[0].strip() + \
-                                                                ' is not ' + cond.split('!=')[1].strip()
-                                        if '<>' in cond:
-                                            conditions_descr += ', and ' + cond.split('<>')[0].strip() + \
-                                                                ' is not ' + cond.split('<>')[1].strip()
-                                        if '=' in cond and '\"' not in cond and '>' not in cond and '<' not in cond:
-                                            conditions_descr += ', and ' + cond.split('=')[0].strip() + \
-                                                                ' is equal to ' + cond.split('=')[1].strip()
-                                        if '=' in cond and '\"' in cond and '>' not in cond and '<' not in cond:
-                                            conditions_descr += ', and there is ' + cond.split('=')[1].strip()
-
-                                # verbalize the head
-                                head_descr = self.__get_pred_description(preds_descr, head)
-                                 
-                                algebric_descr = ""
-                                # verbalize algebric operation
-                                if len(rule['algebric']) > 0:
-                                    for oper in rule['algebric']:
-                                      if oper.split('=')[0] in head.split('(')[1]:
-                                        if '=' in oper and 'msum' not in oper:
-                                            algebric_descr += ', with ' + oper.split('=')[0] + ' given by ' + oper.split('=')[1]
-                                        # elif '=' in oper and 'msum' in oper:
-                                        #     algebric_descr += ', with ' + oper.split('=')[0] + ' given by the sum over all the contributors' # + oper.split('msum(')[1].split(',')[1].split(')')[0].replace('<','').replace('>','')
-
-                                # update the output file with the new verbalized step
-                                if head_descr:
-                                    head_descr = ", then " + head_descr
-                                    try:
-                                        rule_step_descr = body_descr + conditions_descr + head_descr + algebric_descr  + "." + '\n'
-                                    except:
-                                        try:
-                                            rule_step_descr = body_descr + conditions_descr + head_descr  + "." + '\n'
-                                        except:
-                                            rule_step_descr = body_descr + head_descr + "." '\n'
-                                    # delete double whitespaces
-                                    rule_step_descr = rule_step_descr.replace('  ',' ')
-                                    out.write(rule_step_descr)
+                        for rule_step_descr in self.__verbalize_rules(program, glossary, is_recursive):
+                            out.write(rule_step_descr)
         except Exception as e:
-            print(f"An error occurred: {e}")
\ No newline at end of file
+            print(f"An error occurred: {e}")
@@ -0,0 +1,144 @@
+from functools import lru_cache
+from parsedChase import parse_fact, parse_provenance, parse_rule, PARSE_CACHE_SIZE
+
+'''
+    This class compiles a rule of the chase into the skeleton of its verbalization:
+    the variables of the body atoms, the operands and verbalizations of each condition,
+    and the bindings of the algebric operations to the body and the head.
+
+    The same rule fires in many chase steps, so each rule is compiled once and a step
+    is verbalized by filling in the skeleton with the constants of its provenance
+'''
+class RuleSkeleton:
+
+    # operators in the order they are looked for in a condition
+    OPERATORS = ('>=', '<=', '<>', '!=', '>', '<', '=')
+
+    __slots__ = ('rule', 'slots', 'conditions', 'algebric')
+
+
+    '''
+        :param rule: a rule of the chase as a string, with the final dot
+    '''
+    def __init__(self, rule):
+        self.rule = parse_rule(rule)
+        # each variable of the body, with the position of its atom and of the arg in the atom
+        self.slots = tuple((i, j, var) for i, atom in enumerate(self.rule.body) for j, var in enumerate(atom.args))
+        self.conditions = tuple(self.__compile_condition(cond) for cond in self.rule.conditions)
+        self.algebric = tuple(self.__compile_algebric(oper) if '=' in oper else None for oper in self.rule.algebric)
+
+
+    '''
+        :param cond: a condition of the rule
+    '''
+    def __compile_condition(self, cond):
+        # the variable subject to condition
+        conditioned = cond
+        for operator in self.OPERATORS:
+            conditioned = conditioned.split(operator)[0]
+        # the other side of the condition operator
+        conditioning = cond
+        for operator in self.OPERATORS:
+            if operator in conditioning:
+                conditioning = conditioning.split(operator)[1]
+
+        # different verbalization according to condition, as (verbalization, operator)
+        branches = list()
+        if '>=' in cond:
+            branches.append((' is equal to or over ', '>='))
+        if '<=' in cond:
+            branches.append((' is equal to or under ', '<='))
+        if '>' in cond and '<>' not in cond:
+            branches.append((' is over ', '>'))
+        if '<' in cond and '<>' not in cond:
+            branches.append((' is under ', '<'))
+        if '!=' in cond:
+            branches.append((' is not ', '!='))
+        if '<>' in cond:
+            branches.append((' is not ', '<>'))
+        if '=' in cond and '\"' not in cond and '>' not in cond and '<' not in cond:
+            branches.append((' is equal to ', '='))
+        if '=' in cond and '\"' in cond and '>' not in cond and '<' not in cond:
+            # a string constant, verbalized without the variable
+            branches.append((None, None))
+
+        return cond, conditioned, conditioning, tuple(branches)
+
+
+    '''
+        :param oper: an algebric operation of the rule
+    '''
+    def __compile_algebric(self, oper):
+        formula = oper.split('=')[1]
+        result = oper.split('=')[0]
+        formula_sep = formula.replace('+', ' + ').replace('-',' - ').replace('*',' * ').replace('/',' / ') \
+                             .replace('(',' ( ').replace(')',' ) ').replace('msum','msum ').split(' ')
+        # position in the first body atom of each variable in the formula
+        variables = self.rule.body[0].args
+        bindings = tuple(variables.index(token) if token in variables else None for token in formula_sep)
+        # position in the head of the result of the operation
+        head_args = self.rule.head.args
+        position = head_args.index(result) if result in head_args else None
+        return tuple(formula_sep), bindings, position, 'msum' in formula
+
+
+    '''
+        This method returns the constant of the provenance bound to a variable of the body
+
+        :param value: a variable of the rule
+        :param provenance: the provenance of the step as a tuple of facts
+    '''
+    def resolve(self, value, provenance):
+        for i, j, var in self.slots:
+            if value == var:
+                value = parse_fact(provenance[i]).args[j]
+        return value
+
+
+    '''
+        This method returns the value on the other side of a condition,
+        resolved to a constant of the provenance if it is a variable
+
+        :param condition: a compiled condition of the rule
+        :param provenance: the provenance of the step as a tuple of facts
+    '''
+    def resolve_conditioning(self, condition, provenance):
+        value = condition[2]
+        try:
+            for i, j, var in self.slots:
+                if value == var:
+                    value = parse_fact(provenance[i]).args[j]
+        except:
+            for operator in self.OPERATORS:
+                if operator in value:
+                    return value.split(operator)[1]
+        return value
+
+
+    '''
+        This method returns the verbalization of the result of an algebric operation
+
+        :param k: the position of the operation in the rule
+        :param name: the fact derived in the step
+        :param original_provenance: the provenance of the step before replacing temporary atoms
+    '''
+    def realize_algebric(self, k, name, original_provenance):
+        formula_sep, bindings, position, is_msum = self.algebric[k]
+        constants = parse_fact(parse_provenance(original_provenance)[0]).args
+        formula_sep = [constants[i] if i is not None else token for token, i in zip(formula_sep, bindings)]
+
+        if position is None:
+            return ''
+        result_operation = parse_fact(name).args[position]
+        if not is_msum:
+            return ', with ' + result_operation + ' given by ' + ''.join(formula_sep)
+        verb_msum = ', with ' + result_operation + ' given by the sum over all the contributors'
+        return verb_msum.replace('<','').replace('>','')
+
+
+'''
+    :param rule: a rule of the chase as a string, with the final dot
+'''
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def get_rule_skeleton(rule):
+    return RuleSkeleton(rule)
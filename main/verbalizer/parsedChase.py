@@ -0,0 +1,121 @@
+import sys
+from functools import lru_cache
+from utilsFunctions import split_condition_from_rule
+
+'''
+    Compact parsed representation of the facts, rules and provenances of a chase graph,
+    shared by the preprocessor, the verbalizers and the templates generator.
+
+    Each string is parsed once: the parse functions are memoized, so the same fact,
+    rule or provenance met again in a later step returns the same parsed object
+'''
+
+PARSE_CACHE_SIZE = 1 << 20
+
+
+'''
+    A fact (or an atom of a rule), with an interned predicate name and the tuple of its arguments
+'''
+class Fact:
+
+    __slots__ = ('text', 'predicate', 'args')
+
+    def __init__(self, text, predicate, args):
+        self.text = text
+        self.predicate = predicate
+        self.args = args
+
+    def __repr__(self):
+        return self.text
+
+
+'''
+    A rule split into its head, body atoms, conditions on variables and algebric operations,
+    where text is the rule without conditions nor algebric operations,
+    and compact is the whole rule without spaces, but the one after each negation, as the templates write it
+'''
+class Rule:
+
+    __slots__ = ('text', 'head', 'body', 'conditions', 'algebric', 'compact')
+
+    def __init__(self, text, head, body, conditions, algebric, compact):
+        self.text = text
+        self.head = head
+        self.body = body
+        self.conditions = conditions
+        self.algebric = algebric
+        self.compact = compact
+
+    def __repr__(self):
+        return self.text
+
+
+'''
+    :param fact: a fact (or an atom) as a string, e.g., own(A,B,0.5)
+'''
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_fact(fact):
+    if '(' not in fact:
+        return Fact(fact, sys.intern(fact), ())
+    return Fact(fact, sys.intern(fact.partition('(')[0]), tuple(fact.split('(')[1].split(')')[0].split(',')))
+
+
+'''
+    :param provenance: a provenance as a string, e.g., [company(A), own(A,B,0.5)]
+'''
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_provenance(provenance):
+    return tuple(provenance.split('[')[1].split(']')[0].split(', '))
+
+
+'''
+    :param rule: a rule of the chase as a string, with the final dot
+'''
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_rule(rule):
+    compact = rule.replace('not ','not_').replace(' ','').replace('not_','not ') if rule else rule
+    text, conditions, algebric = split_condition_from_rule({'rule': rule})
+    if not text:
+        return Rule(text, None, (), (), (), compact)
+    head, body = text.split(':-')[0], text.split(':-')[1]
+    atoms = list()
+    for atom in body.split('.')[0].split('),'):
+        atoms.append(Fact(atom, sys.intern(atom.partition('(')[0]),
+                          tuple(atom.split('(')[1].replace(')', '').split(','))))
+    return Rule(text, parse_fact(head), tuple(atoms), tuple(conditions), tuple(algebric), compact)
+
+
+'''
+    This class interns the facts of a chase, so that each provenance is stored
+    as a tuple of integer ids instead of a string
+'''
+class FactTable:
+
+    __slots__ = ('ids', 'facts')
+
+    def __init__(self):
+        self.ids = {}
+        self.facts = []
+
+    '''
+        :param fact: a fact as a string
+    '''
+    def intern(self, fact):
+        fact_id = self.ids.get(fact)
+        if fact_id is None:
+            fact_id = len(self.facts)
+            self.ids[fact] = fact_id
+            self.facts.append(sys.intern(fact))
+        return fact_id
+
+    '''
+        :param provenance: a provenance as a string
+    '''
+    def provenance(self, provenance):
+        return tuple(self.intern(fact) for fact in parse_provenance(provenance))
+
+    '''
+        :param fact_ids: a tuple of ids of facts
+    '''
+    def texts(self, fact_ids):
+        return [self.facts[fact_id] for fact_id in fact_ids]
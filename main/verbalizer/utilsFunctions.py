@@ -66,3 +66,94 @@ def split_condition_from_rule(entry):
     except:
         return [], [], []
 
+'''
+    This function reads a .json file containing an array and yields its elements
+    one at a time, without deserializing the whole document in memory
+
+    :param path: path to the .json file
+    :param chunk_size: number of characters read from the file at a time
+'''
+def iter_json_array(path, chunk_size=1 << 20):
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buffer = f.read(chunk_size)
+        eof = not buffer
+        pos = 0
+        opened = False
+        while True:
+            # skip whitespace, the opening bracket and the separators between elements
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ',' or (not opened and buffer[pos] == '[')):
+                if buffer[pos] == '[':
+                    opened = True
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+                # an element at the end of the buffer may have been cut by the chunk
+                if end == len(buffer) and not eof:
+                    raise ValueError
+            except ValueError:
+                if eof:
+                    if pos >= len(buffer):
+                        return
+                    raise
+                # drop what has been consumed and read more of the file
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield element
+            pos = end
+
+'''
+    This function reads the elements of a .json file containing an array that follow a byte offset,
+    e.g., the ones appended to the array after a previous read, and returns them together with
+    the byte offset of the closing bracket, from which the next read can start
+
+    :param path: path to the .json file
+    :param offset: byte offset where to start reading, 0 to read the whole array
+'''
+def read_json_array_tail(path, offset=0):
+    decoder = json.JSONDecoder()
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        tail = f.read().decode('utf-8')
+    elements = list()
+    pos = 0
+    while True:
+        # skip whitespace, the opening bracket and the separators between elements
+        while pos < len(tail) and (tail[pos].isspace() or tail[pos] == ',' or tail[pos] == '['):
+            pos += 1
+        if pos >= len(tail) or tail[pos] == ']':
+            break
+        element, pos = decoder.raw_decode(tail, pos)
+        elements.append(element)
+    return elements, offset + len(tail[:pos].encode('utf-8'))
+
+'''
+    This function appends elements to a .json file containing an array,
+    written as '[' followed by the elements separated by '\n,' and by '\n]'
+
+    :param path: path to the .json file
+    :param elements: the elements to append
+'''
+def append_json_array(path, elements):
+    with open(path, 'r+b') as f:
+        end = f.seek(0, 2)
+        start = f.seek(max(0, end - 64))
+        tail = f.read()
+        # drop the closing bracket and the whitespace before it
+        before = tail[:tail.rindex(b']')].rstrip()
+        f.seek(start + len(before))
+        f.truncate()
+        # an empty array is continued right after its opening bracket
+        first = before.endswith(b'[')
+        for element in elements:
+            if first:
+                first = False
+            else:
+                f.write(b'\n,')
+            f.write(json.dumps(element, separators=(",", ":")).encode('utf-8'))
+        f.write(b'\n]')
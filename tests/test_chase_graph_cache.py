@@ -0,0 +1,149 @@
+import json
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_path, 'main', 'verbalizer'))
+from ChaseGraphCache import ChaseGraphCache
+
+# the chase graphs of the applications, the verbalized one of stress_test is not a valid .json file
+CHASE_GRAPHS = [(application, name) for application in ['company_control', 'close_link', 'stress_test']
+                for name in ['num_chase_graph.json', 'verb_chase_graph.json']
+                if (application, name) != ('stress_test', 'verb_chase_graph.json')]
+
+'''
+    These tests check that the binary file of a chase graph gives back its steps, is written once in the cache
+    directory for each .json file, and is rebuilt only when the content of the .json file changes
+'''
+class TestChaseGraphCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    '''
+        This method writes a chase graph to a .json file
+
+        :param name: the name of the file
+        :param chase: the steps of the chase graph
+    '''
+    def write_chase(self, name, chase):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as c:
+            json.dump(chase, c)
+        return path
+
+
+    '''
+        :param name: the derived fact
+        :param number: the hierarchical numbers of the step
+    '''
+    def step(self, name, number):
+        return {'name': name, 'pattern': name, 'provenance': '[]', 'rule': None, 'number': number}
+
+
+    '''
+        This method checks that the cache of a chase graph gives back each field of each step,
+        and the positions of the steps by name and by number
+
+        :param cache: the ChaseGraphCache of the chase graph
+        :param chase: the steps of the chase graph
+    '''
+    def check_steps(self, cache, chase):
+        self.assertEqual(len(cache), len(chase))
+        positions = dict()
+        for i, step in enumerate(chase):
+            for field, value in step.items():
+                self.assertEqual(cache.get_string(field, i), value)
+            for field in ['name', 'derived_fact']:
+                if field in step:
+                    positions.setdefault((field, step[field]), []).append(i)
+            for number in step['number']:
+                positions.setdefault(('number', number), []).append(i)
+        for (field, text), expected in positions.items():
+            self.assertEqual(cache.index(field)[text].tolist(), expected)
+
+
+    def test_applications(self):
+        for application, name in CHASE_GRAPHS:
+            path = os.path.join(root_path, 'Knowledge_Graph_Applications', application, name)
+            with self.subTest(application=application, name=name), open(path) as c:
+                self.check_steps(ChaseGraphCache(path, self.cache_dir), json.load(c))
+
+
+    def test_lookups(self):
+        chase = [self.step('own(A,B)', ['1']), self.step('own(B,C)', ['3']),
+                 self.step('control(A,B)', ['1.1', '3.1', '1.1'])]
+        cache = ChaseGraphCache(self.write_chase('chase_graph.json', chase), self.cache_dir)
+        self.check_steps(cache, chase)
+        self.assertEqual(cache.get_strings('number', 2), ['1.1', '3.1', '1.1'])
+        self.assertEqual(cache.index('number')['1.1'].tolist(), [2, 2])
+        self.assertEqual(cache.find_string('own(A,C)'), -1)
+        self.assertNotIn('own(A,C)', cache.index('name'))
+        self.assertEqual(sorted(cache.index('name')), ['control(A,B)', 'own(A,B)', 'own(B,C)'])
+        self.assertEqual(pickle.loads(pickle.dumps(cache)).get_string('name', 1), 'own(B,C)')
+
+
+    def test_rebuilt_on_change(self):
+        path = self.write_chase('chase_graph.json', [self.step('own(A,B)', ['1'])])
+        cache = ChaseGraphCache(path, self.cache_dir)
+        inode = os.stat(cache.cache_path).st_ino
+
+        # the same content with a new modification time only updates the header
+        ChaseGraphCache(path, self.cache_dir)
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(ChaseGraphCache(path, self.cache_dir).stamp[0], 0)
+        self.assertEqual(os.stat(cache.cache_path).st_ino, inode)
+
+        chase = [self.step('own(A,C)', ['1']), self.step('own(C,D)', ['3'])]
+        self.write_chase('chase_graph.json', chase)
+        self.check_steps(ChaseGraphCache(path, self.cache_dir), chase)
+        self.assertNotEqual(os.stat(cache.cache_path).st_ino, inode)
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(cache.cache_path)])
+
+
+    # the files of the chase graphs whose .json file has been removed are deleted when another one is written
+    def test_stale_entries_removed(self):
+        first = self.write_chase('first.json', [self.step('own(A,B)', ['1'])])
+        second = self.write_chase('second.json', [self.step('own(B,C)', ['1'])])
+        first_cache = ChaseGraphCache(first, self.cache_dir)
+        ChaseGraphCache(second, self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        os.remove(first)
+        third = self.write_chase('third.json', [self.step('own(C,D)', ['1'])])
+        ChaseGraphCache(third, self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertNotIn(os.path.basename(first_cache.cache_path), os.listdir(self.cache_dir))
+        # the .json files are never written beside
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['cache', 'second.json', 'third.json'])
+
+
+    # when the cache directory cannot be written, the arrays are kept in memory
+    def test_not_written(self):
+        chase = [self.step('own(A,B)', ['1']), self.step('control(A,B)', ['1.1'])]
+        blocked = self.write_chase('blocked', [])
+        cache = ChaseGraphCache(self.write_chase('chase_graph.json', chase), blocked)
+        self.check_steps(cache, chase)
+
+
+    def test_default_cache_dir(self):
+        path = self.write_chase('chase_graph.json', [self.step('own(A,B)', ['1'])])
+        with unittest.mock.patch.dict(os.environ, {'CHASE_GRAPH_CACHE_DIR': self.cache_dir}):
+            self.assertEqual(ChaseGraphCache(path).cache_dir, self.cache_dir)
+        with unittest.mock.patch.dict(os.environ, {'CHASE_GRAPH_CACHE_DIR': '', 'XDG_CACHE_HOME': self.directory.name}):
+            self.assertEqual(ChaseGraphCache(path).cache_dir,
+                             os.path.join(self.directory.name, 'template-based-inference', 'chase_graphs'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import itertools
+import os
+import random
+import sys
+import unittest
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_path, 'main', 'preprocessor'))
+from ContributorSolver import ContributorSolver
+
+'''
+    These tests check that ContributorSolver finds the smallest subset of contributions summing
+    to the aggregated value on each of its search paths
+'''
+class TestContributorSolver(unittest.TestCase):
+
+    '''
+        This method returns the size of the smallest subset of contributions summing to the target,
+        enumerating all the subsets, or None if there is no such subset
+
+        :param contributions: the values of the contributors to the aggregation
+        :param target: the aggregated value
+        :param tolerance: relative tolerance for two sums to be considered equal
+    '''
+    def brute_force_size(self, contributions, target, tolerance=1e-9):
+        tol = tolerance * max(1.0, abs(target))
+        for size in range(1, len(contributions) + 1):
+            for subset in itertools.combinations(contributions, size):
+                if abs(sum(subset) - target) <= tol:
+                    return size
+        return None
+
+
+    '''
+        :param solver: the ContributorSolver under test
+        :param contributions: the values of the contributors to the aggregation
+        :param target: the aggregated value
+        :param size: the expected size of the subset
+        :param tolerance: relative tolerance of the solver
+    '''
+    def check_subset(self, solver, contributions, target, size, tolerance=1e-9):
+        subset = solver.solve(contributions, target)
+        self.assertEqual(len(subset), size)
+        self.assertEqual(subset, sorted(set(subset)))
+        self.assertAlmostEqual(sum(contributions[k] for k in subset), target, delta=tolerance * max(1.0, abs(target)))
+        return subset
+
+
+    def test_empty_and_missing(self):
+        solver = ContributorSolver()
+        self.assertEqual(solver.solve([], 1.0), [])
+        self.assertEqual(solver.solve([1.0, 2.0, 4.0], 8.0), [])
+        self.assertEqual(solver.solve([float(2 ** i) for i in range(50)], 0.5), [])
+
+
+    def test_single_pair_triple(self):
+        solver = ContributorSolver()
+        self.assertEqual(self.check_subset(solver, [5.0, 3.0, 7.0], 7.0, 1), [2])
+        self.check_subset(solver, [1.0, 9.0, 4.0, 6.0], 10.0, 2)
+        self.check_subset(solver, [1.0, 2.0, 4.0, 8.0, 16.0], 13.0, 3)
+
+
+    def test_meet_in_the_middle(self):
+        solver = ContributorSolver()
+        contributions = [float(2 ** i) for i in range(20)]
+        self.check_subset(solver, contributions, float(2 ** 0 + 2 ** 5 + 2 ** 11 + 2 ** 19), 4)
+        self.check_subset(solver, contributions, float(2 ** 20 - 1), 20)
+
+        generator = random.Random(0)
+        for _ in range(50):
+            contributions = [float(generator.randint(1, 60)) for _ in range(generator.randint(4, 12))]
+            target = float(generator.randint(1, 200))
+            size = self.brute_force_size(contributions, target)
+            self.assertEqual(len(ContributorSolver().solve(contributions, target)), size or 0)
+
+
+    # beyond max_mitm_size, the dynamic programming finds the smallest subset without looking for triples first
+    def test_dynamic_programming(self):
+        solver = ContributorSolver(max_mitm_size=10)
+        contributions = [float(2 ** i) for i in range(16)]
+        self.check_subset(solver, contributions, float(2 ** 1 + 2 ** 4 + 2 ** 9), 3)
+        self.check_subset(solver, contributions, float(2 ** 2 + 2 ** 6 + 2 ** 8 + 2 ** 13 + 2 ** 15), 5)
+
+        generator = random.Random(1)
+        for _ in range(30):
+            contributions = [generator.randint(1, 40) / 4 for _ in range(generator.randint(11, 14))]
+            target = generator.randint(1, 200) / 4
+            size = self.brute_force_size(contributions, target)
+            self.assertEqual(len(solver.solve(contributions, target)), size or 0)
+
+
+    # the resolution is the largest step of which all the contributions are multiples, so small ones are not rounded away
+    def test_derived_resolution(self):
+        solver = ContributorSolver(max_mitm_size=3)
+        self.check_subset(solver, [0.25, 0.1, 0.1, 0.1, 0.1, 0.1], 0.65, 5)
+        self.check_subset(solver, [100.0, 200.0, 300.0, 0.001, 0.002, 0.004], 600.007, 6)
+        self.check_subset(solver, [1000.0, 0.5, 0.25, 0.125, 2000.0, 4000.0], 7000.875, 6)
+
+
+    def test_given_resolution(self):
+        contributions = [0.5, 1.5, 2.5, 3.5, 4.5, 5.5]
+        self.check_subset(ContributorSolver(max_mitm_size=3, resolution=0.5), contributions, 18.0, 6)
+        # a resolution coarser than the contributions rounds them to nothing and falls back to the exact search
+        self.check_subset(ContributorSolver(max_mitm_size=3, resolution=10.0), contributions, 18.0, 6)
+
+
+    # contributions with more decimals than max_decimals cannot be discretized and are searched exactly
+    def test_exact_search_fallback(self):
+        solver = ContributorSolver(max_mitm_size=3)
+        contributions = [1 / 3, 1 / 7, 1 / 11, 1 / 13, 1 / 17]
+        self.check_subset(solver, contributions, 1 / 3 + 1 / 7 + 1 / 11 + 1 / 13 + 1 / 17, 5)
+        self.assertEqual(solver.solve(contributions, 1.0), [])
+
+
+    # when neither the table nor the exact search fit, only subsets up to triples are found
+    def test_limited_to_triples(self):
+        contributions = [1 / 3, 1 / 7, 1 / 11, 1 / 13, 1 / 17, 1 / 19]
+        solver = ContributorSolver(max_mitm_size=3, max_dp_cells=4)
+        self.check_subset(solver, contributions, 1 / 3 + 1 / 11 + 1 / 19, 3)
+        self.assertEqual(solver.solve(contributions, 1 / 3 + 1 / 7 + 1 / 11 + 1 / 13), [])
+
+        negatives = [-4.0, 1.0, 2.0, 8.0, 16.0]
+        self.check_subset(ContributorSolver(max_mitm_size=3), negatives, 5.0, 3)
+        self.check_subset(ContributorSolver(max_mitm_size=3, max_dp_cells=10), [1.0, 2.0, 4.0, 8.0, 16.0], 28.0, 3)
+
+
+    def test_tolerance(self):
+        solver = ContributorSolver()
+        self.check_subset(solver, [0.1, 0.2, 0.7], 0.3, 2)
+        self.check_subset(ContributorSolver(max_mitm_size=3), [0.1] * 10, 1.0, 10)
+        # the tolerance is relative to the aggregated value
+        self.check_subset(solver, [1e12, 1.0, 3e12], 4e12 + 1e-3, 2)
+        self.assertEqual(solver.solve([1.0, 2.0], 3.001), [])
+        self.check_subset(ContributorSolver(tolerance=1e-3), [1.0, 2.0], 3.001, 2, 1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
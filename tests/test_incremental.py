@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_path, 'main', 'verbalizer'))
+sys.path.insert(0, os.path.join(root_path, 'main', 'preprocessor'))
+from FilePreprocessor import FilePreprocessor
+from ChaseGraphVerbalizer import ChaseGraphVerbalizer
+from AggregateVerbalizer import VerbalizationFinder
+from IncrementalManifest import IncrementalManifest
+from utilsFunctions import append_json_array
+
+APPLICATIONS = ['company_control', 'close_link', 'stress_test']
+
+'''
+    These tests number and verbalize the chase graphs of the applications in batches, in incremental mode,
+    and check that the derivation and the explanation of each fact are the same as numbering and verbalizing
+    the whole chase graph at once
+'''
+class TestIncremental(unittest.TestCase):
+
+    # the binary files of the chase graphs are written to a temporary cache directory
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.environ = unittest.mock.patch.dict(os.environ, {'CHASE_GRAPH_CACHE_DIR': self.cache_dir.name})
+        self.environ.start()
+
+
+    def tearDown(self):
+        self.environ.stop()
+        self.cache_dir.cleanup()
+
+
+    '''
+        This method numbers and verbalizes a chase graph, in one run or in incremental runs, and returns the output path
+
+        :param chase: the steps of the chase graph
+        :param predicates_path: path to the predicates.json file
+        :param output_path: path to the output folder
+        :param cuts: the number of steps in the chase graph at each incremental run, or None for a single full run
+    '''
+    def run_pipeline(self, chase, predicates_path, output_path, cuts=None):
+        preprocessor = FilePreprocessor()
+        verbalizer = ChaseGraphVerbalizer()
+        chase_path = output_path + "chase_graph.json"
+        if cuts is None:
+            preprocessor.write_chase_graph(chase, chase_path)
+            preprocessor.number_chase_graph(chase_path, output_path)
+            verbalizer.verbalize_chase_graph(output_path + "num_chase_graph.json", predicates_path, output_path)
+            return output_path
+
+        preprocessor.write_chase_graph(chase[:cuts[0]], chase_path)
+        previous = cuts[0]
+        for cut in cuts:
+            append_json_array(chase_path, chase[previous:cut])
+            previous = cut
+            preprocessor.number_chase_graph(chase_path, output_path, incremental=True)
+            verbalizer.verbalize_chase_graph(output_path + "num_chase_graph.json", predicates_path, output_path,
+                                             incremental=True)
+        return output_path
+
+
+    '''
+        This method returns the derivation of each fact in the numbered chase graph and the explanation
+        of each fact in the verbalized one
+
+        :param output_path: path to the output folder
+    '''
+    def explain_all(self, output_path):
+        finder = VerbalizationFinder()
+        num_chase_path = output_path + "num_chase_graph.json"
+        verb_chase_path = output_path + "verb_chase_graph.json"
+        with open(num_chase_path) as c:
+            facts = dict.fromkeys(step['name'] for step in json.load(c))
+        with open(verb_chase_path) as c:
+            verbalized_facts = dict.fromkeys(step['derived_fact'] for step in json.load(c))
+        derivations = {fact: finder.get_chase_fact(num_chase_path, fact) for fact in facts}
+        explanations = {fact: finder.verbalize_fact(verb_chase_path, None, fact, True) for fact in verbalized_facts}
+        return derivations, explanations
+
+
+    '''
+        :param application: the name of the application
+        :param cuts: the number of steps in the chase graph at each incremental run, as a function of its length
+    '''
+    def check_application(self, application, cuts):
+        with open(os.path.join(root_path, 'Knowledge_Graph_Applications', application, 'aggr_chase_graph.json')) as c:
+            chase = json.load(c)
+        predicates_path = os.path.join(root_path, 'Domain_Glossary', application, 'predicates.json')
+        with tempfile.TemporaryDirectory() as full_path, tempfile.TemporaryDirectory() as incremental_path:
+            full = self.run_pipeline(chase, predicates_path, full_path + os.sep)
+            incremental = self.run_pipeline(chase, predicates_path, incremental_path + os.sep, cuts(len(chase)))
+            self.assertEqual(self.explain_all(full), self.explain_all(incremental))
+            for name in ["num_chase_graph.json", "verb_chase_graph.json"]:
+                with open(full + name) as f, open(incremental + name) as i:
+                    self.assertEqual(json.load(f), json.load(i))
+
+            manifest = IncrementalManifest(incremental + "num_manifest.db")
+            generation = manifest.get('generation')
+            manifest.close()
+            return generation
+
+
+    def test_batches(self):
+        for application in APPLICATIONS:
+            with self.subTest(application=application):
+                self.check_application(application, lambda steps: [steps // 3, 2 * steps // 3, steps])
+
+
+    # the last steps do not consume the ground facts before the last one, so they are appended without numbering the chase again
+    def test_appended_steps(self):
+        for application in APPLICATIONS:
+            with self.subTest(application=application):
+                self.assertEqual(self.check_application(application, lambda steps: [steps - 3, steps]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
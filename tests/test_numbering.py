@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_path, 'main', 'verbalizer'))
+sys.path.insert(0, os.path.join(root_path, 'main', 'preprocessor'))
+from FilePreprocessor import FilePreprocessor
+
+'''
+    These tests check the hierarchical numbering of the steps of a chase graph
+'''
+class TestNumbering(unittest.TestCase):
+
+    '''
+        This method returns a chase step
+
+        :param name: the derived fact
+        :param provenance: the facts the step consumes
+        :param rule: the rule of the step, None for a ground fact
+    '''
+    def step(self, name, provenance=(), rule=None):
+        return {'name': name,
+                'pattern': name,
+                'provenance': '[' + ', '.join(provenance) + ']',
+                'rule': rule}
+
+
+    '''
+        :param chase: the steps of the chase graph
+    '''
+    def get_numbers(self, chase):
+        return {step['name']: step['number'] for step in FilePreprocessor().get_num_chase_graph(chase)}
+
+
+    # a fact whose name is a prefix of another one, e.g., company(A) and company(AB), is not consumed by its steps
+    def test_prefix_is_not_a_child(self):
+        chase = [self.step('company(A)'),
+                 self.step('company(AB)'),
+                 self.step('control(AB,AB)', ['company(AB)'], 'control(X,X) :- company(X).'),
+                 self.step('control(A,A)', ['company(A)'], 'control(X,X) :- company(X).')]
+        self.assertEqual(self.get_numbers(chase), {'company(A)': ['1'],
+                                                   'company(AB)': ['3'],
+                                                   'control(AB,AB)': ['3.1'],
+                                                   'control(A,A)': ['1.1']})
+
+
+    # a fact consumed by several steps, or more than once by the same step, gives one number to each of them
+    def test_shared_parents(self):
+        chase = [self.step('own(A,B,30)'),
+                 self.step('own(A,B,40)'),
+                 self.step('own(B,C,60)'),
+                 self.step('sum(A,B)', ['own(A,B,30)', 'own(A,B,40)'], 'sum(X,Y) :- own(X,Y,W).'),
+                 self.step('control(A,C)', ['sum(A,B)', 'own(B,C,60)', 'own(B,C,60)'], 'control(X,Z) :- sum(X,Y), own(Y,Z,W).'),
+                 self.step('vatom_1(A,C)', ['control(A,C)'], 'vatom_1(X,Y) :- control(X,Y).')]
+        self.assertEqual(self.get_numbers(chase), {'own(A,B,30)': ['1'],
+                                                   'own(A,B,40)': ['3'],
+                                                   'own(B,C,60)': ['5'],
+                                                   'sum(A,B)': ['1.1', '3.1'],
+                                                   'control(A,C)': ['1.1.1', '3.1.1', '5.1'],
+                                                   'vatom_1(A,C)': ['1.1.1.T1', '3.1.1.T1', '5.1.T1']})
+
+
+    # chains deeper than the recursion limit are numbered without recursion
+    def test_deep_chain(self):
+        depth = 2 * sys.getrecursionlimit()
+        chase = [self.step('p0(A)')]
+        for i in range(1, depth + 1):
+            chase.append(self.step(f'p{i}(A)', [f'p{i - 1}(A)'], f'p{i}(X) :- p{i - 1}(X).'))
+        numbers = self.get_numbers(chase)
+        self.assertEqual(numbers['p0(A)'], ['1'])
+        self.assertEqual(numbers[f'p{depth}(A)'], ['1' + '.1' * depth])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_path, 'main', 'verbalizer'))
+sys.path.insert(0, root_path)
+from main.TemplatesGenerator import TemplatesGenerator
+
+'''
+    These tests check the templates enumerated from the dependency graph of a program
+'''
+class TestTemplates(unittest.TestCase):
+
+    '''
+        This method returns the plans of a chain of linear rules from the facts of an input predicate,
+        e.g., b1(X) :- b0(X). and b2(X) :- b1(X). for the chain b of length 2
+
+        :param chain: the name of the predicates of the chain
+        :param length: the number of rules of the chain
+    '''
+    def chain_plans(self, chain, length):
+        plans = [{"sources": "[]", "type": "FactInputPlan", "atom": f"{chain}0", "plan": f"Facts for {chain}0"}]
+        sources = f"Facts for {chain}0"
+        for i in range(1, length + 1):
+            rule = f"{chain}{i}(X) :- {chain}{i - 1}(X)."
+            plans.append({"sources": f"[{sources}]", "type": "LinearPlan", "atom": f"{chain}{i}", "plan": rule})
+            sources = rule
+        return plans
+
+
+    '''
+        This method returns the templates of a program, as get_program_paths does, without the cache
+
+        :param plans: the plans of the dependency graph of the program
+        :param predicates: the names of the predicates of the program, all with a single argument
+    '''
+    def get_templates(self, plans, predicates):
+        with tempfile.TemporaryDirectory() as output_path:
+            plan_path = os.path.join(output_path, 'dependency_graph.json')
+            predicates_path = os.path.join(output_path, 'predicates.json')
+            with open(plan_path, 'w') as p:
+                json.dump(plans, p)
+            with open(predicates_path, 'w') as p:
+                json.dump([{"predicate": f"{predicate}(arg_1)",
+                            "specifics": {"type": "relationship", "terms": [{"name": "arg_1", "type": "entity"}]},
+                            "description": f"arg_1 is {predicate}",
+                            "skip": False} for predicate in predicates], p)
+            return TemplatesGenerator().get_program_paths(plan_path, output_path + os.sep, predicates_path, use_cache=False)
+
+
+    # derivations longer than 25 steps are no longer truncated
+    def test_long_chain(self):
+        length = 60
+        plans = self.chain_plans('p', length)
+        plans.append({"sources": f"[{plans[-1]['plan']}]", "type": "OutputPlan", "atom": f"p{length}", "plan": f"p{length}"})
+        templates, _, templates_verb = self.get_templates(plans, [f"p{i}" for i in range(length + 1)])
+
+        self.assertEqual(templates, [[f"p{i}(X):-p{i - 1}(X)." for i in range(1, length + 1)]])
+        self.assertEqual(len(templates_verb[0]), length)
+        self.assertEqual(templates_verb[0][-1], f"Since X is p{length - 1}, then X is p{length}.")
+
+
+    # each alternative derivation of the output gives its own template, with all its steps
+    def test_alternative_chains(self):
+        length = 30
+        plans = self.chain_plans('a', length) + self.chain_plans('b', length)
+        for chain in 'ab':
+            plans.append({"sources": f"[{chain}{length}(X) :- {chain}{length - 1}(X).]", "type": "LinearPlan",
+                          "atom": "q", "plan": f"q(X) :- {chain}{length}(X)."})
+        plans.append({"sources": f"[q(X) :- a{length}(X)., q(X) :- b{length}(X).]", "type": "OutputPlan", "atom": "q", "plan": "q"})
+        predicates = [f"{chain}{i}" for chain in 'ab' for i in range(length + 1)] + ['q']
+        templates, _, _ = self.get_templates(plans, predicates)
+
+        expected = [[f"{chain}{i}(X):-{chain}{i - 1}(X)." for i in range(1, length + 1)] + [f"q(X):-{chain}{length}(X)."]
+                    for chain in 'ab']
+        self.assertEqual(sorted(templates), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
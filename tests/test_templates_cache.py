@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_path)
+from main.TemplatesCache import TemplatesCache
+
+'''
+    These tests check that the templates cache is reused, invalidated by its inputs and pruned of stale entries
+'''
+class TestTemplatesCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+        self.cache = TemplatesCache(self.cache_dir)
+        self.generated = 0
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    '''
+        This method writes an input file of the templates
+
+        :param name: the name of the file
+        :param content: the content of the file
+    '''
+    def write_input(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+
+    '''
+        This method returns the templates generated from an input file, through the cache
+
+        :param path: path to the input file
+    '''
+    def get_templates(self, path):
+        def generate():
+            self.generated += 1
+            with open(path) as f:
+                return [[f.read()]]
+        return self.cache.get(self.cache.get_key('program_paths', paths=[path]), generate)
+
+
+    def test_reused_and_invalidated(self):
+        path = self.write_input('dependency_graph.json', 'first')
+        self.assertEqual(self.get_templates(path), [['first']])
+        self.assertEqual(self.get_templates(path), [['first']])
+        self.assertEqual(self.generated, 1)
+
+        self.write_input('dependency_graph.json', 'second')
+        self.assertEqual(self.get_templates(path), [['second']])
+        self.assertEqual(self.generated, 2)
+        # the templates are written in the cache directory only, not beside their inputs
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['cache', 'dependency_graph.json'])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+
+    # only the templates of the last contents of each input file are kept
+    def test_stale_entries_removed(self):
+        path = self.write_input('dependency_graph.json', 'first')
+        other_path = self.write_input('other_graph.json', 'other')
+        self.get_templates(path)
+        self.get_templates(other_path)
+        for content in ['second', 'third']:
+            self.write_input('dependency_graph.json', content)
+            self.get_templates(path)
+
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertEqual(self.get_templates(other_path), [['other']])
+        self.assertEqual(self.get_templates(path), [['third']])
+        self.assertEqual(self.generated, 4)
+
+
+    def test_default_cache_dir(self):
+        with unittest.mock.patch.dict(os.environ, {'TEMPLATES_CACHE_DIR': self.cache_dir}):
+            self.assertEqual(TemplatesCache().cache_dir, self.cache_dir)
+        with unittest.mock.patch.dict(os.environ, {'TEMPLATES_CACHE_DIR': '', 'XDG_CACHE_HOME': self.directory.name}):
+            self.assertEqual(TemplatesCache().cache_dir, os.path.join(self.directory.name, 'template-based-inference', 'templates'))
+
+
+if __name__ == '__main__':
+    unittest.main()